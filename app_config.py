@@ -18,6 +18,19 @@ DEFAULT_SERIAL_READ_CHUNK_SIZE = 4096
 DEFAULT_BUFFER_FLUSH_PACKET_COUNT = 200
 DEFAULT_BUFFER_FLUSH_INTERVAL_SEC = 0.2
 DEFAULT_INCREMENTAL_SAVE_INTERVAL_SEC = 5.0
+DEFAULT_COLUMNAR_CAPTURE_ENABLED = False
+DEFAULT_RAW_CAPTURE_ENABLED = False
+DEFAULT_SAVE_PROGRESS_INTERVAL_SEC = 1.0
+DEFAULT_MINMAX_PYRAMID_ENABLED = True
+DEFAULT_STEP_SIDECAR_ENABLED = True
+DEFAULT_STEP_SIDECAR_PREWARM_TESTS = 10
+DEFAULT_STEP_CACHE_BUDGET_MB = 512.0
+DEFAULT_EXPORT_COPY_WORKERS = 4
+DEFAULT_EXPORT_COMPRESS_LEVEL = 6
+DEFAULT_DATASET_EXPORT_PROCESSES = 0  # 0 表示按 CPU 核数自动选择
+DEFAULT_ANALYTICS_PROCESSES = 0
+DEFAULT_STREAM_METRICS_ENABLED = True
+DEFAULT_STREAM_METRICS_INTERVAL_SEC = 0.5
 
 
 def _config_paths_for(filename: str) -> List[str]:
@@ -151,6 +164,60 @@ def load_performance_config(path: Optional[str] = None) -> tuple:
 _PERF_READ_CHUNK, _PERF_PACKET_COUNT, _PERF_FLUSH_INTERVAL, _PERF_INCREMENTAL_SAVE_INTERVAL = load_performance_config()
 
 
+def load_performance_options(path: Optional[str] = None) -> dict:
+    """Load optional feature switches from the performance config (missing keys fall back to defaults)."""
+    options = {
+        "columnar_capture_enabled": DEFAULT_COLUMNAR_CAPTURE_ENABLED,
+        "raw_capture_enabled": DEFAULT_RAW_CAPTURE_ENABLED,
+        "save_progress_interval_sec": DEFAULT_SAVE_PROGRESS_INTERVAL_SEC,
+        "minmax_pyramid_enabled": DEFAULT_MINMAX_PYRAMID_ENABLED,
+        "step_sidecar_enabled": DEFAULT_STEP_SIDECAR_ENABLED,
+        "step_sidecar_prewarm_tests": DEFAULT_STEP_SIDECAR_PREWARM_TESTS,
+        "step_cache_budget_mb": DEFAULT_STEP_CACHE_BUDGET_MB,
+        "export_copy_workers": DEFAULT_EXPORT_COPY_WORKERS,
+        "export_compress_level": DEFAULT_EXPORT_COMPRESS_LEVEL,
+        "dataset_export_processes": DEFAULT_DATASET_EXPORT_PROCESSES,
+        "analytics_processes": DEFAULT_ANALYTICS_PROCESSES,
+        "stream_metrics_enabled": DEFAULT_STREAM_METRICS_ENABLED,
+        "stream_metrics_interval_sec": DEFAULT_STREAM_METRICS_INTERVAL_SEC,
+    }
+    config_paths = [path] if path else _config_paths_for(PERFORMANCE_CONFIG_FILENAME)
+    data = None
+    for candidate in config_paths:
+        try:
+            with open(candidate, "r", encoding="utf-8") as file_handle:
+                data = json.load(file_handle)
+            break
+        except FileNotFoundError:
+            continue
+        except Exception as exc:
+            logger.warning(f"Failed to load performance options from {candidate}: {exc}")
+            return options
+
+    if not isinstance(data, dict):
+        return options
+
+    # 按默认值的类型解析：布尔开关或非负数值
+    for key, default in list(options.items()):
+        if key not in data:
+            continue
+        value = data.get(key)
+        if isinstance(default, bool):
+            options[key] = _parse_enabled(value)
+            continue
+        try:
+            parsed = type(default)(value)
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid value for {key} in performance config, using default.")
+            continue
+        options[key] = parsed if parsed >= 0 else default
+
+    return options
+
+
+_PERF_OPTIONS = load_performance_options()
+
+
 def get_bias_current() -> float:
     return _BIAS_CURRENT
 
@@ -173,3 +240,57 @@ def get_buffer_flush_interval_sec() -> float:
 
 def get_incremental_save_interval_sec() -> float:
     return _PERF_INCREMENTAL_SAVE_INTERVAL
+
+
+def is_columnar_capture_enabled() -> bool:
+    return _PERF_OPTIONS["columnar_capture_enabled"]
+
+
+def is_raw_capture_enabled() -> bool:
+    return _PERF_OPTIONS["raw_capture_enabled"]
+
+
+def get_save_progress_interval_sec() -> float:
+    return _PERF_OPTIONS["save_progress_interval_sec"]
+
+
+def is_minmax_pyramid_enabled() -> bool:
+    # 查看器只在有列式副本时才读取金字塔（放大后从中取原始点），
+    # 因此未开启 columnar_capture_enabled 时不构建金字塔
+    return _PERF_OPTIONS["minmax_pyramid_enabled"] and _PERF_OPTIONS["columnar_capture_enabled"]
+
+
+def is_step_sidecar_enabled() -> bool:
+    return _PERF_OPTIONS["step_sidecar_enabled"]
+
+
+def get_step_sidecar_prewarm_tests() -> int:
+    return _PERF_OPTIONS["step_sidecar_prewarm_tests"]
+
+
+def get_step_cache_budget_mb() -> float:
+    return _PERF_OPTIONS["step_cache_budget_mb"]
+
+
+def get_export_copy_workers() -> int:
+    return max(_PERF_OPTIONS["export_copy_workers"], 1)
+
+
+def get_export_compress_level() -> int:
+    return min(_PERF_OPTIONS["export_compress_level"], 9)
+
+
+def get_dataset_export_processes() -> int:
+    return _PERF_OPTIONS["dataset_export_processes"]
+
+
+def get_analytics_processes() -> int:
+    return _PERF_OPTIONS["analytics_processes"]
+
+
+def is_stream_metrics_enabled() -> bool:
+    return _PERF_OPTIONS["stream_metrics_enabled"]
+
+
+def get_stream_metrics_interval_sec() -> float:
+    return _PERF_OPTIONS["stream_metrics_interval_sec"]
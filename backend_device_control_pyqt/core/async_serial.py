@@ -305,7 +305,9 @@ class AsyncSerialDevice:
         progress_callback: Optional[Callable[[int, str], None]] = None,
         data_callback: Optional[Callable[[Union[str, bytes], str], None]] = None,
         packet_size: Optional[int] = None,
-        streaming_mode: bool = False
+        streaming_mode: bool = False,
+        capture_journal: Optional[Any] = None,
+        capture_info: Optional[Dict[str, Any]] = None
     ) -> Tuple[Union[str, None], str]:
         """
         异步发送命令并接收响应，直到收到结束序列
@@ -318,10 +320,50 @@ class AsyncSerialDevice:
             data_callback: 数据回调函数，参数为(接收到的数据(字节或十六进制字符串), 设备ID)
             packet_size: 数据包长度（字节数），如果指定，则按固定长度切分数据包
             streaming_mode: 若为True，不累积全部数据，结合data_callback进行流式处理
+            capture_journal: 可选的 RawCaptureJournal，原样记录收到的所有字节
+            capture_info: 写入日志分段的附加信息（如输出特性的栅压）
             
         Returns:
             元组 (接收到的数据的十六进制字符串, 结束原因)
         """
+        if capture_journal is None:
+            return await self._send_and_receive(
+                command, end_sequences, timeout, progress_callback,
+                data_callback, packet_size, streaming_mode, None
+            )
+
+        reason = None
+        try:
+            capture_journal.begin_segment(command, packet_size or 0, capture_info)
+        except Exception as e:
+            logger.error(f"设备 {self.device_id} 原始数据日志分段写入失败: {e}")
+            capture_journal = None
+        try:
+            result = await self._send_and_receive(
+                command, end_sequences, timeout, progress_callback,
+                data_callback, packet_size, streaming_mode, capture_journal
+            )
+            reason = result[1]
+            return result
+        finally:
+            if capture_journal is not None:
+                try:
+                    capture_journal.end_segment(reason or "error")
+                except Exception as e:
+                    logger.error(f"设备 {self.device_id} 原始数据日志结束写入失败: {e}")
+
+    async def _send_and_receive(
+        self,
+        command: str,
+        end_sequences: Dict[str, str],
+        timeout: Optional[float],
+        progress_callback: Optional[Callable[[int, str], None]],
+        data_callback: Optional[Callable[[Union[str, bytes], str], None]],
+        packet_size: Optional[int],
+        streaming_mode: bool,
+        capture_journal: Optional[Any]
+    ) -> Tuple[Union[str, None], str]:
+        """send_and_receive_command 的实际收发循环"""
         
         if not self.is_connected:
             await self.connect()
@@ -390,6 +432,8 @@ class AsyncSerialDevice:
                     
                     if new_data:
                         total_received += len(new_data)
+                        if capture_journal is not None:
+                            capture_journal.write(new_data)
                         end_hit_name = None
                         end_hit_bytes = None
 
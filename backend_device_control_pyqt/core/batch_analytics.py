@@ -0,0 +1,287 @@
+"""
+批量分析 - batch_analytics.py
+
+对大量已保存测试并行计算器件指标（见 device_metrics）：每个测试一个进程池任务，
+结果写到测试目录的 ``analysis.json``，其中每个步骤记录数据文件的 (大小, mtime)，
+文件未变化时直接复用上次结果。测试索引读取其中的汇总值，历史页可按 Vth、gm、
+亚阈值摆幅、回滞和时间常数排序/过滤。
+
+命令行用法::
+
+    python -m backend_device_control_pyqt.core.batch_analytics [测试目录或设备目录 ...]
+        [--processes N] [--force] [--csv summary.csv] [--no-index]
+
+不给路径时分析 UserData/AutoSave 下的全部测试；完成后默认更新测试索引
+（UserData/test_catalog.db），历史页即可看到新的指标。
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend_device_control_pyqt.core.columnar_store import columnar_path_for, open_columnar
+from backend_device_control_pyqt.core.device_metrics import transfer_metrics, transient_metrics
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+ANALYSIS_FILENAME = "analysis.json"
+ANALYSIS_VERSION = 3
+DEFAULT_BASE_DIR = "UserData/AutoSave"
+INFO_FILENAME = "test_info.json"
+
+_ANALYZERS = {
+    "transfer": transfer_metrics,
+    "transient": transient_metrics,
+}
+# 测试级汇总：键 -> (来源步骤类型, 步骤指标键, 合并方式)
+SUMMARY_FIELDS = {
+    "vth": ("transfer", "vth", "median"),
+    "gm_max": ("transfer", "gm_max", "max"),
+    "subthreshold_swing": ("transfer", "subthreshold_swing", "min"),
+    "hysteresis": ("transfer", "hysteresis", "median"),
+    "tau_rise": ("transient", "tau_rise", "median"),
+    "tau_fall": ("transient", "tau_fall", "median"),
+}
+
+
+def analysis_path_for(test_dir: str) -> str:
+    return os.path.join(test_dir, ANALYSIS_FILENAME)
+
+
+def _signature(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_step_array(data_path: str) -> np.ndarray:
+    """
+    读取步骤数据的前两列 (x, Id)
+
+    有 .col 列式文件时从映射中只取前两列，否则解析 CSV（末行不完整时退回逐行容错解析）。
+    """
+    columnar = open_columnar(columnar_path_for(data_path))
+    if columnar is not None and len(columnar) > 0:
+        return np.array(columnar.data[:, :2], dtype=np.float64)
+    try:
+        data = np.loadtxt(data_path, delimiter=",", skiprows=1, usecols=(0, 1), ndmin=2)
+    except ValueError:
+        data = np.genfromtxt(data_path, delimiter=",", skip_header=1, usecols=(0, 1),
+                             invalid_raise=False, ndmin=2)
+    return data.reshape(-1, 2)
+
+
+def read_analysis(test_dir: str) -> Optional[Dict[str, Any]]:
+    """读取测试目录中的分析结果，不存在、损坏或版本不符时返回 None"""
+    try:
+        with open(analysis_path_for(test_dir), "r", encoding="utf-8") as f:
+            analysis = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"读取分析结果失败 {test_dir}: {e}")
+        return None
+    if not isinstance(analysis, dict) or analysis.get("version") != ANALYSIS_VERSION:
+        return None
+    return analysis
+
+
+def summarize_analysis(steps: Iterable[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+    """按 SUMMARY_FIELDS 把各步骤指标合并为测试级汇总"""
+    steps = list(steps)
+    summary: Dict[str, Optional[float]] = {}
+    for key, (step_type, metric, how) in SUMMARY_FIELDS.items():
+        values = [step["metrics"].get(metric) for step in steps
+                  if step.get("type") == step_type and isinstance(step.get("metrics"), dict)]
+        values = [value for value in values if value is not None]
+        if not values:
+            summary[key] = None
+        elif how == "max":
+            summary[key] = float(max(values))
+        elif how == "min":
+            summary[key] = float(min(values))
+        else:
+            summary[key] = float(np.median(values))
+    return summary
+
+
+def analyze_test(test_dir: str, force: bool = False) -> Dict[str, Any]:
+    """
+    分析单个测试（数据文件未变化的步骤复用 analysis.json 中的结果）
+
+    Returns:
+        分析结果 {"version", "analyzed_at", "steps": [...], "summary": {...}}
+    """
+    with open(os.path.join(test_dir, INFO_FILENAME), "r", encoding="utf-8") as f:
+        test_info = json.load(f)
+    previous = None if force else read_analysis(test_dir)
+    cached = {step.get("data_file"): step for step in (previous or {}).get("steps", [])}
+
+    steps = []
+    changed = previous is None
+    for index, step in enumerate(test_info.get("steps") or []):
+        if not isinstance(step, dict) or step.get("type") not in _ANALYZERS or not step.get("data_file"):
+            continue
+        data_path = os.path.join(test_dir, step["data_file"])
+        signature = _signature(data_path)
+        if signature is None:
+            continue
+        entry = cached.get(step["data_file"])
+        if entry is None or entry.get("signature") != signature or entry.get("type") != step["type"]:
+            data = load_step_array(data_path)
+            entry = {
+                "data_file": step["data_file"],
+                "step_index": index + 1,
+                "type": step["type"],
+                "signature": signature,
+                "metrics": _ANALYZERS[step["type"]](data[:, 0], data[:, 1]),
+            }
+            changed = True
+        steps.append(entry)
+    if len(steps) != len(cached):
+        changed = True
+
+    if not changed:
+        return previous
+    analysis = {
+        "version": ANALYSIS_VERSION,
+        "analyzed_at": time.time(),
+        "steps": steps,
+        "summary": summarize_analysis(steps),
+    }
+    # 先写临时文件再替换，索引读取时不会看到写了一半的文件
+    path = analysis_path_for(test_dir)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(analysis, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+    return analysis
+
+
+def _analyze_task(test_dir: str, force: bool) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """进程池任务：返回 (测试目录, 汇总, 错误信息)"""
+    try:
+        return test_dir, analyze_test(test_dir, force)["summary"], None
+    except Exception as e:
+        return test_dir, None, str(e)
+
+
+def analyze_tests(test_dirs: Iterable[str], processes: Optional[int] = None, force: bool = False,
+                  progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                  cancel_check: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """
+    用进程池批量分析测试
+
+    Args:
+        test_dirs: 测试目录
+        processes: 进程数，None/0 按 CPU 核数
+        force: 忽略缓存全部重算
+        progress_callback: progress_callback(已完成数, 总数, 测试目录)
+        cancel_check: 返回 True 时不再提交新任务并尽快返回
+
+    Returns:
+        {"results": {测试目录: 汇总}, "errors": {测试目录: 错误信息}, "cancelled": bool}
+    """
+    test_dirs = list(dict.fromkeys(test_dirs))
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    cancelled = False
+    if not test_dirs:
+        return {"results": results, "errors": errors, "cancelled": cancelled}
+    processes = min(processes or max((os.cpu_count() or 2) - 1, 1), len(test_dirs))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_analyze_task, test_dir, force) for test_dir in test_dirs]
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                test_dir, summary, error = future.result()
+                if error is None:
+                    results[test_dir] = summary
+                else:
+                    errors[test_dir] = error
+                    logger.warning(f"分析测试失败 {test_dir}: {error}")
+                if progress_callback:
+                    progress_callback(done, len(test_dirs), test_dir)
+                if cancel_check and cancel_check():
+                    cancelled = True
+                    break
+        finally:
+            if cancelled:
+                for future in futures:
+                    future.cancel()
+    return {"results": results, "errors": errors, "cancelled": cancelled}
+
+
+def find_test_dirs(paths: Iterable[str]) -> List[str]:
+    """把命令行给出的路径展开为测试目录：含 test_info.json 的目录本身，或其下一/两级中的测试目录"""
+    found = []
+    for path in paths:
+        if os.path.exists(os.path.join(path, INFO_FILENAME)):
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            if INFO_FILENAME in files:
+                found.append(root)
+                dirs[:] = []
+            elif os.path.relpath(root, path).count(os.sep) >= 1:
+                dirs[:] = []  # 只向下找两级：<设备>/<测试>
+    return sorted(found)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量计算已保存测试的器件指标")
+    parser.add_argument("paths", nargs="*", help=f"测试目录或其上级目录（默认 {DEFAULT_BASE_DIR}）")
+    parser.add_argument("--processes", type=int, default=0, help="进程数，0 表示按 CPU 核数")
+    parser.add_argument("--force", action="store_true", help="忽略缓存全部重新计算")
+    parser.add_argument("--csv", help="把各测试的汇总写到 CSV 文件")
+    parser.add_argument("--no-index", action="store_true", help="不更新测试索引")
+    args = parser.parse_args(argv)
+
+    test_dirs = find_test_dirs(args.paths or [DEFAULT_BASE_DIR])
+    if not test_dirs:
+        print("没有找到测试目录")
+        return 1
+    started = time.time()
+    outcome = analyze_tests(test_dirs, processes=args.processes, force=args.force,
+                            progress_callback=lambda done, total, _: print(f"\r{done}/{total}", end="", flush=True))
+    print()
+    fields = list(SUMMARY_FIELDS)
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["test_dir"] + fields)
+            for test_dir in test_dirs:
+                summary = outcome["results"].get(test_dir)
+                if summary is not None:
+                    writer.writerow([test_dir] + ["" if summary.get(key) is None else summary[key] for key in fields])
+    if not args.no_index and outcome["results"]:
+        # test_catalog 依赖本模块，这里延迟导入
+        from backend_device_control_pyqt.core.test_catalog import TestCatalog
+        catalog = TestCatalog()
+        base_dir = os.path.abspath(DEFAULT_BASE_DIR)
+        try:
+            for test_dir in outcome["results"]:
+                # 索引中的路径相对于 UserData/AutoSave，不在其下的测试不入库
+                rel_path = os.path.relpath(os.path.abspath(test_dir), base_dir)
+                if not rel_path.startswith(os.pardir):
+                    catalog.index_test_dir(os.path.join(DEFAULT_BASE_DIR, rel_path))
+        finally:
+            catalog.close()
+    for test_dir, error in outcome["errors"].items():
+        print(f"failed: {test_dir}: {error}")
+    print(f"完成 {len(outcome['results'])}/{len(test_dirs)} 个测试，用时 {time.time() - started:.1f}s")
+    return 0 if not outcome["errors"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""
+串口原始数据日志 - capture_journal.py
+
+测试进程在 send_and_receive_command 中把收到的原始字节原样追加到每个步骤的
+``<步骤>.raw.bin``，同时写一条定长索引记录到 ``<步骤>.raw.idx``：
+    偏移(uint64) 长度(uint32) 接收时间(float64) 包大小(uint16) 结束原因(uint8)
+步骤级元数据（模式、跨阻、基线、每次命令对应的分段等）写在 ``<步骤>.raw.json``。
+
+热路径上只有顺序写入。保存进程或界面崩溃后，可通过本模块从日志重新生成
+CSV（及可选的列式文件）：
+
+    python -m backend_device_control_pyqt.core.capture_journal <测试目录> [--overwrite] [--columnar]
+"""
+
+import argparse
+import glob
+import json
+import os
+import struct
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+JOURNAL_DATA_SUFFIX = ".raw.bin"
+JOURNAL_INDEX_SUFFIX = ".raw.idx"
+JOURNAL_META_SUFFIX = ".raw.json"
+
+# 索引记录: 偏移, 长度, 接收时间, 包大小, 结束原因代码
+_INDEX_RECORD = struct.Struct("<QIdHB")
+
+END_REASON_NONE = 0
+END_REASON_END_SEQUENCE = 1
+END_REASON_STOPPED = 2
+END_REASON_TIMEOUT = 3
+END_REASON_ERROR = 4
+END_REASON_OTHER = 5
+
+# 每个步骤类型的结束序列，回放时用于剥离
+_END_SEQUENCES = {
+    "transfer": bytes.fromhex("FFFFFFFFFFFFFFFF"),
+    "transient": bytes.fromhex("FEFEFEFEFEFEFEFE"),
+    "output": bytes.fromhex("CDABEFCDABEFCDAB"),
+}
+
+# 未刷新数据最长停留时间（秒），进程异常退出时最多丢失这么久的数据
+_FLUSH_INTERVAL_SEC = 0.5
+
+
+def end_reason_code(reason: Optional[str]) -> int:
+    """将 send_and_receive_command 返回的结束原因映射为索引中的代码"""
+    if not reason:
+        return END_REASON_NONE
+    if reason in _END_SEQUENCES:
+        return END_REASON_END_SEQUENCE
+    if reason == "stopped":
+        return END_REASON_STOPPED
+    if reason == "timeout":
+        return END_REASON_TIMEOUT
+    if reason.startswith("error"):
+        return END_REASON_ERROR
+    return END_REASON_OTHER
+
+
+def journal_stem_for(data_path: str) -> str:
+    """根据步骤数据文件路径（如 1_transient.csv）得到日志文件前缀"""
+    stem, _ = os.path.splitext(data_path)
+    return stem
+
+
+class RawCaptureJournal:
+    """单个步骤的原始串口数据日志（仅追加写）"""
+
+    def __init__(self, stem: str, meta: Dict[str, Any]):
+        self.stem = stem
+        self.meta = dict(meta)
+        self.meta.setdefault("format_version", 1)
+        self.meta.setdefault("created_at", time.time())
+        self.meta.setdefault("segments", [])
+        self.meta["closed"] = False
+        os.makedirs(os.path.dirname(stem) or ".", exist_ok=True)
+        self._data_file = open(stem + JOURNAL_DATA_SUFFIX, "ab")
+        self._index_file = open(stem + JOURNAL_INDEX_SUFFIX, "ab")
+        self._offset = self._data_file.tell()
+        self._packet_size = 0
+        self._last_flush = time.time()
+        self._write_meta()
+
+    def _write_meta(self):
+        meta_path = self.stem + JOURNAL_META_SUFFIX
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def begin_segment(self, command: str, packet_size: int, info: Optional[Dict[str, Any]] = None):
+        """每次发送命令前调用，记录一个分段（输出特性每个栅压一个分段）"""
+        self._packet_size = packet_size or 0
+        segment = {
+            "command": command,
+            "packet_size": self._packet_size,
+            "start_offset": self._offset,
+            "end_offset": None,
+            "end_reason": None,
+            "started_at": time.time(),
+        }
+        if info:
+            segment.update(info)
+        self.meta["segments"].append(segment)
+        self._write_meta()
+
+    def write(self, data: bytes):
+        """追加一次串口读取到的原始数据"""
+        if not data:
+            return
+        now = time.time()
+        self._data_file.write(data)
+        self._index_file.write(_INDEX_RECORD.pack(self._offset, len(data), now, self._packet_size, END_REASON_NONE))
+        self._offset += len(data)
+        if now - self._last_flush >= _FLUSH_INTERVAL_SEC:
+            self._data_file.flush()
+            self._index_file.flush()
+            self._last_flush = now
+
+    def end_segment(self, reason: Optional[str]):
+        """命令结束后调用，写入结束原因"""
+        code = end_reason_code(reason)
+        self._index_file.write(_INDEX_RECORD.pack(self._offset, 0, time.time(), self._packet_size, code))
+        self._data_file.flush()
+        self._index_file.flush()
+        if self.meta["segments"]:
+            segment = self.meta["segments"][-1]
+            segment["end_offset"] = self._offset
+            segment["end_reason"] = reason
+            segment["ended_at"] = time.time()
+        self._write_meta()
+
+    def close(self):
+        """关闭日志文件"""
+        if self._data_file.closed:
+            return
+        self._data_file.flush()
+        self._index_file.flush()
+        self._data_file.close()
+        self._index_file.close()
+        self.meta["closed"] = True
+        self.meta["total_bytes"] = self._offset
+        self._write_meta()
+
+
+def read_journal_index(stem: str) -> List[Dict[str, Any]]:
+    """读取索引记录，忽略末尾不完整的记录"""
+    try:
+        with open(stem + JOURNAL_INDEX_SUFFIX, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return []
+    usable = len(raw) - len(raw) % _INDEX_RECORD.size
+    return [
+        {"offset": offset, "length": length, "recv_time": recv_time,
+         "packet_size": packet_size, "end_reason": reason}
+        for offset, length, recv_time, packet_size, reason in _INDEX_RECORD.iter_unpack(raw[:usable])
+    ]
+
+
+def _segment_bytes(raw: bytes, meta: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """按分段切分原始数据；未正常结束的分段截止到文件末尾"""
+    segments = meta.get("segments") or [{"start_offset": 0}]
+    result = []
+    for i, segment in enumerate(segments):
+        start = int(segment.get("start_offset") or 0)
+        end = segment.get("end_offset")
+        if end is None:
+            end = segments[i + 1]["start_offset"] if i + 1 < len(segments) else len(raw)
+        result.append({"info": segment, "data": raw[start:min(int(end), len(raw))]})
+    return result
+
+
+def replay_journal(stem: str, output_path: Optional[str] = None, columnar: bool = False) -> Optional[str]:
+    """
+    从原始数据日志重新生成步骤数据文件
+
+    Args:
+        stem: 日志文件前缀（不含 .raw.* 后缀）
+        output_path: 输出CSV路径，默认使用元数据中的 data_file
+        columnar: 是否同时生成 .col 列式文件
+
+    Returns:
+        生成的CSV路径，无数据时返回 None
+    """
+    import numpy as np
+    from backend_device_control_pyqt.core.serial_data_parser import (
+        bytes_to_numpy, csv_layout, format_output_csv
+    )
+
+    with open(stem + JOURNAL_META_SUFFIX, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(stem + JOURNAL_DATA_SUFFIX, "rb") as f:
+        raw = f.read()
+
+    mode = meta.get("data_mode") or meta.get("step_type", "transfer")
+    transimpedance_ohms = meta.get("transimpedance_ohms", 100.0)
+    baseline_current = meta.get("baseline_current", 0.0)
+    packet_size = int(meta.get("packet_size") or (5 if mode != "transient" else 7))
+    end_sequence = _END_SEQUENCES.get(meta.get("step_type", mode), b"")
+    if output_path is None:
+        output_path = os.path.join(os.path.dirname(stem), meta.get("data_file") or os.path.basename(stem) + ".csv")
+
+    parsed_segments = []
+    for segment in _segment_bytes(raw, meta):
+        data = segment["data"]
+        if end_sequence and data.endswith(end_sequence):
+            data = data[:-len(end_sequence)]
+        parse_mode = "transient" if mode == "transient" else "transfer"
+        array = bytes_to_numpy(
+            data,
+            mode=parse_mode,
+            transimpedance_ohms=transimpedance_ohms,
+            transient_packet_size=packet_size,
+            baseline_current=baseline_current,
+        )
+        parsed_segments.append((segment["info"], array))
+
+    if mode == "output":
+        parsed = {}
+        for info, array in parsed_segments:
+            if len(array) > 0 and info.get("gate_voltage") is not None:
+                parsed[info["gate_voltage"]] = array
+        content = format_output_csv(parsed, meta.get("gate_voltages") or list(parsed.keys()))
+        if not content:
+            return None
+        with open(output_path, "wb") as f:
+            f.write(content)
+        return output_path
+
+    arrays = [array for _, array in parsed_segments if len(array) > 0]
+    if not arrays:
+        return None
+    data_np = np.vstack(arrays)
+    header, fmt = csv_layout(mode, packet_size)
+    np.savetxt(output_path, data_np, delimiter=",", header=header, comments="", fmt=fmt)
+
+    if columnar:
+        from backend_device_control_pyqt.core.columnar_store import append_columnar, columnar_path_for
+        append_columnar(
+            columnar_path_for(output_path),
+            data_np,
+            header.split(","),
+            meta={
+                "step_type": mode,
+                "packet_size": packet_size,
+                "transimpedance_ohms": transimpedance_ohms,
+                "baseline_current": baseline_current,
+                "source_file": os.path.basename(output_path),
+            },
+            reset=True,
+        )
+    return output_path
+
+
+def _recover_test_info(test_dir: str, journal_metas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """在缺少 test_info.json 时根据临时信息、步骤日志或原始日志元数据拼出测试信息"""
+    from backend_device_control_pyqt.core.step_log import load_in_progress_test_info
+
+    test_info: Dict[str, Any] = load_in_progress_test_info(test_dir) or {}
+
+    steps = test_info.setdefault("steps", [])
+    known_files = {step.get("data_file") for step in steps}
+    for meta in sorted(journal_metas, key=lambda m: m.get("step_index", 0)):
+        if meta.get("data_file") in known_files:
+            continue
+        steps.append({
+            "type": meta.get("step_type"),
+            "params": meta.get("params", {}),
+            "data_file": meta.get("data_file"),
+            "workflow_info": meta.get("workflow_info", {}),
+            "recovered_from_journal": True,
+        })
+    if journal_metas:
+        first = journal_metas[0]
+        test_info.setdefault("test_id", first.get("test_id"))
+        test_info.setdefault("device_id", first.get("device_id"))
+        test_info.setdefault("test_type", first.get("test_type"))
+    test_info["status"] = "recovered"
+    test_info["recovered_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    return test_info
+
+
+def rebuild_test_directory(test_dir: str, overwrite: bool = False, columnar: bool = False) -> List[str]:
+    """
+    根据目录下所有原始数据日志重建步骤数据文件，必要时补写 test_info.json
+
+    Returns:
+        重新生成的文件列表
+    """
+    rebuilt = []
+    metas = []
+    for meta_path in sorted(glob.glob(os.path.join(test_dir, "*" + JOURNAL_META_SUFFIX))):
+        stem = meta_path[:-len(JOURNAL_META_SUFFIX)]
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception as e:
+            logger.error(f"读取日志元数据 {meta_path} 失败: {e}")
+            continue
+        metas.append(meta)
+
+        target = os.path.join(test_dir, meta.get("data_file") or os.path.basename(stem) + ".csv")
+        if os.path.exists(target) and not overwrite:
+            continue
+        try:
+            result = replay_journal(stem, target, columnar=columnar)
+        except Exception as e:
+            logger.error(f"回放日志 {stem} 失败: {e}")
+            continue
+        if result:
+            rebuilt.append(result)
+            logger.info(f"已从日志重建: {result}")
+
+    info_path = os.path.join(test_dir, "test_info.json")
+    if metas and not os.path.exists(info_path):
+        test_info = _recover_test_info(test_dir, metas)
+        with open(info_path, "w", encoding="utf-8") as f:
+            json.dump(test_info, f, indent=4, ensure_ascii=False)
+        rebuilt.append(info_path)
+    return rebuilt
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="从原始串口数据日志重建测试目录")
+    parser.add_argument("test_dirs", nargs="+", help="测试目录 (UserData/AutoSave/<设备>/<测试>)")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已存在的CSV")
+    parser.add_argument("--columnar", action="store_true", help="同时生成 .col 列式文件")
+    args = parser.parse_args(argv)
+
+    total = 0
+    for test_dir in args.test_dirs:
+        if not os.path.isdir(test_dir):
+            print(f"跳过不存在的目录: {test_dir}")
+            continue
+        rebuilt = rebuild_test_directory(test_dir, overwrite=args.overwrite, columnar=args.columnar)
+        for path in rebuilt:
+            print(f"rebuilt: {path}")
+        total += len(rebuilt)
+    print(f"完成，共生成 {total} 个文件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+列式二进制数据容器 - columnar_store.py
+
+每个步骤一个 ``.col`` 文件，与 CSV 并存：
+- 固定 4096 字节头部：魔数 + JSON 元数据（步骤类型、包大小、跨阻、基线、列名等）
+- 头部之后是按行连续存放的小端 float64 数据，可直接 np.memmap 读取
+- 分块索引保存在 ``.col.idx`` 中，每次追加写一条记录 (起始行, 行数, 写入时间)
+
+行数由文件大小推导，进程中途退出时最多丢失未写完的最后一行。
+"""
+
+import json
+import os
+import struct
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+COLUMNAR_MAGIC = b"OECTCOL1"
+COLUMNAR_HEADER_SIZE = 4096
+COLUMNAR_EXTENSION = ".col"
+COLUMNAR_INDEX_SUFFIX = ".idx"
+COLUMNAR_DTYPE = "<f8"
+
+# 分块索引记录: 起始行(uint64), 行数(uint64), 写入时间(float64)
+_CHUNK_RECORD = struct.Struct("<QQd")
+
+
+def columnar_path_for(data_path: str) -> str:
+    """根据 CSV 路径得到同名的列式文件路径"""
+    stem, _ = os.path.splitext(data_path)
+    return stem + COLUMNAR_EXTENSION
+
+
+def _encode_header(header: Dict[str, Any]) -> bytes:
+    payload = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    body_size = COLUMNAR_HEADER_SIZE - len(COLUMNAR_MAGIC) - 4
+    if len(payload) > body_size:
+        raise ValueError(f"列式文件头部过大: {len(payload)} > {body_size}")
+    return COLUMNAR_MAGIC + struct.pack("<I", len(payload)) + payload.ljust(body_size, b" ")
+
+
+def _read_header(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        raw = f.read(COLUMNAR_HEADER_SIZE)
+    if len(raw) < COLUMNAR_HEADER_SIZE or not raw.startswith(COLUMNAR_MAGIC):
+        raise ValueError(f"不是有效的列式数据文件: {path}")
+    (length,) = struct.unpack_from("<I", raw, len(COLUMNAR_MAGIC))
+    start = len(COLUMNAR_MAGIC) + 4
+    return json.loads(raw[start:start + length].decode("utf-8"))
+
+
+def append_columnar(path: str, block: np.ndarray, columns: Sequence[str],
+                    meta: Optional[Dict[str, Any]] = None, reset: bool = False) -> int:
+    """
+    追加一个数据块到列式文件，文件不存在（或 reset=True）时先写入头部
+
+    Args:
+        path: .col 文件路径
+        block: (N, len(columns)) 数组
+        columns: 列名
+        meta: 写入头部的附加元数据（步骤类型、包大小、跨阻、基线等）
+        reset: 是否丢弃已有内容重新创建
+
+    Returns:
+        本次写入的字节数
+    """
+    block = np.ascontiguousarray(block, dtype=COLUMNAR_DTYPE)
+    if block.ndim == 1:
+        block = block.reshape(-1, len(columns))
+    if block.shape[1] != len(columns):
+        raise ValueError(f"列数不匹配: {block.shape[1]} != {len(columns)}")
+
+    index_path = path + COLUMNAR_INDEX_SUFFIX
+    written = 0
+    if reset or not os.path.exists(path) or os.path.getsize(path) < COLUMNAR_HEADER_SIZE:
+        header = dict(meta or {})
+        header.update({
+            "format_version": 1,
+            "columns": list(columns),
+            "dtype": COLUMNAR_DTYPE,
+            "header_size": COLUMNAR_HEADER_SIZE,
+            "chunk_index": os.path.basename(index_path),
+            "created_at": time.time(),
+        })
+        with open(path, "wb") as f:
+            f.write(_encode_header(header))
+        open(index_path, "wb").close()
+        written += COLUMNAR_HEADER_SIZE
+
+    if block.shape[0] == 0:
+        return written
+
+    row_width = len(columns) * block.itemsize
+    with open(path, "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        # 丢弃上次异常退出时残留的半行
+        aligned = COLUMNAR_HEADER_SIZE + ((end - COLUMNAR_HEADER_SIZE) // row_width) * row_width
+        if aligned != end:
+            f.truncate(aligned)
+            f.seek(aligned)
+        start_row = (aligned - COLUMNAR_HEADER_SIZE) // row_width
+        f.write(block.tobytes())
+    with open(index_path, "ab") as f:
+        f.write(_CHUNK_RECORD.pack(start_row, block.shape[0], time.time()))
+    return written + block.nbytes
+
+
+class ColumnarFile:
+    """只读访问列式文件，数据以 np.memmap 方式映射，不会整体载入内存"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header = _read_header(path)
+        self.columns: List[str] = list(self.header.get("columns", []))
+        header_size = int(self.header.get("header_size", COLUMNAR_HEADER_SIZE))
+        dtype = np.dtype(self.header.get("dtype", COLUMNAR_DTYPE))
+        row_width = max(len(self.columns), 1) * dtype.itemsize
+        self.num_rows = max(os.path.getsize(path) - header_size, 0) // row_width
+        if self.num_rows > 0:
+            self.data = np.memmap(path, dtype=dtype, mode="r", offset=header_size,
+                                  shape=(self.num_rows, len(self.columns)))
+        else:
+            self.data = np.zeros((0, len(self.columns)), dtype=dtype)
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def column(self, name: str) -> np.ndarray:
+        """按列名取一列（memmap 视图）"""
+        return self.data[:, self.columns.index(name)]
+
+    def slice_rows(self, start: int, stop: int) -> np.ndarray:
+        """按行号切片，返回内存中的副本"""
+        return np.array(self.data[max(start, 0):min(stop, self.num_rows)])
+
+    def slice_range(self, x_min: float, x_max: float, column: int = 0) -> np.ndarray:
+        """按第一列（时间/电压）范围切片，要求该列单调递增"""
+        x = self.data[:, column]
+        start = int(np.searchsorted(x, x_min, side="left"))
+        stop = int(np.searchsorted(x, x_max, side="right"))
+        return self.slice_rows(start, stop)
+
+    def chunks(self) -> List[Dict[str, Any]]:
+        """读取分块索引"""
+        index_path = os.path.join(os.path.dirname(self.path),
+                                  self.header.get("chunk_index", os.path.basename(self.path) + COLUMNAR_INDEX_SUFFIX))
+        result = []
+        try:
+            with open(index_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return result
+        usable = len(raw) - len(raw) % _CHUNK_RECORD.size
+        for start_row, rows, written_at in _CHUNK_RECORD.iter_unpack(raw[:usable]):
+            result.append({"start_row": start_row, "rows": rows, "written_at": written_at})
+        return result
+
+
+def open_columnar(path: str) -> Optional[ColumnarFile]:
+    """打开列式文件，文件不存在或损坏时返回 None"""
+    try:
+        return ColumnarFile(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"打开列式文件 {path} 失败: {e}")
+        return None
@@ -0,0 +1,270 @@
+"""
+器件指标计算 - device_metrics.py
+
+从单个步骤的数据计算常用的 OECT 指标（纯 numpy 向量化，不依赖界面）：
+
+- 转移特性（Vg-Id）：阈值电压 Vth（最大跨导点线性外推）、峰值跨导 gm、开关比、
+  亚阈值摆幅 SS（mV/dec，只在噪声底之上到最大跨导点之间求）、正反扫描 Vth 之差（回滞）
+- 瞬态（t-Id）：按中间电平切分周期，逐个跳变用 10%-90% 时间估计上升/下降时间常数
+  （指数响应 t90 - t10 = tau * ln 9），以及高/低电平电流
+
+数据中的 NaN 会被忽略；点数不足或无法计算的指标为 None。
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 求导前的滑动平均窗口（点数），实时指标按同一窗口逐块平滑
+GM_SMOOTH_WINDOW = 5
+_MIN_POINTS = 5
+_LN9 = math.log(9.0)
+# 亚阈值区下限：扫描两端 |I| 中位数的较小者（关态噪声底）的倍数
+SS_FLOOR_FACTOR = 10.0
+SS_FLOOR_POINTS = 8
+SS_LEVELS_PER_DECADE = 20  # SS 包络按 1/20 decade 分档
+
+
+def _finite_or_none(value) -> Optional[float]:
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _smooth(values: np.ndarray) -> np.ndarray:
+    window = GM_SMOOTH_WINDOW
+    kernel = np.ones(window) / window
+    # 边缘用原值填充，避免卷积把端点拉向 0
+    padded = np.concatenate((np.full(window // 2, values[0]), values, np.full(window - 1 - window // 2, values[-1])))
+    return np.convolve(padded, kernel, mode="valid")
+
+
+def _derivative(x: np.ndarray, y: np.ndarray):
+    """相邻点差分求导，返回 (中点 x, 中点 y, dy/dx)，跳过 x 重复的点"""
+    dx = np.diff(x)
+    valid = dx != 0
+    mid_x = ((x[:-1] + x[1:]) / 2)[valid]
+    mid_y = ((y[:-1] + y[1:]) / 2)[valid]
+    return mid_x, mid_y, np.diff(y)[valid] / dx[valid]
+
+
+def subthreshold_floor(start: np.ndarray, end: np.ndarray) -> float:
+    """亚阈值区的电流下限：扫描起点、终点附近 |I| 中位数的较小者乘以 SS_FLOOR_FACTOR"""
+    levels = [float(np.median(np.abs(values))) for values in (start, end) if len(values)]
+    return SS_FLOOR_FACTOR * min(levels) if levels else 0.0
+
+
+def level_crossings(vg: np.ndarray, level: np.ndarray, envelope: float = -math.inf,
+                    previous: Optional[Tuple[float, float]] = None):
+    """
+    level（log10|I|）的上升包络第一次越过各档 k / SS_LEVELS_PER_DECADE 时的 Vg
+
+    越过点在相邻两点间线性插值；level 为 -inf 的点不参与。分块处理时传入上一块返回的
+    envelope 和 previous（最后一点的 (Vg, level)）。返回 ({档: Vg}, envelope, previous)。
+    """
+    crossings: Dict[int, float] = {}
+    if len(level) == 0:
+        return crossings, envelope, previous
+    prev_v, prev_level = previous if previous is not None else (math.nan, -math.inf)
+    full_v = np.concatenate(([prev_v], vg))
+    full_level = np.concatenate(([prev_level], level))
+    env = np.maximum.accumulate(np.concatenate(([envelope], level)))
+    for n in np.flatnonzero(env[1:] > env[:-1]).tolist():
+        if not math.isfinite(env[n]):
+            continue  # 第一个有效点只确定包络起点
+        ks = np.arange(math.floor(env[n] * SS_LEVELS_PER_DECADE) + 1,
+                       math.floor(env[n + 1] * SS_LEVELS_PER_DECADE) + 1)
+        if len(ks) == 0:
+            continue
+        v0, l0, v1, l1 = full_v[n], full_level[n], full_v[n + 1], full_level[n + 1]
+        if math.isfinite(v0) and math.isfinite(l0):
+            fraction = np.clip((ks / SS_LEVELS_PER_DECADE - l0) / (l1 - l0), 0.0, 1.0)
+            values = v0 + fraction * (v1 - v0)
+        else:
+            values = np.full(len(ks), v1)
+        crossings.update(zip(ks.tolist(), values.tolist()))
+    return crossings, float(env[-1]), (float(full_v[-1]), float(full_level[-1]))
+
+
+def swing_from_crossings(crossings: Dict[int, float], lower: float, upper: float) -> Optional[float]:
+    """
+    亚阈值摆幅（mV/dec）：包络升高一个 decade 所需 Vg 的最小值，只用 log10 电流在
+    [lower, upper] 内的档
+    """
+    if not crossings:
+        return None
+    k_min = max(math.ceil(lower * SS_LEVELS_PER_DECADE) if math.isfinite(lower) else -math.inf,
+                min(crossings))
+    k_max = math.floor(upper * SS_LEVELS_PER_DECADE) if math.isfinite(upper) else max(crossings)
+    widths = [abs(crossings[k + SS_LEVELS_PER_DECADE] - crossings[k])
+              for k in range(int(k_min), k_max - SS_LEVELS_PER_DECADE + 1)
+              if k in crossings and k + SS_LEVELS_PER_DECADE in crossings]
+    widths = [width for width in widths if width > 0]
+    return _finite_or_none(1000.0 * min(widths)) if widths else None
+
+
+def _branch_metrics(vg: np.ndarray, current: np.ndarray) -> Dict[str, Optional[float]]:
+    """单向扫描的 Vth、gm、SS"""
+    result = {"vth": None, "gm_max": None, "vg_at_gm_max": None, "subthreshold_swing": None}
+    if len(vg) < _MIN_POINTS:
+        return result
+    order = np.argsort(vg, kind="stable")
+    vg = vg[order]
+    raw = current[order]
+    current = _smooth(raw)
+    mid_v, mid_i, gm = _derivative(vg, current)
+    if len(gm) == 0:
+        return result
+    peak = int(np.argmax(np.abs(gm)))
+    if gm[peak] == 0:
+        return result
+    result["gm_max"] = _finite_or_none(abs(gm[peak]))
+    result["vg_at_gm_max"] = _finite_or_none(mid_v[peak])
+    # 最大跨导处切线与 Id = 0 的交点
+    result["vth"] = _finite_or_none(mid_v[peak] - mid_i[peak] / gm[peak])
+
+    # SS 只在亚阈值区求：与开态电流同号，|I| 从噪声底之上到最大跨导点电流为止；
+    # 按 |I| 升高的方向取包络，用一个 decade 的 Vg 跨度（逐点斜率在噪声底附近会给出
+    # 低于 60 mV/dec 的假值）
+    head, tail = raw[:SS_FLOOR_POINTS], raw[-SS_FLOOR_POINTS:]
+    on_sign = np.sign(raw[np.argmax(np.abs(raw))])
+    magnitude = np.abs(current)
+    usable = (np.sign(current) == on_sign) & (magnitude > 0)
+    log_i = np.full(len(current), -np.inf)
+    log_i[usable] = np.log10(magnitude[usable])
+    if np.median(np.abs(head)) > np.median(np.abs(tail)):
+        vg, log_i = vg[::-1], log_i[::-1]
+    crossings, _, _ = level_crossings(vg, log_i)
+    floor = subthreshold_floor(head, tail)
+    result["subthreshold_swing"] = swing_from_crossings(
+        crossings, math.log10(floor) if floor > 0 else -math.inf, math.log10(abs(mid_i[peak])))
+    return result
+
+
+def transfer_metrics(vg: np.ndarray, current: np.ndarray) -> Dict[str, Any]:
+    """
+    转移特性指标
+
+    扫描在 |Vg - Vg[0]| 最大处折返时分为正扫和反扫，Vth/gm/SS 取正扫结果，
+    反扫点数足够时 hysteresis = Vth(反扫) - Vth(正扫)。
+    """
+    vg = np.asarray(vg, dtype=np.float64)
+    current = np.asarray(current, dtype=np.float64)
+    finite = np.isfinite(vg) & np.isfinite(current)
+    vg, current = vg[finite], current[finite]
+    result: Dict[str, Any] = {"points": int(len(vg))}
+    if len(vg) < _MIN_POINTS:
+        return result
+
+    turn = int(np.argmax(np.abs(vg - vg[0])))
+    forward = _branch_metrics(vg[:turn + 1], current[:turn + 1])
+    result.update(forward)
+    # 折返处停留的重复点只保留最后一个给反扫，避免正扫的点混入
+    back_start = turn
+    while back_start + 1 < len(vg) and vg[back_start + 1] == vg[turn]:
+        back_start += 1
+    backward = (_branch_metrics(vg[back_start:], current[back_start:])
+                if len(vg) - back_start >= _MIN_POINTS else None)
+    if backward and backward["vth"] is not None and forward["vth"] is not None:
+        result["hysteresis"] = backward["vth"] - forward["vth"]
+    else:
+        result["hysteresis"] = None
+
+    magnitude = np.abs(current)
+    nonzero = magnitude[magnitude > 0]
+    result["i_on"] = _finite_or_none(magnitude.max())
+    result["i_off"] = _finite_or_none(nonzero.min()) if len(nonzero) else None
+    result["on_off_ratio"] = (result["i_on"] / result["i_off"]
+                              if result["i_on"] and result["i_off"] else None)
+    return result
+
+
+def _transition_tau(t: np.ndarray, y: np.ndarray, start: int, edge: int, stop: int) -> Optional[float]:
+    """跳变（在 edge 处穿过中间电平）的 10%-90% 时间换算的时间常数"""
+    before = y[start:edge + 1]
+    after = y[edge + 1:stop]
+    if len(before) < 2 or len(after) < 2:
+        return None
+    # 跳变前半段和跳变后后半段视为稳定电平
+    level0 = float(np.median(before[:max(len(before) // 2, 1)]))
+    level1 = float(np.median(after[len(after) // 2:]))
+    amplitude = level1 - level0
+    if amplitude == 0:
+        return None
+    fraction = (y[start:stop] - level0) / amplitude
+    local_edge = edge - start
+    below10 = np.flatnonzero(fraction[:local_edge + 1] < 0.1)
+    above90 = np.flatnonzero(fraction[local_edge + 1:] >= 0.9)
+    if len(below10) == 0 or len(above90) == 0:
+        return None
+    t10 = t[start + below10[-1]]
+    t90 = t[edge + 1 + above90[0]]
+    return _finite_or_none((t90 - t10) / _LN9) if t90 > t10 else None
+
+
+def schmitt_state(y: np.ndarray, lower: float, upper: float, initial: Optional[bool] = None) -> np.ndarray:
+    """
+    带回差的高低电平判断：高于 upper 为高、低于 lower 为低，中间保持前一状态
+
+    initial 为第一个点之前的状态（分块处理时传入上一块的末状态），None 时按中点判断。
+    """
+    marks = np.full(len(y), -1, dtype=np.int8)
+    marks[y >= upper] = 1
+    marks[y <= lower] = 0
+    if marks[0] < 0:
+        if initial is None:
+            initial = y[0] > (lower + upper) / 2
+        marks[0] = 1 if initial else 0
+    last_defined = np.maximum.accumulate(np.where(marks >= 0, np.arange(len(y)), 0))
+    return marks[last_defined].astype(bool)
+
+
+def transient_metrics(time: np.ndarray, current: np.ndarray) -> Dict[str, Any]:
+    """
+    瞬态指标：周期数、高/低电平电流、开关比、上升/下降时间常数（各跳变的中位数）
+
+    以 P5/P95 之间 40%/60% 处为回差阈值判断高低电平（噪声在中间电平附近不会产生
+    多余跳变）；电流上升的跳变记为 rise，下降的记为 fall。
+    """
+    t = np.asarray(time, dtype=np.float64)
+    y = np.asarray(current, dtype=np.float64)
+    finite = np.isfinite(t) & np.isfinite(y)
+    t, y = t[finite], y[finite]
+    result: Dict[str, Any] = {"points": int(len(t)), "cycles": 0}
+    if len(t) < 2 * _MIN_POINTS:
+        return result
+    low, high = np.percentile(y, [5, 95])
+    if not high > low:
+        return result
+    state = schmitt_state(y, low + 0.4 * (high - low), low + 0.6 * (high - low))
+    edges = np.flatnonzero(state[1:] != state[:-1])
+    rising = state[edges + 1]
+    bounds = np.concatenate(([0], edges + 1, [len(y)]))
+    levels_high: List[float] = []
+    levels_low: List[float] = []
+    for segment in range(len(bounds) - 1):
+        values = y[bounds[segment]:bounds[segment + 1]]
+        # 每段后半段为稳定电平
+        level = float(np.median(values[len(values) // 2:]))
+        (levels_high if state[bounds[segment]] else levels_low).append(level)
+
+    tau_rise: List[float] = []
+    tau_fall: List[float] = []
+    for k, edge in enumerate(edges):
+        start = edges[k - 1] + 1 if k > 0 else 0
+        stop = edges[k + 1] + 1 if k + 1 < len(edges) else len(y)
+        tau = _transition_tau(t, y, start, int(edge), stop)
+        if tau is not None:
+            (tau_rise if rising[k] else tau_fall).append(tau)
+
+    result["cycles"] = int(np.count_nonzero(rising))
+    i_high = float(np.median(levels_high)) if levels_high else None
+    i_low = float(np.median(levels_low)) if levels_low else None
+    result["i_high"] = i_high
+    result["i_low"] = i_low
+    result["on_off_ratio"] = abs(i_high / i_low) if i_high is not None and i_low else None
+    result["tau_rise"] = float(np.median(tau_rise)) if tau_rise else None
+    result["tau_fall"] = float(np.median(tau_fall)) if tau_fall else None
+    return result
@@ -0,0 +1,267 @@
+"""
+最小/最大值金字塔 - minmax_pyramid.py
+
+为长时间瞬态步骤预先计算多分辨率的 min/max 包络，存放在步骤数据旁的
+``<stem>.pyramid/`` 目录中：
+- ``level_00.bin`` 每个桶覆盖 BASE_BUCKET 个原始点，``level_k`` 覆盖 BASE_BUCKET * 2^k 个
+- 每个桶一条记录 (x1, y1, x2, y2)，即桶内最小值和最大值两个点，按出现顺序排列
+- ``meta.json`` 记录各层桶数、原始点数以及是否已完整写出尾部
+
+保存进程在流式写入时增量构建（PyramidBuilder），查看器按可见范围和像素宽度
+选择合适的层（MinMaxPyramid.query），放大到足够细时再读取原始数据。
+原始数据取自列式副本，所以金字塔只在同时开启 columnar_capture_enabled 时构建。
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+PYRAMID_SUFFIX = ".pyramid"
+PYRAMID_META_FILENAME = "meta.json"
+PYRAMID_DTYPE = "<f8"
+BASE_BUCKET = 64  # 2^6
+MAX_LEVELS = 24
+_RECORD_COLUMNS = 4
+
+
+def pyramid_dir_for(data_path: str) -> str:
+    """根据步骤数据文件路径得到金字塔目录"""
+    stem, _ = os.path.splitext(data_path)
+    return stem + PYRAMID_SUFFIX
+
+
+def _level_path(directory: str, level: int) -> str:
+    return os.path.join(directory, f"level_{level:02d}.bin")
+
+
+def _extremes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    对 (M, K) 的分组数据取每组最小值和最大值两个点，按出现顺序返回 (M, 4) 记录
+    NaN 不参与比较；整组都是 NaN 时输出 NaN
+    """
+    y_low = np.where(np.isnan(y), np.inf, y)
+    y_high = np.where(np.isnan(y), -np.inf, y)
+    idx_min = np.argmin(y_low, axis=1)
+    idx_max = np.argmax(y_high, axis=1)
+    first = np.minimum(idx_min, idx_max)
+    second = np.maximum(idx_min, idx_max)
+    rows = np.arange(len(y))
+    records = np.empty((len(y), _RECORD_COLUMNS), dtype=np.float64)
+    records[:, 0] = x[rows, first]
+    records[:, 1] = y[rows, first]
+    records[:, 2] = x[rows, second]
+    records[:, 3] = y[rows, second]
+    return records
+
+
+def _merge_records(records: np.ndarray) -> np.ndarray:
+    """将 (M, 4) 记录合并为一条：把每条记录视为两个点再取极值"""
+    points = records.reshape(1, -1, 2)
+    return _extremes(points[:, :, 0], points[:, :, 1])
+
+
+def _merge_pairs(records: np.ndarray) -> np.ndarray:
+    """相邻两条记录合并为上一层的一条记录，要求记录数为偶数"""
+    points = records.reshape(-1, 4, 2)
+    return _extremes(points[:, :, 0], points[:, :, 1])
+
+
+class PyramidBuilder:
+    """
+    增量构建 min/max 金字塔
+
+    append() 每次只处理新到的数据：凑满 BASE_BUCKET 的部分生成第 0 层记录，
+    每层凑成一对就向上合并一次。finish() 把未满的尾部也写出，使各层覆盖全部数据。
+    """
+
+    def __init__(self, directory: str, meta: Optional[Dict[str, Any]] = None,
+                 base_bucket: int = BASE_BUCKET):
+        self.directory = directory
+        self.base_bucket = int(base_bucket)
+        self.meta = dict(meta or {})
+        self.source_rows = 0
+        self.counts: List[int] = []
+        self._pending_x = np.empty(0, dtype=np.float64)
+        self._pending_y = np.empty(0, dtype=np.float64)
+        self._carry: Dict[int, np.ndarray] = {}
+        self.finished = False
+
+        if os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+        self._write_meta()
+
+    def _write_level(self, level: int, records: np.ndarray):
+        if len(records) == 0:
+            return
+        while len(self.counts) <= level:
+            self.counts.append(0)
+        with open(_level_path(self.directory, level), "ab") as f:
+            f.write(np.ascontiguousarray(records, dtype=PYRAMID_DTYPE).tobytes())
+        self.counts[level] += len(records)
+
+    def _push(self, level: int, records: np.ndarray):
+        """写入一层记录，并把成对的记录合并推到上一层"""
+        self._write_level(level, records)
+        if level + 1 >= MAX_LEVELS:
+            return
+        carry = self._carry.pop(level, None)
+        if carry is not None:
+            records = np.vstack((carry, records))
+        if len(records) % 2:
+            self._carry[level] = records[-1:]
+            records = records[:-1]
+        if len(records):
+            self._push(level + 1, _merge_pairs(records))
+
+    def append(self, x: np.ndarray, y: np.ndarray):
+        """追加一段原始数据（x 单调递增）"""
+        if self.finished or x is None or len(x) == 0:
+            return
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        self.source_rows += len(x)
+        if len(self._pending_x):
+            x = np.concatenate((self._pending_x, x))
+            y = np.concatenate((self._pending_y, y))
+        full = (len(x) // self.base_bucket) * self.base_bucket
+        self._pending_x = x[full:].copy()
+        self._pending_y = y[full:].copy()
+        if full:
+            shape = (-1, self.base_bucket)
+            self._push(0, _extremes(x[:full].reshape(shape), y[:full].reshape(shape)))
+        self._write_meta()
+
+    def finish(self):
+        """写出各层未满的尾部桶，之后不能再追加"""
+        if self.finished:
+            return
+        tail = None
+        if len(self._pending_x):
+            tail = _extremes(self._pending_x.reshape(1, -1), self._pending_y.reshape(1, -1))
+        level = 0
+        while level < MAX_LEVELS:
+            if tail is not None:
+                self._write_level(level, tail)
+            count = self.counts[level] if level < len(self.counts) else 0
+            if count <= 1:
+                break
+            carry = self._carry.pop(level, None)
+            parts = [part for part in (carry, tail) if part is not None]
+            tail = _merge_records(np.vstack(parts)) if parts else None
+            level += 1
+        self._pending_x = self._pending_x[:0]
+        self._pending_y = self._pending_y[:0]
+        self._carry.clear()
+        self.finished = True
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = dict(self.meta)
+        meta.update({
+            "format_version": 1,
+            "base_bucket": self.base_bucket,
+            "levels": list(self.counts),
+            "source_rows": self.source_rows,
+            "complete": self.finished,
+            "updated_at": time.time(),
+        })
+        path = os.path.join(self.directory, PYRAMID_META_FILENAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def build_pyramid(directory: str, x: np.ndarray, y: np.ndarray,
+                  meta: Optional[Dict[str, Any]] = None) -> PyramidBuilder:
+    """一次性为完整数据构建金字塔"""
+    builder = PyramidBuilder(directory, meta)
+    builder.append(x, y)
+    builder.finish()
+    return builder
+
+
+class MinMaxPyramid:
+    """只读访问金字塔，各层以 np.memmap 映射"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, PYRAMID_META_FILENAME), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.base_bucket = int(self.meta.get("base_bucket", BASE_BUCKET))
+        self.source_rows = int(self.meta.get("source_rows", 0))
+        self.levels: List[np.ndarray] = []
+        record_size = _RECORD_COLUMNS * np.dtype(PYRAMID_DTYPE).itemsize
+        for level in range(len(self.meta.get("levels", []))):
+            path = _level_path(directory, level)
+            # 以文件大小为准，meta 可能落后于正在写入的层文件
+            rows = os.path.getsize(path) // record_size if os.path.exists(path) else 0
+            if rows == 0:
+                break
+            self.levels.append(np.memmap(path, dtype=PYRAMID_DTYPE, mode="r",
+                                         shape=(rows, _RECORD_COLUMNS)))
+
+    def bucket_size(self, level: int) -> int:
+        """第 level 层每个桶覆盖的原始点数"""
+        return self.base_bucket << level
+
+    def _range(self, level: int, x_min: float, x_max: float) -> Tuple[int, int]:
+        keys = self.levels[level][:, 0]
+        start = int(np.searchsorted(keys, x_min, side="left"))
+        stop = int(np.searchsorted(keys, x_max, side="right"))
+        return max(start - 1, 0), min(stop + 1, len(keys))
+
+    def query(self, x_min: float, x_max: float, max_buckets: int):
+        """
+        取可见范围内桶数不超过 max_buckets 的最细一层
+
+        Returns:
+            (x, y, level)，x/y 为按顺序展开的极值点；若第 0 层仍过密则返回最粗可用层
+        """
+        if not self.levels:
+            return np.empty(0), np.empty(0), -1
+        chosen = len(self.levels) - 1
+        for level in range(len(self.levels)):
+            start, stop = self._range(level, x_min, x_max)
+            if stop - start <= max_buckets:
+                chosen = level
+                break
+        start, stop = self._range(chosen, x_min, x_max)
+        records = np.array(self.levels[chosen][start:stop])
+        points = records.reshape(-1, 2)
+        return points[:, 0], points[:, 1], chosen
+
+    def points_in_range(self, x_min: float, x_max: float) -> int:
+        """估算可见范围内的原始点数（按第 0 层桶数计算）"""
+        if not self.levels:
+            return 0
+        start, stop = self._range(0, x_min, x_max)
+        return (stop - start) * self.base_bucket
+
+    def full_range(self) -> Tuple[float, float]:
+        """第 0 层覆盖的 x 范围"""
+        if not self.levels:
+            return 0.0, 0.0
+        base = self.levels[0]
+        return float(base[0, 0]), float(max(base[-1, 0], base[-1, 2]))
+
+
+def open_pyramid(directory: str) -> Optional[MinMaxPyramid]:
+    """打开金字塔目录，不存在或损坏时返回 None"""
+    if not os.path.isdir(directory):
+        return None
+    try:
+        return MinMaxPyramid(directory)
+    except Exception as e:
+        logger.warning(f"打开金字塔 {directory} 失败: {e}")
+        return None
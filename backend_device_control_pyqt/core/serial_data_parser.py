@@ -1,5 +1,4 @@
 import numpy as np
-import struct
 
 ########################### 日志设置 ###################################
 from logger_config import get_module_logger
@@ -15,6 +14,20 @@ def ADS_CalVoltage(data):
         voltage = (data / 8388607.0) * 2.048
     return voltage
 
+def ads_voltage_array(current_bytes: np.ndarray) -> np.ndarray:
+    """ADS_CalVoltage 的向量化版本，输入为 (N, 3) 大端 24-bit 原始数据"""
+    raw = (
+        (current_bytes[:, 0].astype(np.int64) << 16)
+        | (current_bytes[:, 1].astype(np.int64) << 8)
+        | current_bytes[:, 2].astype(np.int64)
+    )
+    negative = (raw & 0x00800000) != 0
+    return np.where(
+        negative,
+        (raw - 0x01000000) / 8388608.0 * 2.048,
+        raw / 8388607.0 * 2.048,
+    )
+
 def _strip_trailing_markers(byte_data: bytes, packet_size: int) -> bytes:
     """Remove known end markers and repetitive filler (e.g., FE/FF) that may be appended by firmware."""
     end_sequences = [
@@ -74,43 +87,70 @@ def bytes_to_numpy(byte_data, mode='transient', transimpedance_ohms=100.0, trans
         num_columns = 3 if mode == 'transient' and packet_size == 9 else 2
         return np.zeros((0, num_columns))
 
-    num_entries = len(byte_data) // packet_size
     num_columns = 3 if mode == 'transient' and packet_size == 9 else 2
-    result = np.zeros((num_entries, num_columns))
-
-    for i in range(num_entries):
-        offset = i * packet_size
-
-        if mode == 'transient':
-            ts_bytes = byte_data[offset:offset+4]
-            ts_bytes_swapped = bytes(reversed(ts_bytes))
-            timestamp = struct.unpack('>i', ts_bytes_swapped)[0]
-            if packet_size == 9:
-                vg_bytes = byte_data[offset+4:offset+6]
-                vg_bytes_swapped = bytes(reversed(vg_bytes))
-                gate_voltage = struct.unpack('>h', vg_bytes_swapped)[0] / 1000.0
-                current_bytes = byte_data[offset+6:offset+9]
-            else:
-                gate_voltage = None
-                current_bytes = byte_data[offset+4:offset+7]
-            current_raw = int.from_bytes(b'\x00' + current_bytes, byteorder='big')
-            current_value = - ADS_CalVoltage(current_raw) / transimpedance_ohms
-            result[i, 0] = timestamp / 1000
-            result[i, 1] = current_value - baseline_current
-            if gate_voltage is not None and num_columns > 2:
-                result[i, 2] = gate_voltage
+    num_entries = len(byte_data) // packet_size
+    result = np.empty((num_entries, num_columns))
+
+    # 按包结构直接解析，避免逐包的 Python 循环
+    if mode == 'transient':
+        if packet_size == 9:
+            packet_dtype = np.dtype([('ts', '<i4'), ('vg', '<i2'), ('cur', 'u1', (3,))])
         else:
-            voltage_bytes = byte_data[offset:offset+2]
-            voltage_bytes_swapped = bytes(reversed(voltage_bytes))
-            voltage = struct.unpack('>h', voltage_bytes_swapped)[0]
-            current_bytes = byte_data[offset+2:offset+5]
-            current_raw = int.from_bytes(b'\x00' + current_bytes, byteorder='big')
-            current_value = - ADS_CalVoltage(current_raw) / transimpedance_ohms
-            result[i, 0] = voltage / 1000
-            result[i, 1] = current_value - baseline_current
+            packet_dtype = np.dtype([('ts', '<i4'), ('cur', 'u1', (3,))])
+    else:
+        packet_dtype = np.dtype([('v', '<i2'), ('cur', 'u1', (3,))])
+    packets = np.frombuffer(bytes(byte_data), dtype=packet_dtype, count=num_entries)
+
+    current_value = -ads_voltage_array(packets['cur']) / transimpedance_ohms
+    if mode == 'transient':
+        result[:, 0] = packets['ts'] / 1000
+        result[:, 1] = current_value - baseline_current
+        if num_columns > 2:
+            result[:, 2] = packets['vg'] / 1000.0
+    else:
+        result[:, 0] = packets['v'] / 1000
+        result[:, 1] = current_value - baseline_current
 
     return result
 
+def csv_layout(mode: str, transient_packet_size: int = 7):
+    """返回保存CSV时使用的 (表头, 列格式)"""
+    if mode == 'transient':
+        if transient_packet_size == 9:
+            return "Time,Id,Vg", ['%.3f', '%g', '%.3f']
+        return "Time,Id", ['%.3f', '%g']
+    return "Vg,Id", ['%.3f', '%g']
+
+
+def format_output_csv(parsed_data, gate_voltages) -> bytes:
+    """
+    将各栅压下解析好的 (Vd, Id) 数组合并为输出特性CSV
+
+    Args:
+        parsed_data: {栅压(mV): np.ndarray(N, 2)}
+        gate_voltages: 栅压列表，决定列顺序
+    """
+    if not parsed_data:
+        return b''
+
+    # 漏极电压取第一组数据
+    first_vg = list(parsed_data.keys())[0]
+    drain_voltages = parsed_data[first_vg][:, 0]
+    ordered_vgs = [vg for vg in sorted(gate_voltages) if vg in parsed_data]
+
+    csv_lines = [",".join(["Vd"] + [f"Id(Vg={vg}mV)" for vg in ordered_vgs])]
+    for i, vd in enumerate(drain_voltages):
+        row = [f"{vd:.3f}"]
+        for vg in ordered_vgs:
+            if i < len(parsed_data[vg]):
+                row.append(f"{parsed_data[vg][i, 1]:g}")
+            else:
+                row.append("")  # 数据缺失
+        csv_lines.append(",".join(row))
+
+    return "\n".join(csv_lines).encode('utf-8')
+
+
 def decode_identity_response(byte_data: bytes) -> str:
     """
     解码设备身份字符串，自动去除自定义结束符
@@ -0,0 +1,72 @@
+"""
+步骤日志 - step_log.py
+
+测试进行中只写一次 ``test_info_temp.json``（不含步骤列表），每完成一个步骤向
+``steps.jsonl`` 追加一行步骤信息。测试结束时由 Test.execute 合并写出
+``test_info.json``；若进程中途退出，可用 load_in_progress_test_info 拼出与原
+临时文件相同结构的测试信息。
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+TEMP_INFO_FILENAME = "test_info_temp.json"
+STEP_LOG_FILENAME = "steps.jsonl"
+
+
+def encode_step_entry(step_info: Dict[str, Any]) -> str:
+    """将单个步骤信息编码为一行 JSON（不带换行）"""
+    return json.dumps(step_info, ensure_ascii=False, separators=(",", ":"))
+
+
+def read_step_log(test_dir: str) -> List[Dict[str, Any]]:
+    """读取步骤日志，跳过损坏的行（例如写到一半的最后一行），按步骤序号排序"""
+    path = os.path.join(test_dir, STEP_LOG_FILENAME)
+    steps = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    steps.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"步骤日志 {path} 第 {line_no} 行无法解析，已跳过")
+    except FileNotFoundError:
+        return []
+    steps.sort(key=lambda item: item.get("step_index", 0))
+    return steps
+
+
+def load_in_progress_test_info(test_dir: str) -> Optional[Dict[str, Any]]:
+    """合并 test_info_temp.json 与 steps.jsonl，得到未完成测试的测试信息"""
+    temp_path = os.path.join(test_dir, TEMP_INFO_FILENAME)
+    test_info: Optional[Dict[str, Any]] = None
+    try:
+        with open(temp_path, "r", encoding="utf-8") as f:
+            test_info = json.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"读取 {temp_path} 失败: {e}")
+
+    steps = read_step_log(test_dir)
+    if test_info is None and not steps:
+        return None
+
+    test_info = test_info or {}
+    # 兼容旧版本：临时文件中已包含完整步骤列表
+    if steps or "steps" not in test_info:
+        test_info["steps"] = steps
+    if steps:
+        last = steps[-1]
+        test_info["completed_steps"] = last.get("completed_steps", len(steps))
+        test_info["last_updated"] = last.get("logged_at", test_info.get("last_updated"))
+    return test_info
@@ -0,0 +1,245 @@
+"""
+步骤摘要统计 - step_stats.py
+
+保存进程在写步骤数据时按块增量计算摘要（点数、各列最小/最大值、电流均值和
+标准差、|Id| 最大/最小值与开关比、首末 x 值、用于列表缩略图的 min/max 折线），步骤完成后写到
+``<stem>.stats.json``，并合并进 ``test_info.json`` 对应步骤的 ``stats`` 字段。
+历史页与测试索引直接读取这些字段，无需打开数据文件。
+
+均值/方差按块合并（Chan 等的并行算法），每块开销只与块大小有关；NaN 不参与统计。
+缩略折线保存固定数量的 min/max 桶，桶数超过上限时相邻两桶合并、桶宽加倍。
+"""
+
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+STATS_SUFFIX = ".stats.json"
+SPARKLINE_BUCKETS = 32
+
+
+def stats_path_for(data_path: str) -> str:
+    """根据步骤数据文件路径得到摘要文件路径"""
+    stem, _ = os.path.splitext(data_path)
+    return stem + STATS_SUFFIX
+
+
+def _finite_or_none(value: float) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class _SparklineBuilder:
+    """按到达顺序把一列数据压缩为不超过 2 * buckets 个 min/max 桶"""
+
+    def __init__(self, buckets: int = SPARKLINE_BUCKETS):
+        self.buckets = buckets
+        self.bucket_size = 1
+        self.mins = np.empty(0)
+        self.maxs = np.empty(0)
+        self.pending = np.empty(0)
+
+    def append(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        values = np.concatenate((self.pending, values)) if len(self.pending) else values
+        full = len(values) // self.bucket_size * self.bucket_size
+        if full:
+            groups = values[:full].reshape(-1, self.bucket_size)
+            self.mins = np.concatenate((self.mins, groups.min(axis=1)))
+            self.maxs = np.concatenate((self.maxs, groups.max(axis=1)))
+        self.pending = values[full:]
+        while len(self.mins) > 2 * self.buckets:
+            even = len(self.mins) // 2 * 2
+            leftover = np.concatenate((self.mins[even:], self.maxs[even:], self.pending))
+            self.mins = np.minimum(self.mins[:even:2], self.mins[1:even:2])
+            self.maxs = np.maximum(self.maxs[:even:2], self.maxs[1:even:2])
+            self.bucket_size *= 2
+            # 奇数个桶时最后一桶只保留极值，放回未满的桶中（缩略图只需包络）
+            self.pending = leftover
+
+    def result(self) -> List[float]:
+        """按桶顺序交替排列的 [min0, max0, min1, max1, ...]，保留 4 位有效数字"""
+        mins, maxs = self.mins, self.maxs
+        if len(self.pending):
+            mins = np.append(mins, self.pending.min())
+            maxs = np.append(maxs, self.pending.max())
+        values = np.empty(len(mins) * 2)
+        values[0::2] = mins
+        values[1::2] = maxs
+        return [float(f"{value:.4g}") for value in values]
+
+
+class StepStatsAccumulator:
+    """
+    增量计算单个步骤的摘要统计
+
+    第一列为 x（Time / Vg / Vd），current_columns 指定的列为电流（output 步骤有多列）。
+    """
+
+    def __init__(self, columns: Sequence[str], current_columns: Optional[Sequence[int]] = None):
+        self.columns = list(columns)
+        self.current_columns = list(current_columns) if current_columns is not None else [1]
+        width = len(self.columns)
+        self.count = 0
+        self.col_min = np.full(width, np.inf)
+        self.col_max = np.full(width, -np.inf)
+        self.x_first = None
+        self.x_last = None
+        # 电流列（合并所有电流列）的计数、均值、二阶中心矩
+        self.current_n = 0
+        self.current_mean = 0.0
+        self.current_m2 = 0.0
+        self.abs_max = -np.inf
+        self.abs_min_nonzero = np.inf
+        # 缩略折线取最后一个电流列（output 步骤为最高栅压的曲线）
+        self._sparkline = _SparklineBuilder()
+
+    def append(self, block: np.ndarray):
+        """追加一块 (N, 列数) 数据"""
+        if block is None:
+            return
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim != 2 or len(block) == 0 or block.shape[1] != len(self.columns):
+            return
+        self.count += len(block)
+        nan_mask = np.isnan(block)
+        self.col_min = np.minimum(self.col_min, np.where(nan_mask, np.inf, block).min(axis=0))
+        self.col_max = np.maximum(self.col_max, np.where(nan_mask, -np.inf, block).max(axis=0))
+        x = block[:, 0]
+        valid_x = x[~np.isnan(x)]
+        if len(valid_x):
+            if self.x_first is None:
+                self.x_first = float(valid_x[0])
+            self.x_last = float(valid_x[-1])
+        self._sparkline.append(block[:, self.current_columns[-1]])
+
+        current = block[:, self.current_columns].ravel()
+        current = current[np.isfinite(current)]
+        n = len(current)
+        if n == 0:
+            return
+        mean = float(current.mean())
+        m2 = float(((current - mean) ** 2).sum())
+        total = self.current_n + n
+        delta = mean - self.current_mean
+        self.current_mean += delta * n / total
+        self.current_m2 += m2 + delta * delta * self.current_n * n / total
+        self.current_n = total
+        magnitude = np.abs(current)
+        self.abs_max = max(self.abs_max, float(magnitude.max()))
+        nonzero = magnitude[magnitude > 0]
+        if len(nonzero):
+            self.abs_min_nonzero = min(self.abs_min_nonzero, float(nonzero.min()))
+
+    def result(self) -> Dict[str, Any]:
+        """摘要字典（可直接 JSON 序列化），无效值为 None"""
+        columns = {}
+        for i, name in enumerate(self.columns):
+            columns[name] = {
+                "min": _finite_or_none(self.col_min[i]),
+                "max": _finite_or_none(self.col_max[i]),
+            }
+        current: Dict[str, Any] = {"count": self.current_n}
+        if self.current_n:
+            abs_max = _finite_or_none(self.abs_max)
+            abs_min = _finite_or_none(self.abs_min_nonzero)
+            current.update({
+                "mean": self.current_mean,
+                "std": math.sqrt(self.current_m2 / self.current_n),
+                "abs_max": abs_max,
+                "abs_min": abs_min,
+                "on_off_ratio": abs_max / abs_min if abs_max and abs_min else None,
+            })
+        return {
+            "count": self.count,
+            "x_column": self.columns[0] if self.columns else None,
+            "x_first": self.x_first,
+            "x_last": self.x_last,
+            "columns": columns,
+            "current": current,
+            "sparkline": self._sparkline.result(),
+        }
+
+
+def compute_step_stats(data: np.ndarray, columns: Sequence[str],
+                       current_columns: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+    """一次性计算完整数据的摘要"""
+    accumulator = StepStatsAccumulator(columns, current_columns)
+    accumulator.append(data)
+    return accumulator.result()
+
+
+def write_step_stats(data_path: str, stats: Dict[str, Any]) -> str:
+    """写出摘要文件（先写临时文件再替换），返回摘要文件路径"""
+    path = stats_path_for(data_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_step_stats(data_path: str) -> Optional[Dict[str, Any]]:
+    """读取步骤摘要，不存在或损坏时返回 None"""
+    try:
+        with open(stats_path_for(data_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"读取步骤摘要失败 {data_path}: {e}")
+        return None
+
+
+def merge_step_stats(test_dir: str, test_info: Dict[str, Any], missing_only: bool = False) -> bool:
+    """
+    把目录中已有的步骤摘要合并到 test_info 的各步骤（按 data_file 匹配）
+
+    missing_only=True 时只补充还没有摘要的步骤（索引旧测试时使用，避免逐个读文件）
+
+    Returns:
+        是否有步骤被更新
+    """
+    changed = False
+    for step in test_info.get("steps") or []:
+        if not isinstance(step, dict) or not step.get("data_file"):
+            continue
+        if missing_only and isinstance(step.get("stats"), dict):
+            continue
+        stats = read_step_stats(os.path.join(test_dir, step["data_file"]))
+        if stats is not None and step.get("stats") != stats:
+            step["stats"] = stats
+            changed = True
+    return changed
+
+
+def summarize_steps(steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    汇总测试内各步骤的摘要：总点数、最大 |Id|、最大开关比
+
+    没有任何步骤带摘要时各项为 None（旧数据）
+    """
+    total_points = None
+    abs_max = None
+    on_off = None
+    for step in steps or []:
+        stats = step.get("stats") if isinstance(step, dict) else None
+        if not isinstance(stats, dict):
+            continue
+        total_points = (total_points or 0) + int(stats.get("count") or 0)
+        current = stats.get("current") or {}
+        if current.get("abs_max") is not None:
+            abs_max = max(abs_max, current["abs_max"]) if abs_max is not None else current["abs_max"]
+        if current.get("on_off_ratio") is not None:
+            on_off = max(on_off, current["on_off_ratio"]) if on_off is not None else current["on_off_ratio"]
+    return {"total_points": total_points, "max_abs_current": abs_max, "on_off_ratio": on_off}
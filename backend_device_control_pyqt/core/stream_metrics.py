@@ -0,0 +1,519 @@
+"""
+实时指标 - stream_metrics.py
+
+数据传输进程在转发实时数据的同时，对解码后的数据块增量计算器件指标，按间隔发布
+为紧凑的 ``test_metrics`` 消息，实时页和总览页直接显示，界面端不做逐点计算。
+每块的开销只与块大小有关，不会随步骤累计的点数增长：
+
+- 转移特性：与批量分析相同，电流按 GM_SMOOTH_WINDOW 点滑动平均（逐块衔接）后相邻点
+  差分求跨导，记录正扫/反扫各自的峰值跨导、对应的 Vth（切线外推到 Id = 0），
+  回滞 = Vth(反扫) - Vth(正扫)；折返处的重复点按批量分析的规则分给正扫/反扫；亚阈值摆幅按
+  log10|I| 包络越过各档的 Vg 增量记录，与批量分析用同一亚阈值区和一个 decade 的跨度
+- 瞬态：以各块 P5/P95 的包络为回差阈值（40%/60%）判断高低电平，段（相邻两次跳变之间）
+  结束时处理一次该段数据（段内最多保留 SEGMENT_MAX_POINTS 个点，超出时整体减半抽取，
+  长时间停在同一电平时内存和处理开销不随时长增长）：后半段中位数为稳定电平，时间常数用面积法
+  tau = ∫(I_level - I)dt / (I_level - I_start)（指数响应下与起点无关）；另给出噪声 RMS
+  （一阶差分的 MAD 估计，只取各段第三个四分之一这一稳定区间；第一段结束前暂用整块估计，
+  含跳变的块会偏大）
+
+指标键名与 device_metrics 的批量分析一致；output 步骤不计算。
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend_device_control_pyqt.core.device_metrics import (GM_SMOOTH_WINDOW, SS_FLOOR_POINTS, level_crossings,
+                                                             schmitt_state, subthreshold_floor, swing_from_crossings)
+from backend_device_control_pyqt.core.serial_data_parser import bytes_to_numpy
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+MSG_TEST_METRICS = "test_metrics"
+
+MIN_BRANCH_POINTS = 5  # 与批量分析一致，单向扫描少于该点数时不给出跨导
+MIN_BLOCK_POINTS = 8   # 少于该点数的块不更新包络和噪声
+EDGE_SNR = 10.0        # 包络高度超过噪声 RMS 的倍数后才开始判断跳变
+SEGMENT_MAX_POINTS = 4096  # 瞬态单段保留的最多点数
+_MAD_TO_SIGMA = 1.4826 / math.sqrt(2.0)  # 差分 MAD -> 单点噪声标准差
+
+
+def _finite_or_none(value) -> Optional[float]:
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _diff_noise(y: np.ndarray):
+    """一阶差分的 MAD 估计单点噪声，返回 (方差 * 差分数, 差分数) 便于累计"""
+    diff = np.diff(y)
+    mad = float(np.median(np.abs(diff - np.median(diff))))
+    return (mad * _MAD_TO_SIGMA) ** 2 * len(diff), len(diff)
+
+
+class _SweepBranch:
+    """
+    单向扫描的峰值跨导与亚阈值摆幅
+
+    跨导只保留末尾 GM_SMOOTH_WINDOW - 1 个原始点和上一个平滑点跨块衔接，扫描末端按批量
+    分析的方式用最后一个值补齐后再求（不改变状态，数据继续到来时照常衔接）；亚阈值摆幅按 |I| 上升和下降两个方向记录
+    log10|I| 包络越过各档时的 Vg（与开态电流同号的点），结果按扫描两端的电流判断方向，
+    只用噪声底之上、最大跨导点电流以下的档。
+    """
+
+    def __init__(self):
+        self.points = 0
+        # 尚未平滑的原始点（第一块前按批量分析补齐起点）和上一个平滑点 (Vg, I)
+        self._pending_v = np.empty(0)
+        self._pending_i = np.empty(0)
+        self._last: Optional[tuple] = None
+        self._peak = (0.0, None, None)  # (gm, Vg, I)
+        self._head_i = np.empty(0)
+        self._end_i = np.empty(0)
+        self._abs_max = 0.0
+        self._on_sign = 0.0
+        self._reset_crossings()
+
+    def _reset_crossings(self):
+        self._rise: Dict[int, float] = {}
+        self._rise_state = (-math.inf, None)
+        self._fall: Dict[int, float] = {}
+        self._fall_state = (-math.inf, None)
+
+    def _update_crossings(self, vg: np.ndarray, current: np.ndarray):
+        self._head_i = np.concatenate((self._head_i, current[:SS_FLOOR_POINTS - len(self._head_i)]))
+        self._end_i = np.concatenate((self._end_i, current))[-SS_FLOOR_POINTS:]
+        magnitude = np.abs(current)
+        peak = int(np.argmax(magnitude))
+        if magnitude[peak] > self._abs_max:
+            self._abs_max = float(magnitude[peak])
+            sign = float(np.sign(current[peak]))
+            if sign != self._on_sign:
+                # 开态电流的符号变了（此前只有噪声），已记录的档作废
+                self._on_sign = sign
+                self._reset_crossings()
+        usable = (np.sign(current) == self._on_sign) & (magnitude > 0)
+        log_i = np.log10(np.where(usable, magnitude, 1.0))
+        crossings, envelope, previous = level_crossings(vg, np.where(usable, log_i, -np.inf), *self._rise_state)
+        self._rise.update(crossings)
+        self._rise_state = (envelope, previous)
+        crossings, envelope, previous = level_crossings(vg, np.where(usable, -log_i, -np.inf), *self._fall_state)
+        self._fall.update(crossings)
+        self._fall_state = (envelope, previous)
+
+    @staticmethod
+    def _scan(smooth_v: np.ndarray, smooth_i: np.ndarray, last, peak):
+        """相邻平滑点差分求跨导（跳过 Vg 重复的点），返回新的 (上一个平滑点, 峰值)"""
+        if last is not None:
+            smooth_v = np.concatenate(([last[0]], smooth_v))
+            smooth_i = np.concatenate(([last[1]], smooth_i))
+        if len(smooth_v) == 0:
+            return last, peak
+        last = (float(smooth_v[-1]), float(smooth_i[-1]))
+        dv = np.diff(smooth_v)
+        valid = dv != 0
+        if not np.any(valid):
+            return last, peak
+        gm = np.diff(smooth_i)[valid] / dv[valid]
+        k = int(np.argmax(np.abs(gm)))
+        if abs(gm[k]) > abs(peak[0]):
+            mid_v = ((smooth_v[:-1] + smooth_v[1:]) / 2)[valid]
+            mid_i = ((smooth_i[:-1] + smooth_i[1:]) / 2)[valid]
+            peak = (float(gm[k]), float(mid_v[k]), float(mid_i[k]))
+        return last, peak
+
+    @staticmethod
+    def _smooth(v: np.ndarray, i: np.ndarray):
+        """滑动平均，返回 (各平滑点的 Vg, 平滑电流, 用掉的点数)"""
+        count = len(i) - GM_SMOOTH_WINDOW + 1
+        if count <= 0:
+            return np.empty(0), np.empty(0), 0
+        half = GM_SMOOTH_WINDOW // 2
+        smooth_i = np.convolve(i, np.ones(GM_SMOOTH_WINDOW) / GM_SMOOTH_WINDOW, mode="valid")
+        return v[half:half + count], smooth_i, count
+
+    def append(self, vg: np.ndarray, current: np.ndarray):
+        if len(vg) == 0:
+            return
+        self._update_crossings(vg, current)
+        if self.points == 0:
+            half = GM_SMOOTH_WINDOW // 2
+            self._pending_v = np.full(half, np.nan)
+            self._pending_i = np.full(half, float(current[0]))
+        self.points += len(vg)
+        v = np.concatenate((self._pending_v, vg))
+        i = np.concatenate((self._pending_i, current))
+        smooth_v, smooth_i, used = self._smooth(v, i)
+        self._pending_v, self._pending_i = v[used:], i[used:]
+        self._last, self._peak = self._scan(smooth_v, smooth_i, self._last, self._peak)
+
+    def peak(self):
+        """峰值跨导 (gm, Vg, I)，末端按最后一个值补齐后计入；点数不足时 gm 为 0"""
+        if self.points < MIN_BRANCH_POINTS:
+            return 0.0, None, None
+        pad = GM_SMOOTH_WINDOW - 1 - GM_SMOOTH_WINDOW // 2
+        v = np.concatenate((self._pending_v, np.full(pad, np.nan)))
+        i = np.concatenate((self._pending_i, np.full(pad, self._pending_i[-1])))
+        smooth_v, smooth_i, _ = self._smooth(v, i)
+        _, peak = self._scan(smooth_v, smooth_i, self._last, self._peak)
+        return peak
+
+    @staticmethod
+    def vth(peak) -> Optional[float]:
+        gm, vg_at_gm, i_at_gm = peak
+        if gm == 0 or vg_at_gm is None:
+            return None
+        return _finite_or_none(vg_at_gm - i_at_gm / gm)
+
+    def subthreshold_swing(self, peak) -> Optional[float]:
+        i_at_gm = peak[2]
+        if not i_at_gm or len(self._head_i) == 0:
+            return None
+        floor = subthreshold_floor(self._head_i, self._end_i)
+        lower = math.log10(floor) if floor > 0 else -math.inf
+        upper = math.log10(abs(i_at_gm))
+        if np.median(np.abs(self._head_i)) > np.median(np.abs(self._end_i)):
+            # 从开态扫向关态：-log10|I| 的包络
+            return swing_from_crossings(self._fall, -upper, -lower)
+        return swing_from_crossings(self._rise, lower, upper)
+
+
+class TransferStreamMetrics:
+    """转移特性的增量指标；扫描离起点的距离开始减小时切换到反扫"""
+
+    def __init__(self):
+        self.points = 0
+        self._v0 = None
+        self._max_dist = 0.0
+        self._turned = False
+        # 正扫中在最远点停留、尚未确定归属的样本，以及正扫最后到达的最远点
+        self._held_v = np.empty(0)
+        self._held_i = np.empty(0)
+        self._extreme = None
+        self._forward = _SweepBranch()
+        self._backward = _SweepBranch()
+        self._abs_max = 0.0
+        self._abs_min = math.inf
+
+    def append(self, block: np.ndarray):
+        vg, current = block[:, 0], block[:, 1]
+        finite = np.isfinite(vg) & np.isfinite(current)
+        vg, current = vg[finite], current[finite]
+        if len(vg) == 0:
+            return
+        self.points += len(vg)
+        magnitude = np.abs(current)
+        self._abs_max = max(self._abs_max, float(magnitude.max()))
+        nonzero = magnitude[magnitude > 0]
+        if len(nonzero):
+            self._abs_min = min(self._abs_min, float(nonzero.min()))
+
+        if self._v0 is None:
+            self._v0 = float(vg[0])
+        if self._turned:
+            self._backward.append(vg, current)
+            return
+        # 与批量分析一致：第一次到达最远点的样本属于正扫，在最远点停留的后续样本不属于正扫，
+        # 其中最后一个作为反扫起点；之后若又走得更远，停留的样本仍归正扫
+        dist = np.abs(vg - self._v0)
+        before = np.maximum.accumulate(np.concatenate(([self._max_dist], dist)))[:-1]
+        turning = np.flatnonzero(dist < before)
+        split = int(turning[0]) if len(turning) else len(vg)
+        farther = np.flatnonzero(dist[:split] > before[:split])
+        if len(farther):
+            stop = int(farther[-1]) + 1
+            self._forward.append(np.concatenate((self._held_v, vg[:stop])),
+                                 np.concatenate((self._held_i, current[:stop])))
+            self._extreme = (float(vg[stop - 1]), float(current[stop - 1]))
+            self._max_dist = float(dist[stop - 1])
+            self._held_v, self._held_i = vg[stop:split], current[stop:split]
+        else:
+            self._held_v = np.concatenate((self._held_v, vg[:split]))
+            self._held_i = np.concatenate((self._held_i, current[:split]))
+        if split < len(vg):
+            self._turned = True
+            start_v, start_i = ((self._held_v[-1], self._held_i[-1]) if len(self._held_v)
+                                else self._extreme)
+            self._backward.append(np.concatenate(([start_v], vg[split:])),
+                                  np.concatenate(([start_i], current[split:])))
+            self._held_v, self._held_i = np.empty(0), np.empty(0)
+
+    def result(self) -> Dict[str, Any]:
+        forward_peak = self._forward.peak()
+        forward_vth = _SweepBranch.vth(forward_peak)
+        backward_vth = _SweepBranch.vth(self._backward.peak())
+        i_on = self._abs_max if self._abs_max > 0 else None
+        i_off = self._abs_min if math.isfinite(self._abs_min) else None
+        return {
+            "points": self.points,
+            "vth": forward_vth,
+            "gm_max": abs(forward_peak[0]) if forward_peak[0] else None,
+            "vg_at_gm_max": forward_peak[1],
+            "subthreshold_swing": self._forward.subthreshold_swing(forward_peak),
+            "hysteresis": (backward_vth - forward_vth
+                           if backward_vth is not None and forward_vth is not None else None),
+            "i_on": i_on,
+            "i_off": i_off,
+            "on_off_ratio": i_on / i_off if i_on and i_off else None,
+        }
+
+
+class TransientStreamMetrics:
+    """瞬态的增量指标：逐段（高/低电平）累计，段结束时得到该段的电平和时间常数"""
+
+    def __init__(self):
+        self.points = 0
+        self.cycles = 0
+        self._low = math.inf
+        self._high = -math.inf
+        # 噪声：整块估计（只在第一段结束前使用）与各段稳定区间的估计
+        self._noise_sq = 0.0
+        self._noise_n = 0
+        self._settled_noise_sq = 0.0
+        self._settled_noise_n = 0
+        self._state: Optional[bool] = None
+        # 当前段：是否从跳变开始，以及段内各块的数据（按 _seg_stride 抽取，段结束时处理一次后释放）
+        self._start_segment(from_edge=False)
+        self.i_high = None
+        self.i_low = None
+        self.tau_rise = None
+        self.tau_fall = None
+
+    @property
+    def noise_rms(self) -> Optional[float]:
+        if self._settled_noise_n:
+            return math.sqrt(self._settled_noise_sq / self._settled_noise_n)
+        return math.sqrt(self._noise_sq / self._noise_n) if self._noise_n else None
+
+    def append(self, block: np.ndarray):
+        t, y = block[:, 0], block[:, 1]
+        finite = np.isfinite(t) & np.isfinite(y)
+        t, y = t[finite], y[finite]
+        if len(t) == 0:
+            return
+        self.points += len(t)
+        if len(y) >= MIN_BLOCK_POINTS:
+            low, high = np.percentile(y, [5, 95])
+            self._low = min(self._low, float(low))
+            self._high = max(self._high, float(high))
+            noise_sq, noise_n = _diff_noise(y)
+            self._noise_sq += noise_sq
+            self._noise_n += noise_n
+
+        span = self._high - self._low
+        noise = self.noise_rms
+        if not (span > 0 and noise is not None and span > EDGE_SNR * noise):
+            # 还没见到明显的电平变化，噪声会被误判为跳变
+            if self._state is not None:
+                self._extend_segment(t, y, 0, len(t))
+            return
+
+        state = schmitt_state(y, self._low + 0.4 * span, self._low + 0.6 * span, self._state)
+        if self._state is None:
+            self._start_segment(from_edge=False)
+        elif bool(state[0]) != self._state:
+            self._close_segment()
+            self._start_segment(from_edge=True)
+        self._state = bool(state[0])
+
+        edges = np.flatnonzero(state[1:] != state[:-1]) + 1
+        start = 0
+        for edge in edges:
+            self._extend_segment(t, y, start, int(edge))
+            self._close_segment()
+            self._start_segment(from_edge=True)
+            self._state = bool(state[edge])
+            start = int(edge)
+        self._extend_segment(t, y, start, len(t))
+
+    def _start_segment(self, from_edge: bool):
+        self._seg_from_edge = from_edge
+        self._seg_t: List[np.ndarray] = []
+        self._seg_y: List[np.ndarray] = []
+        self._seg_count = 0
+        self._seg_stride = 1
+        self._seg_offset = 0  # 下一个保留点在后续原始点中的位置
+
+    def _extend_segment(self, t, y, start, stop):
+        if stop <= start:
+            return
+        first = start + self._seg_offset
+        self._seg_offset = (self._seg_offset - (stop - start)) % self._seg_stride
+        if first >= stop:
+            return
+        self._seg_t.append(t[first:stop:self._seg_stride])
+        self._seg_y.append(y[first:stop:self._seg_stride])
+        self._seg_count += len(self._seg_t[-1])
+        if self._seg_count > SEGMENT_MAX_POINTS:
+            # 保留偶数位置的点，间隔加倍；点数为奇数时下一个保留点顺延一个旧间隔
+            if self._seg_count % 2:
+                self._seg_offset += self._seg_stride
+            self._seg_t = [np.concatenate(self._seg_t)[::2]]
+            self._seg_y = [np.concatenate(self._seg_y)[::2]]
+            self._seg_count = len(self._seg_t[0])
+            self._seg_stride *= 2
+
+    def _close_segment(self):
+        """
+        当前段结束：记录该段电平和时间常数（低电平段结束即一次上升跳变，计为一个周期）
+
+        电平取后半段的中位数；段末已包含下一次跳变的开头，积分只取前半段；
+        噪声取第三个四分之一（已稳定、下一次跳变尚未开始）。
+        """
+        if not self._seg_y:
+            return
+        t = np.concatenate(self._seg_t)
+        y = np.concatenate(self._seg_y)
+        self._seg_t, self._seg_y = [], []
+        level = float(np.median(y[len(y) // 2:]))
+        settled = y[len(y) // 2:3 * len(y) // 4]
+        if len(settled) >= MIN_BLOCK_POINTS:
+            noise_sq, noise_n = _diff_noise(settled)
+            self._settled_noise_sq += noise_sq
+            self._settled_noise_n += noise_n
+        if self._state:
+            self.i_high = level
+        else:
+            self.i_low = level
+            self.cycles += 1
+        half = len(y) // 2
+        if not self._seg_from_edge or half < 2:
+            return
+        amplitude = level - y[0]
+        if amplitude == 0:
+            return
+        area = float(np.sum((2 * level - y[1:half] - y[:half - 1]) * np.diff(t[:half])) / 2)
+        tau = _finite_or_none(area / amplitude)
+        if tau is not None and 0 < tau < t[half - 1] - t[0]:
+            if self._state:
+                self.tau_rise = tau
+            else:
+                self.tau_fall = tau
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "points": self.points,
+            "cycles": self.cycles,
+            "i_high": self.i_high,
+            "i_low": self.i_low,
+            "on_off_ratio": abs(self.i_high / self.i_low) if self.i_high is not None and self.i_low else None,
+            "tau_rise": self.tau_rise,
+            "tau_fall": self.tau_fall,
+            "noise_rms": self.noise_rms,
+        }
+
+
+_ACCUMULATORS = {
+    "transfer": TransferStreamMetrics,
+    "transient": TransientStreamMetrics,
+}
+
+
+def _packet_size(step_type: str, workflow_info: Dict[str, Any]) -> int:
+    if step_type != "transient":
+        return 5
+    try:
+        packet_size = int(workflow_info.get("transient_packet_size", 7))
+    except (TypeError, ValueError):
+        return 7
+    return packet_size if packet_size in (7, 9) else 7
+
+
+def decode_stream_block(message: Dict[str, Any]) -> Optional[np.ndarray]:
+    """把一条 test_data 消息解码为 (N, 2) 的 [x, Id]；output 或无法解码时返回 None"""
+    step_type = message.get("step_type")
+    data = message.get("data")
+    if step_type not in _ACCUMULATORS or not data:
+        return None
+    if isinstance(data, str):
+        data = bytes.fromhex(data.replace(" ", ""))
+    workflow_info = message.get("workflow_info") or {}
+    packet_size = _packet_size(step_type, workflow_info)
+    # 块末的不完整包直接丢弃（结束标识被截短后仍按整包识别并去除）
+    data = bytes(data[:len(data) - len(data) % packet_size])
+    block = bytes_to_numpy(
+        data,
+        mode="transient" if step_type == "transient" else "transfer",
+        transimpedance_ohms=workflow_info.get("transimpedance_ohms", 100.0),
+        transient_packet_size=packet_size,
+        baseline_current=workflow_info.get("baseline_current", 0.0),
+    )[:, :2]
+    if step_type == "transfer":
+        # 与界面解码一致：过滤 |V|>5V、|I|>1A 的异常点
+        block = block[(np.abs(block[:, 0]) <= 5.0) & (np.abs(block[:, 1]) <= 1.0)]
+    return block
+
+
+class StreamMetricsTracker:
+    """
+    按测试维护当前步骤的增量指标
+
+    feed() 每收到一块数据更新一次，距上次发布超过 interval_sec 时返回新的 test_metrics
+    消息；步骤切换或测试结束时发布上一步骤的最终结果（final = True）。
+    """
+
+    def __init__(self, interval_sec: float = 0.5):
+        self.interval_sec = interval_sec
+        self._tests: Dict[str, Dict[str, Any]] = {}
+
+    def feed(self, message: Dict[str, Any]) -> List[Dict[str, Any]]:
+        test_id = message.get("test_id")
+        step_type = message.get("step_type")
+        if not test_id:
+            return []
+        workflow_info = message.get("workflow_info") or {}
+        step_key = (workflow_info.get("step_index", -1), step_type, workflow_info.get("path_readable", ""))
+        published = []
+        state = self._tests.get(test_id)
+        if state is None or state["step_key"] != step_key:
+            if state is not None:
+                published.extend(self._publish(test_id, state, final=True))
+            accumulator = _ACCUMULATORS.get(step_type)
+            state = {
+                "step_key": step_key,
+                "step_type": step_type,
+                "device_id": message.get("device_id"),
+                "workflow_info": {"step_index": step_key[0], "path_readable": step_key[2]},
+                "metrics": accumulator() if accumulator else None,
+                "last_publish": 0.0,
+                "dirty": False,
+            }
+            self._tests[test_id] = state
+        if state["metrics"] is None:
+            return published
+
+        block = decode_stream_block(message)
+        if block is None or len(block) == 0:
+            return published
+        state["metrics"].append(block)
+        state["dirty"] = True
+        if time.time() - state["last_publish"] >= self.interval_sec:
+            published.extend(self._publish(test_id, state, final=False))
+        return published
+
+    def finish(self, test_id: str) -> List[Dict[str, Any]]:
+        """测试结束：发布最后一个步骤的最终结果并释放状态"""
+        state = self._tests.pop(test_id, None)
+        return self._publish(test_id, state, final=True) if state is not None else []
+
+    def _publish(self, test_id: str, state: Dict[str, Any], final: bool) -> List[Dict[str, Any]]:
+        if state["metrics"] is None or not (state["dirty"] or final) or state["metrics"].points == 0:
+            return []
+        state["dirty"] = False
+        state["last_publish"] = time.time()
+        return [{
+            "type": MSG_TEST_METRICS,
+            "test_id": test_id,
+            "device_id": state["device_id"],
+            "step_type": state["step_type"],
+            "workflow_info": state["workflow_info"],
+            "metrics": state["metrics"].result(),
+            "final": final,
+            "timestamp": state["last_publish"],
+        }]
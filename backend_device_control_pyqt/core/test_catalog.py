@@ -0,0 +1,638 @@
+"""
+测试目录索引 - test_catalog.py
+
+把 ``UserData/AutoSave/<device>/<test>/`` 下各测试的元数据（设备、芯片ID、器件编号、
+类型、时间、状态、步骤文件及大小）保存在 SQLite 数据库中，列出历史测试时不再逐个
+解析 ``test_info.json``：
+- 保存进程写完 ``test_info.json`` 后调用 index_test_dir 更新对应行
+- reconcile() 按设备目录的 mtime 增量发现新增/删除的测试目录；尚未稳定的行
+  （进行中、刚完成可能还有文件在写）每次重新索引，稳定后不再访问磁盘
+- 数据库使用 WAL 模式，保存进程与界面进程可同时读写
+- query_tests() 在索引上完成过滤、多级排序和分页，历史页只取当前页
+- 步骤摘要统计（点数、最大 |Id|、开关比，保存时写入 test_info.json）同样入库，
+  可直接按其排序和过滤
+- 批量分析结果（analysis.json 中的 Vth、gm、SS、回滞、时间常数汇总）同样入库；
+  分析完成后需对相应目录调用 index_test_dir
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend_device_control_pyqt.core.batch_analytics import SUMMARY_FIELDS, read_analysis
+from backend_device_control_pyqt.core.step_log import TEMP_INFO_FILENAME, load_in_progress_test_info
+from backend_device_control_pyqt.core.step_stats import merge_step_stats, summarize_steps
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+DEFAULT_BASE_DIR = "UserData/AutoSave"
+DEFAULT_CATALOG_PATH = "UserData/test_catalog.db"
+INFO_FILENAME = "test_info.json"
+SCHEMA_VERSION = 5
+# 测试完成后目录内文件在这段时间内没有变化，才认为索引稳定
+SETTLE_SEC = 5.0
+# 未结束（进行中或中途退出）的测试目录这么久没有变化也视为稳定，之后只在目录 mtime 变化时重新索引
+IDLE_SETTLE_SEC = 300.0
+TERMINAL_STATUSES = ("completed", "stopped", "error")
+PENDING_STATUS = "pending"
+# 测试列表每个测试最多显示的步骤缩略图数
+MAX_LIST_SPARKLINES = 12
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tests (
+    dir_path TEXT PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    test_id TEXT,
+    test_type TEXT,
+    name TEXT,
+    description TEXT,
+    chip_id TEXT,
+    device_number TEXT,
+    created_at TEXT,
+    created_ts REAL DEFAULT 0,
+    completed_at TEXT,
+    status TEXT,
+    step_count INTEGER DEFAULT 0,
+    step_types TEXT,
+    files_json TEXT,
+    total_bytes INTEGER DEFAULT 0,
+    total_points INTEGER,
+    max_abs_current REAL,
+    on_off_ratio REAL,
+    step_stats_json TEXT,
+    vth REAL,
+    gm_max REAL,
+    subthreshold_swing REAL,
+    hysteresis REAL,
+    tau_rise REAL,
+    tau_fall REAL,
+    dir_mtime REAL,
+    indexed_at REAL,
+    settled INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tests_device ON tests(device_id);
+CREATE INDEX IF NOT EXISTS idx_tests_created ON tests(created_ts);
+CREATE INDEX IF NOT EXISTS idx_tests_chip ON tests(chip_id COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_tests_device_number ON tests(device_number COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_tests_type ON tests(test_type);
+CREATE INDEX IF NOT EXISTS idx_tests_settled ON tests(settled);
+CREATE INDEX IF NOT EXISTS idx_tests_points ON tests(total_points);
+CREATE INDEX IF NOT EXISTS idx_tests_max_current ON tests(max_abs_current);
+CREATE INDEX IF NOT EXISTS idx_tests_on_off ON tests(on_off_ratio);
+CREATE INDEX IF NOT EXISTS idx_tests_vth ON tests(vth);
+CREATE INDEX IF NOT EXISTS idx_tests_gm ON tests(gm_max);
+CREATE INDEX IF NOT EXISTS idx_tests_ss ON tests(subthreshold_swing);
+CREATE INDEX IF NOT EXISTS idx_tests_hysteresis ON tests(hysteresis);
+CREATE INDEX IF NOT EXISTS idx_tests_tau_rise ON tests(tau_rise);
+CREATE INDEX IF NOT EXISTS idx_tests_tau_fall ON tests(tau_fall);
+CREATE TABLE IF NOT EXISTS device_dirs (
+    device_id TEXT PRIMARY KEY,
+    dir_mtime REAL
+);
+"""
+
+# 批量分析（analysis.json）的测试级汇总，列名与 SUMMARY_FIELDS 的键一致
+ANALYSIS_COLUMNS = tuple(SUMMARY_FIELDS)
+
+_LIST_COLUMNS = ("dir_path", "device_id", "test_id", "test_type", "name", "description",
+                 "chip_id", "device_number", "created_at", "completed_at", "status",
+                 "step_count", "step_types", "files_json", "total_bytes",
+                 "total_points", "max_abs_current", "on_off_ratio", "step_stats_json") + ANALYSIS_COLUMNS
+
+# 排序键（与历史页的排序块一致）到列的映射
+SORT_COLUMNS = {
+    "time": "created_ts",
+    "name": "name COLLATE NOCASE",
+    "device": "device_id COLLATE NOCASE",
+    "chip_id": "chip_id COLLATE NOCASE",
+    "device_number": "device_number COLLATE NOCASE",
+    "description": "description COLLATE NOCASE",
+    "points": "total_points",
+    "max_current": "max_abs_current",
+    "on_off_ratio": "on_off_ratio",
+    "vth": "vth",
+    "gm_max": "gm_max",
+    "ss": "subthreshold_swing",
+    "hysteresis": "hysteresis",
+    "tau_rise": "tau_rise",
+    "tau_fall": "tau_fall",
+}
+# 按步骤摘要的范围过滤：过滤键 -> (列, 比较符)
+RANGE_FILTERS = {
+    "points_min": ("total_points", ">="),
+    "points_max": ("total_points", "<="),
+    "max_current_min": ("max_abs_current", ">="),
+    "max_current_max": ("max_abs_current", "<="),
+    "on_off_ratio_min": ("on_off_ratio", ">="),
+    "on_off_ratio_max": ("on_off_ratio", "<="),
+    "vth_min": ("vth", ">="),
+    "vth_max": ("vth", "<="),
+    "gm_max_min": ("gm_max", ">="),
+    "gm_max_max": ("gm_max", "<="),
+    "ss_min": ("subthreshold_swing", ">="),
+    "ss_max": ("subthreshold_swing", "<="),
+    "hysteresis_min": ("hysteresis", ">="),
+    "hysteresis_max": ("hysteresis", "<="),
+    "tau_rise_min": ("tau_rise", ">="),
+    "tau_rise_max": ("tau_rise", "<="),
+    "tau_fall_min": ("tau_fall", ">="),
+    "tau_fall_max": ("tau_fall", "<="),
+}
+DEFAULT_SORT = (("time", False),)
+# 搜索框中的指标表达式（如 "vth>0.2 gm>=1e-3"）：名称 -> RANGE_FILTERS 键前缀
+RANGE_ALIASES = {
+    "points": "points",
+    "imax": "max_current",
+    "max_current": "max_current",
+    "on_off": "on_off_ratio",
+    "on_off_ratio": "on_off_ratio",
+    "vth": "vth",
+    "gm": "gm_max",
+    "gm_max": "gm_max",
+    "ss": "ss",
+    "hyst": "hysteresis",
+    "hysteresis": "hysteresis",
+    "tau_rise": "tau_rise",
+    "tau_fall": "tau_fall",
+}
+_RANGE_EXPRESSION = re.compile(r"^([A-Za-z_]+)(<=|>=|<|>|=)([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)$")
+
+
+def _parse_timestamp(value: Any) -> float:
+    """ISO 时间字符串或数值转换为时间戳，无法解析时为 0"""
+    if value is None or value == "":
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _step_types(test_info: Dict[str, Any], files: List[Dict[str, Any]]) -> List[str]:
+    """测试包含的步骤类型；步骤列表缺失时从文件名 <序号>_<类型>.csv 推断"""
+    types = [step.get("type") for step in (test_info.get("steps") or []) if isinstance(step, dict)]
+    if not any(types):
+        types = [os.path.splitext(item["name"])[0].split("_", 1)[-1] for item in files]
+    return sorted({t for t in types if t})
+
+
+def _compact_step_stats(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """列表显示用的精简步骤摘要：文件、类型、点数、最大 |Id|、开关比，前几个步骤带缩略折线"""
+    compact = []
+    for step in steps or []:
+        stats = step.get("stats") if isinstance(step, dict) else None
+        if not isinstance(stats, dict):
+            continue
+        current = stats.get("current") or {}
+        entry = {
+            "data_file": step.get("data_file"),
+            "type": step.get("type"),
+            "count": stats.get("count"),
+            "abs_max": current.get("abs_max"),
+            "on_off_ratio": current.get("on_off_ratio"),
+        }
+        if len(compact) < MAX_LIST_SPARKLINES and stats.get("sparkline"):
+            entry["sparkline"] = stats["sparkline"]
+        compact.append(entry)
+    return compact
+
+
+def _read_test_info(test_dir: str) -> Optional[Dict[str, Any]]:
+    """读取 test_info.json；测试未完成时退回临时信息"""
+    info_path = os.path.join(test_dir, INFO_FILENAME)
+    try:
+        with open(info_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"读取 {info_path} 失败: {e}")
+    if os.path.exists(os.path.join(test_dir, TEMP_INFO_FILENAME)):
+        return load_in_progress_test_info(test_dir)
+    return None
+
+
+def _scan_files(test_dir: str):
+    """列出目录中的步骤数据文件，返回 (文件列表, 总字节数, 最近修改时间)"""
+    files = []
+    total = 0
+    latest = 0.0
+    with os.scandir(test_dir) as entries:
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            latest = max(latest, stat.st_mtime)
+            if entry.is_file() and entry.name.endswith(".csv"):
+                files.append({"name": entry.name, "size": stat.st_size})
+                total += stat.st_size
+    files.sort(key=lambda item: item["name"])
+    return files, total, latest
+
+
+class TestCatalog:
+    """已保存测试的 SQLite 索引，连接可在多线程间共享（内部加锁）"""
+
+    def __init__(self, db_path: str = DEFAULT_CATALOG_PATH, base_dir: str = DEFAULT_BASE_DIR):
+        self.db_path = db_path
+        self.base_dir = base_dir
+        self._lock = threading.RLock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=10.0, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                # 索引可随时从磁盘重建，结构变化时直接丢弃
+                self._conn.executescript("DROP TABLE IF EXISTS tests; DROP TABLE IF EXISTS device_dirs;")
+                self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def _row_for_dir(self, test_dir: str, device_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            dir_mtime = os.stat(test_dir).st_mtime
+            files, total_bytes, latest = _scan_files(test_dir)
+        except OSError:
+            return None
+        test_info = _read_test_info(test_dir)
+        if test_info is None:
+            # 目录刚创建、信息文件还没写出：先占位，之后 reconcile 会重新索引
+            test_info = {"status": PENDING_STATUS}
+        metadata = test_info.get("metadata") or {}
+        if not isinstance(metadata, dict):
+            metadata = {}
+        status = test_info.get("status") or ("completed" if test_info.get("completed_at") else "in_progress")
+        now = time.time()
+        step_types = _step_types(test_info, files)
+        settle_sec = SETTLE_SEC if status in TERMINAL_STATUSES else IDLE_SETTLE_SEC
+        settled = now - max(latest, dir_mtime) >= settle_sec
+        # 旧测试的摘要由后台补算后写在 <stem>.stats.json 中，test_info.json 保持不变
+        merge_step_stats(test_dir, test_info, missing_only=True)
+        steps = test_info.get("steps") or []
+        summary = summarize_steps(steps)
+        step_stats = _compact_step_stats(steps)
+        analysis = read_analysis(test_dir) or {}
+        analysis_summary = analysis.get("summary") or {}
+        row = {
+            "dir_path": os.path.normpath(test_dir),
+            "device_id": device_id,
+            "test_id": test_info.get("test_id", "unknown"),
+            "test_type": test_info.get("test_type", "unknown"),
+            "name": test_info.get("name", "未命名"),
+            "description": test_info.get("description", ""),
+            "chip_id": str(metadata.get("chip_id", "") or ""),
+            "device_number": str(metadata.get("device_number", "") or ""),
+            "created_at": test_info.get("created_at", ""),
+            "created_ts": _parse_timestamp(test_info.get("created_at")),
+            "completed_at": test_info.get("completed_at", ""),
+            "status": status,
+            "step_count": len(test_info.get("steps") or []),
+            # 前后加逗号，便于用 LIKE '%,type,%' 精确匹配
+            "step_types": "," + ",".join(step_types) + "," if step_types else "",
+            "files_json": json.dumps(files, ensure_ascii=False),
+            "total_bytes": total_bytes,
+            "total_points": summary["total_points"],
+            "max_abs_current": summary["max_abs_current"],
+            "on_off_ratio": summary["on_off_ratio"],
+            "step_stats_json": json.dumps(step_stats, ensure_ascii=False) if step_stats else None,
+            "dir_mtime": dir_mtime,
+            "indexed_at": now,
+            "settled": 1 if settled else 0,
+        }
+        for column in ANALYSIS_COLUMNS:
+            row[column] = analysis_summary.get(column)
+        return row
+
+    def _upsert(self, row: Dict[str, Any]):
+        columns = ", ".join(row.keys())
+        placeholders = ", ".join("?" for _ in row)
+        self._conn.execute(f"INSERT OR REPLACE INTO tests ({columns}) VALUES ({placeholders})",
+                           tuple(row.values()))
+
+    def index_test_dir(self, test_dir: str, device_id: Optional[str] = None) -> bool:
+        """
+        索引（或重新索引）单个测试目录
+
+        Args:
+            test_dir: 测试目录
+            device_id: 设备ID，缺省取上级目录名
+
+        Returns:
+            是否写入了索引
+        """
+        if device_id is None:
+            device_id = os.path.basename(os.path.dirname(os.path.normpath(test_dir)))
+        row = self._row_for_dir(test_dir, device_id)
+        with self._lock:
+            if row is None:
+                self._conn.execute("DELETE FROM tests WHERE dir_path = ?", (os.path.normpath(test_dir),))
+            else:
+                self._upsert(row)
+            self._conn.commit()
+        return row is not None
+
+    def remove_test_dir(self, test_dir: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM tests WHERE dir_path = ?", (os.path.normpath(test_dir),))
+            self._conn.commit()
+
+    def reconcile(self) -> int:
+        """
+        与磁盘同步：只扫描 mtime 变化的设备目录，重新索引尚未稳定的测试，以及目录
+        mtime 有变化的已闲置未结束测试
+
+        Returns:
+            重新索引的测试数
+        """
+        if not os.path.isdir(self.base_dir):
+            return 0
+        updated = 0
+        with self._lock:
+            known_devices = {row["device_id"]: row["dir_mtime"]
+                             for row in self._conn.execute("SELECT device_id, dir_mtime FROM device_dirs")}
+            seen_devices = set()
+            fresh = set()  # 本次刚建索引的目录，不再重复索引
+            with os.scandir(self.base_dir) as entries:
+                device_entries = [entry for entry in entries if entry.is_dir()]
+            for entry in device_entries:
+                device_id = entry.name
+                seen_devices.add(device_id)
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if known_devices.get(device_id) == mtime:
+                    continue
+                added = self._sync_device(device_id, entry.path)
+                fresh.update(added)
+                updated += len(added)
+                self._conn.execute("INSERT OR REPLACE INTO device_dirs (device_id, dir_mtime) VALUES (?, ?)",
+                                   (device_id, mtime))
+
+            for device_id in set(known_devices) - seen_devices:
+                self._conn.execute("DELETE FROM tests WHERE device_id = ?", (device_id,))
+                self._conn.execute("DELETE FROM device_dirs WHERE device_id = ?", (device_id,))
+
+            # 进行中或刚完成的测试每次重新索引，直到稳定
+            pending = [(row["dir_path"], row["device_id"]) for row in
+                       self._conn.execute("SELECT dir_path, device_id FROM tests WHERE settled = 0")]
+            # 已闲置的未结束测试：目录 mtime 变化（新步骤文件、写出 test_info.json 等）时才重新索引
+            idle = self._conn.execute(
+                f"SELECT dir_path, device_id, dir_mtime FROM tests WHERE settled = 1 AND status NOT IN "
+                f"({', '.join('?' for _ in TERMINAL_STATUSES)})", TERMINAL_STATUSES).fetchall()
+            for row in idle:
+                try:
+                    changed = os.stat(row["dir_path"]).st_mtime != row["dir_mtime"]
+                except OSError:
+                    changed = True
+                if changed:
+                    pending.append((row["dir_path"], row["device_id"]))
+            for dir_path, device_id in pending:
+                if dir_path in fresh:
+                    continue
+                row = self._row_for_dir(dir_path, device_id)
+                if row is None:
+                    self._conn.execute("DELETE FROM tests WHERE dir_path = ?", (dir_path,))
+                else:
+                    self._upsert(row)
+                    updated += 1
+            self._conn.commit()
+        if updated:
+            logger.debug(f"测试索引更新 {updated} 条")
+        return updated
+
+    def _sync_device(self, device_id: str, device_dir: str) -> List[str]:
+        """设备目录有变化：新增的测试目录建索引，已消失的删除；返回新增的目录"""
+        indexed = {row["dir_path"] for row in
+                   self._conn.execute("SELECT dir_path FROM tests WHERE device_id = ?", (device_id,))}
+        on_disk = set()
+        added = []
+        with os.scandir(device_dir) as entries:
+            test_dirs = [os.path.normpath(entry.path) for entry in entries if entry.is_dir()]
+        for test_dir in test_dirs:
+            on_disk.add(test_dir)
+            if test_dir in indexed:
+                continue
+            row = self._row_for_dir(test_dir, device_id)
+            if row is not None:
+                self._upsert(row)
+                added.append(test_dir)
+        for dir_path in indexed - on_disk:
+            self._conn.execute("DELETE FROM tests WHERE dir_path = ?", (dir_path,))
+        return added
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _row_to_test(row: sqlite3.Row) -> Dict[str, Any]:
+        """转换为 list_saved_tests 的条目格式，附带列表显示与排序所需的精简 test_info"""
+        try:
+            files = json.loads(row["files_json"] or "[]")
+        except ValueError:
+            files = []
+        try:
+            step_stats = json.loads(row["step_stats_json"] or "[]")
+        except ValueError:
+            step_stats = []
+        return {
+            "device_id": row["device_id"],
+            "test_id": row["test_id"],
+            "test_type": row["test_type"],
+            "name": row["name"],
+            "description": row["description"] or "",
+            "created_at": row["created_at"] or "",
+            "completed_at": row["completed_at"] or "",
+            "status": row["status"],
+            "dir_path": row["dir_path"],
+            "step_count": row["step_count"],
+            "step_types": [t for t in (row["step_types"] or "").split(",") if t],
+            "total_bytes": row["total_bytes"],
+            "files": files,
+            "total_points": row["total_points"],
+            "max_abs_current": row["max_abs_current"],
+            "on_off_ratio": row["on_off_ratio"],
+            "step_stats": step_stats,
+            "analysis": {column: row[column] for column in ANALYSIS_COLUMNS},
+            "test_info": {
+                "description": row["description"] or "",
+                "status": row["status"],
+                "metadata": {
+                    "chip_id": row["chip_id"] or "",
+                    "device_number": row["device_number"] or "",
+                },
+            },
+        }
+
+    def get_test(self, test_dir: str) -> Optional[Dict[str, Any]]:
+        """按目录读取单个测试条目，不在索引中时返回 None"""
+        columns = ", ".join(_LIST_COLUMNS)
+        with self._lock:
+            row = self._conn.execute(f"SELECT {columns} FROM tests WHERE dir_path = ?",
+                                     (os.path.normpath(test_dir),)).fetchone()
+        return self._row_to_test(row) if row is not None else None
+
+    def list_tests(self, device_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按创建时间倒序列出测试（可按设备过滤）"""
+        columns = ", ".join(_LIST_COLUMNS)
+        with self._lock:
+            if device_id:
+                rows = self._conn.execute(
+                    f"SELECT {columns} FROM tests WHERE device_id = ? AND status != ? "
+                    f"ORDER BY created_at DESC",
+                    (device_id, PENDING_STATUS)).fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {columns} FROM tests WHERE status != ? ORDER BY created_at DESC",
+                    (PENDING_STATUS,)).fetchall()
+        return [self._row_to_test(row) for row in rows]
+
+    def list_devices(self) -> List[str]:
+        """有已保存测试的设备ID"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT device_id FROM tests WHERE status != ? ORDER BY device_id",
+                (PENDING_STATUS,)).fetchall()
+        return [row["device_id"] for row in rows if row["device_id"]]
+
+    @staticmethod
+    def _build_where(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        clauses = ["status != ?"]
+        params: List[Any] = [PENDING_STATUS]
+
+        def _values(key):
+            value = filters.get(key)
+            if value in (None, "", []):
+                return []
+            return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+        for key, column in (("device_id", "device_id"), ("test_type", "test_type"), ("status", "status")):
+            values = _values(key)
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        # 芯片ID/器件编号按子串匹配（不区分大小写）
+        for key in ("chip_id", "device_number"):
+            for value in _values(key):
+                clauses.append(f"{key} LIKE ? ESCAPE '\\'")
+                params.append(_like_pattern(value))
+        created_from = filters.get("created_from")
+        if created_from not in (None, ""):
+            clauses.append("created_ts >= ?")
+            params.append(_parse_timestamp(created_from))
+        created_to = filters.get("created_to")
+        if created_to not in (None, ""):
+            clauses.append("created_ts <= ?")
+            params.append(_parse_timestamp(created_to))
+        text = (filters.get("text") or "").strip()
+        if text:
+            pattern = _like_pattern(text)
+            clauses.append("(name LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\' "
+                           "OR chip_id LIKE ? ESCAPE '\\' OR device_number LIKE ? ESCAPE '\\')")
+            params.extend([pattern] * 4)
+        # 步骤摘要/分析指标范围（没有对应值的测试不满足任何范围条件）
+        for key, (column, op) in RANGE_FILTERS.items():
+            value = filters.get(key)
+            if value not in (None, ""):
+                clauses.append(f"{column} {op} ?")
+                params.append(float(value))
+        # 步骤类型：测试需包含列出的全部类型
+        for step_type in _values("step_types"):
+            clauses.append("step_types LIKE ?")
+            params.append(f"%,{step_type},%")
+        return " AND ".join(clauses), params
+
+    @staticmethod
+    def _build_order(sort: Optional[Sequence[Tuple[str, bool]]]) -> str:
+        terms = []
+        for key, ascending in (sort or DEFAULT_SORT):
+            column = SORT_COLUMNS.get(key)
+            if column:
+                terms.append(f"{column} {'ASC' if ascending else 'DESC'}")
+        terms.append("dir_path ASC")  # 保证分页顺序稳定
+        return ", ".join(terms)
+
+    def query_tests(self, filters: Optional[Dict[str, Any]] = None,
+                    sort: Optional[Sequence[Tuple[str, bool]]] = None,
+                    offset: int = 0, limit: Optional[int] = 100) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        在索引上过滤、排序并分页
+
+        Args:
+            filters: 过滤条件，支持 device_id / test_type / status（单值或列表）、
+                chip_id / device_number（子串）、created_from / created_to（ISO时间或时间戳）、
+                text（名称/描述/芯片ID/器件编号子串）、step_types（需全部包含）、
+                步骤摘要范围 points_min/max、max_current_min/max、on_off_ratio_min/max，
+                批量分析指标范围 vth_min/max、gm_max_min/max、ss_min/max、hysteresis_min/max、
+                tau_rise_min/max、tau_fall_min/max（见 RANGE_FILTERS）
+            sort: [(排序键, 是否升序), ...]，排序键见 SORT_COLUMNS，按优先级排列
+            offset: 跳过的条数
+            limit: 本页条数，None 表示不限
+
+        Returns:
+            (当前页测试列表, 满足条件的总数)
+        """
+        where, params = self._build_where(filters or {})
+        order = self._build_order(sort)
+        columns = ", ".join(_LIST_COLUMNS)
+        sql = f"SELECT {columns} FROM tests WHERE {where} ORDER BY {order}"
+        page_params = list(params)
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            page_params.extend([max(int(limit), 0), max(int(offset), 0)])
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM tests WHERE {where}", params).fetchone()[0]
+            rows = self._conn.execute(sql, page_params).fetchall()
+        return [self._row_to_test(row) for row in rows], total
+
+
+def parse_range_expressions(text: str) -> Tuple[Dict[str, float], str]:
+    """
+    从搜索文本中提取指标范围表达式
+
+    "vth>0.2 gm>=1e-3 chipA" -> ({"vth_min": 0.2, "gm_max_min": 0.001}, "chipA")；
+    < 与 > 按 <= / >= 处理，"=" 同时设置上下限，无法识别的词原样留在文本中。
+    """
+    filters: Dict[str, float] = {}
+    remaining = []
+    for word in (text or "").split():
+        match = _RANGE_EXPRESSION.match(word)
+        prefix = RANGE_ALIASES.get(match.group(1).lower()) if match else None
+        if prefix is None:
+            remaining.append(word)
+            continue
+        op, value = match.group(2), float(match.group(3))
+        if op in (">", ">=", "="):
+            filters[f"{prefix}_min"] = value
+        if op in ("<", "<=", "="):
+            filters[f"{prefix}_max"] = value
+    return filters, " ".join(remaining)
+
+
+def _like_pattern(value: Any) -> str:
+    """子串匹配的 LIKE 模式，转义通配符"""
+    text = str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{text}%"
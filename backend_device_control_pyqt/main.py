@@ -12,6 +12,11 @@ import uuid
 import signal
 import sys
 from typing import Dict, List, Any, Optional, Tuple
+
+from app_config import get_analytics_processes
+from backend_device_control_pyqt.core.batch_analytics import analyze_tests
+from backend_device_control_pyqt.core.step_log import load_in_progress_test_info
+from backend_device_control_pyqt.core.test_catalog import TERMINAL_STATUSES, TestCatalog
 ########################### 日志设置 ###################################
 from logger_config import get_module_logger
 logger = get_module_logger() 
@@ -68,6 +73,9 @@ class MedicalTestBackend:
         
         # 创建必要目录
         os.makedirs("UserData/AutoSave", exist_ok=True)
+        
+        # 已保存测试的索引（首次列出时打开）
+        self._catalog: Optional[TestCatalog] = None
     
     def start(self):
         """启动后端系统"""
@@ -448,11 +456,14 @@ class MedicalTestBackend:
         info_path = os.path.join(test_dir, "test_info.json")
         
         try:
-            if not os.path.exists(info_path):
-                return {"status": "error", "reason": "Test info file not found"}
-                
-            with open(info_path, "r", encoding="utf-8") as f:
-                test_info = json.load(f)
+            if os.path.exists(info_path):
+                with open(info_path, "r", encoding="utf-8") as f:
+                    test_info = json.load(f)
+            else:
+                # 测试进行中或中途退出：由临时信息和步骤日志拼出已完成的部分
+                test_info = load_in_progress_test_info(test_dir)
+                if test_info is None:
+                    return {"status": "error", "reason": "Test info file not found"}
                 
             # 创建结果数据结构
             result = {
@@ -583,16 +594,135 @@ class MedicalTestBackend:
 
         return results
     
+    def get_test_catalog(self) -> Optional[TestCatalog]:
+        """获取测试索引，打开失败时返回 None（调用方退回目录扫描）"""
+        if self._catalog is None:
+            try:
+                self._catalog = TestCatalog()
+            except Exception as e:
+                logger.error(f"打开测试索引失败: {e}")
+                return None
+        return self._catalog
+
     def list_saved_tests(self, device_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        列出已保存的测试
+        列出已保存的测试（从测试索引读取，先按目录 mtime 增量同步）
         
         Args:
             device_id: 设备ID（可选，如果提供则只获取该设备的测试）
             
         Returns:
-            测试列表
+            测试列表，按创建时间倒序；条目带有精简的 test_info（描述、芯片ID、器件编号）
+        """
+        catalog = self.get_test_catalog()
+        if catalog is not None:
+            try:
+                catalog.reconcile()
+                return catalog.list_tests(device_id)
+            except Exception as e:
+                logger.error(f"读取测试索引失败，改为扫描目录: {e}")
+        return self._scan_saved_tests(device_id)
+
+    def query_saved_tests(self, filters: Optional[Dict[str, Any]] = None,
+                          sort: Optional[List[Tuple[str, bool]]] = None,
+                          offset: int = 0, limit: Optional[int] = 100) -> Dict[str, Any]:
+        """
+        在测试索引上过滤、排序并分页查询已保存的测试
+        
+        Args:
+            filters: 过滤条件（device_id、chip_id、device_number、test_type、status、
+                created_from/created_to、text、step_types、步骤摘要范围，见 TestCatalog.query_tests）
+            sort: [(排序键, 是否升序), ...]，排序键为 time/name/device/chip_id/device_number/description，
+                按步骤摘要的 points/max_current/on_off_ratio，
+                以及按批量分析指标的 vth/gm_max/ss/hysteresis/tau_rise/tau_fall
+            offset: 起始位置
+            limit: 每页条数
+            
+        Returns:
+            {"status": "ok", "tests": [...], "total": N, "offset": offset, "limit": limit}；
+            索引不可用时 status 为 "error"
+        """
+        catalog = self.get_test_catalog()
+        if catalog is None:
+            return {"status": "error", "reason": "Test catalog unavailable"}
+        try:
+            catalog.reconcile()
+            tests, total = catalog.query_tests(filters, sort, offset, limit)
+            return {"status": "ok", "tests": tests, "total": total, "offset": offset, "limit": limit}
+        except Exception as e:
+            logger.error(f"查询测试索引失败: {e}")
+            return {"status": "error", "reason": str(e)}
+
+    def reindex_saved_test(self, test_dir: str) -> Optional[Dict[str, Any]]:
         """
+        重新索引单个测试目录（例如后台补算了步骤摘要之后）
+        
+        Returns:
+            更新后的测试条目（格式同 list_saved_tests），索引不可用时返回 None
+        """
+        catalog = self.get_test_catalog()
+        if catalog is None:
+            return None
+        try:
+            catalog.index_test_dir(test_dir)
+            return catalog.get_test(test_dir)
+        except Exception as e:
+            logger.error(f"重新索引测试失败 {test_dir}: {e}")
+            return None
+
+    def analyze_saved_tests(self, test_dirs: Optional[List[str]] = None,
+                            processes: Optional[int] = None, force: bool = False,
+                            progress_callback=None, cancel_check=None) -> Dict[str, Any]:
+        """
+        用进程池批量计算已保存测试的器件指标（结果按数据文件 mtime 缓存在各测试的
+        analysis.json 中），完成后重新索引，历史页可按这些指标排序和过滤
+        
+        Args:
+            test_dirs: 要分析的测试目录，None 表示索引中的全部已结束测试
+            processes: 进程数，None 按 performance_config 中的 analytics_processes（0 为按 CPU 核数）
+            force: 忽略缓存全部重算
+            progress_callback: progress_callback(已完成数, 总数, 测试目录)
+            cancel_check: 返回 True 时提前结束
+            
+        Returns:
+            {"status": "ok", "analyzed": N, "failed": M, "cancelled": bool}
+        """
+        catalog = self.get_test_catalog()
+        if test_dirs is None:
+            if catalog is None:
+                return {"status": "error", "reason": "Test catalog unavailable"}
+            catalog.reconcile()
+            # 进行中/中途退出的测试没有 test_info.json，不参与批量分析
+            tests, _ = catalog.query_tests({"status": list(TERMINAL_STATUSES)}, limit=None)
+            test_dirs = [test["dir_path"] for test in tests]
+        try:
+            outcome = analyze_tests(test_dirs, processes=processes or get_analytics_processes() or None,
+                                    force=force, progress_callback=progress_callback, cancel_check=cancel_check)
+        except Exception as e:
+            logger.error(f"批量分析失败: {e}")
+            return {"status": "error", "reason": str(e)}
+        if catalog is not None:
+            for test_dir in outcome["results"]:
+                try:
+                    catalog.index_test_dir(test_dir)
+                except Exception as e:
+                    logger.error(f"重新索引测试失败 {test_dir}: {e}")
+        return {"status": "ok", "analyzed": len(outcome["results"]), "failed": len(outcome["errors"]),
+                "cancelled": outcome["cancelled"]}
+
+    def list_saved_device_ids(self) -> List[str]:
+        """有已保存测试的设备ID列表"""
+        catalog = self.get_test_catalog()
+        if catalog is not None:
+            try:
+                catalog.reconcile()
+                return catalog.list_devices()
+            except Exception as e:
+                logger.error(f"读取测试索引失败，改为扫描目录: {e}")
+        return sorted({test.get("device_id", "") for test in self._scan_saved_tests()} - {""})
+
+    def _scan_saved_tests(self, device_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """逐个解析 test_info.json 列出测试（测试索引不可用时使用）"""
         base_dir = "UserData/AutoSave"
         result = []
         
@@ -15,7 +15,14 @@ from typing import Dict, Any, Optional, List, Tuple
 import numpy as np
 
 # 导入数据解析模块
-from backend_device_control_pyqt.core.serial_data_parser import bytes_to_numpy
+from backend_device_control_pyqt.core.serial_data_parser import bytes_to_numpy, csv_layout
+from backend_device_control_pyqt.core.columnar_store import append_columnar, columnar_path_for
+from backend_device_control_pyqt.core.minmax_pyramid import PyramidBuilder, build_pyramid, pyramid_dir_for
+from backend_device_control_pyqt.core.step_stats import (StepStatsAccumulator, compute_step_stats,
+                                                          merge_step_stats, write_step_stats)
+from backend_device_control_pyqt.core.test_catalog import TestCatalog, INFO_FILENAME
+from app_config import (is_columnar_capture_enabled, get_save_progress_interval_sec,
+                        is_minmax_pyramid_enabled)
 
 ########################### 日志设置 ###################################
 from logger_config import get_module_logger
@@ -41,9 +48,10 @@ class DataSaveManager:
         self.result_queue = result_queue
         self.running = True
         
-        # 创建工作线程池
+        # 创建工作线程池：每个线程一个队列，同一测试目录的请求总是交给同一个线程，
+        # 保证同一文件的分块、最后一块与 test_info.json 按提交顺序处理
         self.worker_threads = []
-        self.work_queue = queue.Queue()
+        self.work_queues = []
         
         # 统计信息
         self.stats = {
@@ -68,6 +76,22 @@ class DataSaveManager:
         self.cache_lock = threading.Lock()
         # 记录流式保存的状态（避免重复写入表头）
         self.streaming_state = {}  # {file_path: {"header_written": bool}}
+        # 列式二进制副本（与CSV并存）
+        self.columnar_enabled = is_columnar_capture_enabled()
+        # 瞬态步骤的 min/max 金字塔（流式写入时增量构建）
+        self.pyramid_enabled = is_minmax_pyramid_enabled()
+        self.pyramid_builders = {}  # {file_path: PyramidBuilder}
+        # 步骤摘要统计（流式写入时按块累计，步骤完成时写出并合并进 test_info.json）
+        self.stats_accumulators = {}  # {file_path: StepStatsAccumulator}
+        # 追加写入的文件按路径加锁，保证多个工作线程间的写入顺序
+        self.file_locks = {}  # {file_path: threading.Lock}
+        # 按文件汇总的保存进度：流式分块不逐条回执，按固定频率上报摘要
+        self.save_progress = {}  # {file_path: {"bytes", "rows", "chunks", "errors", ...}}
+        self.progress_lock = threading.Lock()
+        self.progress_interval = get_save_progress_interval_sec()
+        # 测试完成（写出 test_info.json）时更新测试索引
+        self.catalog = None
+        self.catalog_lock = threading.Lock()
         
         # 创建数据目录
         os.makedirs("UserData/AutoSave", exist_ok=True)
@@ -83,8 +107,11 @@ class DataSaveManager:
         
         # 创建工作线程
         for i in range(num_workers):
+            work_queue = queue.Queue()
+            self.work_queues.append(work_queue)
             worker = threading.Thread(
                 target=self._worker_thread,
+                args=(work_queue,),
                 name=f"DataSaveWorker-{i}",
                 daemon=True
             )
@@ -114,8 +141,8 @@ class DataSaveManager:
                 
                 # 检查是否为数据保存请求
                 if message.get("type") == MSG_SAVE_DATA:
-                    # 将请求放入工作队列
-                    self.work_queue.put(message)
+                    # 将请求放入负责该测试目录的工作队列
+                    self._work_queue_for(message).put(message)
                     
                     # 更新统计信息
                     with self.stats_lock:
@@ -132,8 +159,8 @@ class DataSaveManager:
                 continue
         
         # 发送结束信号到工作线程
-        for _ in range(len(self.worker_threads)):
-            self.work_queue.put(None)
+        for work_queue in self.work_queues:
+            work_queue.put(None)
         
         # 等待所有工作线程结束
         for worker in self.worker_threads:
@@ -151,15 +178,21 @@ class DataSaveManager:
                     f"其他={self.stats['files_by_type']['other']}")
         logger.info(f"错误次数: {self.stats['errors']}")
     
-    def _worker_thread(self):
-        """工作线程，处理单个保存请求"""
+    def _work_queue_for(self, message: Dict[str, Any]) -> queue.Queue:
+        """按测试目录（没有文件路径时按 test_id）选择工作队列"""
+        file_path = message.get("file_path")
+        key = os.path.dirname(os.path.normpath(file_path)) if file_path else str(message.get("test_id"))
+        return self.work_queues[hash(key) % len(self.work_queues)]
+
+    def _worker_thread(self, work_queue: queue.Queue):
+        """工作线程，按顺序处理分配给它的保存请求"""
         thread_name = threading.current_thread().name
         logger.info(f"工作线程 {thread_name} 启动")
         
         while True:
             try:
                 # 从工作队列获取请求
-                task = self.work_queue.get()
+                task = work_queue.get()
                 
                 # 检查是否为结束信号
                 if task is None:
@@ -212,9 +245,20 @@ class DataSaveManager:
                     baseline_current=baseline_current
                 )
                 
-                # 发送结果
-                status = "ok" if success else "error"
-                self._send_result(test_id, status, file_path, error)
+                # 发送结果：错误立即上报；流式分块/步骤日志只累计进度并限频上报；
+                # 其余保存（含流式最后一块）发送一次最终回执
+                incremental = (streaming_mode or mode == "jsonl") and not final_chunk
+                self._update_progress(file_path, test_id, success, size, error)
+                if not success:
+                    self._send_result(test_id, "error", file_path, error)
+                elif incremental:
+                    self._maybe_send_progress(file_path)
+                else:
+                    self._send_final_ack(test_id, file_path)
+                # 写出 test_info.json 即测试结束：该目录下仍在累计的文件（步骤日志、
+                # 未收到最后一块的流式文件）一并发送最终回执并清理
+                if mode == "json" and os.path.basename(file_path) == INFO_FILENAME:
+                    self._send_final_acks_for_dir(os.path.dirname(file_path))
                 
                 # 更新统计信息
                 with self.stats_lock:
@@ -226,7 +270,7 @@ class DataSaveManager:
                             self.stats["files_by_type"]["transfer"] += 1
                         elif mode == "transient":
                             self.stats["files_by_type"]["transient"] += 1
-                        elif mode == "json":
+                        elif mode in ("json", "jsonl"):
                             self.stats["files_by_type"]["json"] += 1
                         else:
                             self.stats["files_by_type"]["other"] += 1
@@ -239,7 +283,7 @@ class DataSaveManager:
             finally:
                 # 标记任务完成
                 if task is not None:
-                    self.work_queue.task_done()
+                    work_queue.task_done()
         
         logger.info(f"工作线程 {thread_name} 已退出")
     
@@ -263,8 +307,92 @@ class DataSaveManager:
         if error:
             result["error"] = error
             
+        self._put_result(result)
+
+    def _progress_entry(self, file_path: str, test_id: str = "unknown") -> Dict[str, Any]:
+        """获取（必要时创建）文件的保存进度记录，调用方需持有 progress_lock"""
+        entry = self.save_progress.get(file_path)
+        if entry is None:
+            entry = {
+                "test_id": test_id,
+                "bytes": 0,
+                "rows": 0,
+                "chunks": 0,
+                "errors": 0,
+                "last_error": None,
+                "last_flush": None,
+                "last_sent": 0.0,
+            }
+            self.save_progress[file_path] = entry
+        return entry
+
+    def _add_rows(self, file_path: str, rows: int):
+        """记录写入的数据行数"""
+        with self.progress_lock:
+            self._progress_entry(file_path)["rows"] += int(rows)
+
+    def _update_progress(self, file_path: str, test_id: str, success: bool, size: int,
+                         error: Optional[str] = None):
+        """累计一次保存的结果"""
+        with self.progress_lock:
+            entry = self._progress_entry(file_path, test_id)
+            entry["test_id"] = test_id
+            entry["chunks"] += 1
+            if success:
+                entry["bytes"] += size
+                entry["last_flush"] = time.time()
+            else:
+                entry["errors"] += 1
+                entry["last_error"] = error
+
+    def _progress_message(self, file_path: str, entry: Dict[str, Any], msg_type: str) -> Dict[str, Any]:
+        return {
+            "type": msg_type,
+            "test_id": entry["test_id"],
+            "status": "ok" if entry["errors"] == 0 else "error",
+            "file_path": file_path,
+            "bytes_written": entry["bytes"],
+            "rows_written": entry["rows"],
+            "chunks": entry["chunks"],
+            "errors": entry["errors"],
+            "last_error": entry["last_error"],
+            "last_flush": entry["last_flush"],
+        }
+
+    def _maybe_send_progress(self, file_path: str):
+        """距上次上报超过间隔时发送该文件的进度摘要"""
+        now = time.time()
+        with self.progress_lock:
+            entry = self.save_progress.get(file_path)
+            if entry is None or now - entry["last_sent"] < self.progress_interval:
+                return
+            entry["last_sent"] = now
+            message = self._progress_message(file_path, entry, "save_progress")
+        self._put_result(message)
+
+    def _send_final_ack(self, test_id: str, file_path: str):
+        """文件写入结束，发送带汇总信息的最终回执并清理进度记录"""
+        with self.progress_lock:
+            entry = self.save_progress.pop(file_path, None)
+        if entry is None:
+            self._send_result(test_id, "ok", file_path)
+            return
+        message = self._progress_message(file_path, entry, "save_result")
+        message["final"] = True
+        self._put_result(message)
+
+    def _send_final_acks_for_dir(self, test_dir: str):
+        """为测试目录下剩余的进度记录发送最终回执"""
+        test_dir = os.path.normpath(test_dir)
+        with self.progress_lock:
+            leftovers = [(path, entry["test_id"]) for path, entry in self.save_progress.items()
+                         if os.path.dirname(os.path.normpath(path)) == test_dir]
+        for path, test_id in leftovers:
+            self._send_final_ack(test_id, path)
+
+    def _put_result(self, message: Dict[str, Any]):
         try:
-            self.result_queue.put(result)
+            self.result_queue.put(message)
         except Exception as e:
             logger.error(f"发送保存结果失败: {str(e)}")
 
@@ -302,6 +430,7 @@ class DataSaveManager:
                     fmt=fmt
                 )
             after_size = os.path.getsize(file_path)
+            self._add_rows(file_path, len(np_data))
             if final_chunk:
                 with self.cache_lock:
                     self.streaming_state.pop(file_path, None)
@@ -311,6 +440,173 @@ class DataSaveManager:
             logger.error(error_msg)
             return False, 0, error_msg
     
+    def _file_lock(self, path: str) -> threading.Lock:
+        """获取指定文件的追加写锁"""
+        with self.cache_lock:
+            return self.file_locks.setdefault(path, threading.Lock())
+
+    def _save_columnar(self, file_path: str, np_data: np.ndarray, mode: str, header: str,
+                       reset: bool, transimpedance_ohms: float, packet_size: int,
+                       baseline_current: float) -> None:
+        """将解析后的数据同步写入同名 .col 列式文件，失败不影响CSV保存"""
+        if not self.columnar_enabled or np_data is None:
+            return
+        lock = self._file_lock(columnar_path_for(file_path))
+        meta = {
+            "step_type": mode,
+            "packet_size": packet_size,
+            "transimpedance_ohms": transimpedance_ohms,
+            "baseline_current": baseline_current,
+            "source_file": os.path.basename(file_path),
+        }
+        try:
+            with lock:
+                append_columnar(columnar_path_for(file_path), np_data, header.split(","),
+                                meta=meta, reset=reset)
+        except Exception as e:
+            logger.error(f"写入列式文件失败 {file_path}: {str(e)}")
+
+    def _save_pyramid(self, file_path: str, np_data: np.ndarray, reset: bool,
+                      final_chunk: bool, packet_size: int) -> None:
+        """
+        更新瞬态数据的 min/max 金字塔，失败不影响CSV保存
+
+        reset=True 表示 np_data 为完整数据，整体重建；否则追加到该文件的增量构建器，
+        final_chunk 时写出尾部并释放构建器。
+        """
+        if not self.pyramid_enabled:
+            return
+        directory = pyramid_dir_for(file_path)
+        lock = self._file_lock(directory)
+        meta = {
+            "step_type": "transient",
+            "packet_size": packet_size,
+            "x_column": "Time",
+            "y_column": "Id",
+            "source_file": os.path.basename(file_path),
+        }
+        try:
+            with lock:
+                if reset:
+                    self.pyramid_builders.pop(file_path, None)
+                    if np_data is not None and len(np_data):
+                        build_pyramid(directory, np_data[:, 0], np_data[:, 1], meta)
+                    return
+                builder = self.pyramid_builders.get(file_path)
+                if builder is None:
+                    builder = PyramidBuilder(directory, meta)
+                    self.pyramid_builders[file_path] = builder
+                if np_data is not None and len(np_data):
+                    builder.append(np_data[:, 0], np_data[:, 1])
+                if final_chunk:
+                    builder.finish()
+                    self.pyramid_builders.pop(file_path, None)
+        except Exception as e:
+            logger.error(f"更新金字塔失败 {file_path}: {str(e)}")
+
+    def _save_step_stats(self, file_path: str, np_data: Optional[np.ndarray], columns: List[str],
+                         reset: bool, final_chunk: bool,
+                         current_columns: Optional[List[int]] = None) -> None:
+        """
+        更新步骤摘要统计，失败不影响CSV保存
+
+        reset=True 表示 np_data 为完整数据，直接计算并写出；否则累加到该文件的
+        累加器，final_chunk 时写出并释放累加器。
+        """
+        lock = self._file_lock(file_path + ".stats")
+        try:
+            with lock:
+                if reset:
+                    self.stats_accumulators.pop(file_path, None)
+                    if np_data is None:
+                        return
+                    stats = compute_step_stats(np_data, columns, current_columns)
+                else:
+                    accumulator = self.stats_accumulators.get(file_path)
+                    if accumulator is None:
+                        accumulator = StepStatsAccumulator(columns, current_columns)
+                        self.stats_accumulators[file_path] = accumulator
+                    accumulator.append(np_data)
+                    if not final_chunk:
+                        return
+                    self.stats_accumulators.pop(file_path, None)
+                    stats = accumulator.result()
+                write_step_stats(file_path, stats)
+            self._attach_step_stats(os.path.dirname(file_path))
+        except Exception as e:
+            logger.error(f"更新步骤摘要失败 {file_path}: {str(e)}")
+
+    def _save_output_stats(self, file_path: str):
+        """output 步骤以成品CSV保存：读回刚写出的文件计算摘要（文件很小）"""
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                columns = [name.strip() for name in f.readline().strip().split(",")]
+                data = np.genfromtxt(f, delimiter=",", dtype=np.float64, filling_values=np.nan,
+                                     invalid_raise=False)
+            data = np.asarray(data, dtype=np.float64).reshape(-1, len(columns))
+        except Exception as e:
+            logger.error(f"读取output数据计算摘要失败 {file_path}: {str(e)}")
+            return
+        self._save_step_stats(file_path, data, columns, True, True,
+                              current_columns=list(range(1, len(columns))))
+
+    def _attach_step_stats(self, test_dir: str):
+        """
+        test_info.json 已写出时，把新完成的步骤摘要合并进去
+
+        与写 test_info.json 持有同一把锁：摘要文件先于加锁写出，因此要么写信息文件时
+        能读到该摘要，要么这里能看到已写出的信息文件，不会遗漏。
+        """
+        info_path = os.path.join(test_dir, INFO_FILENAME)
+        with self._file_lock(os.path.normpath(info_path)):
+            if not os.path.exists(info_path):
+                return
+            with open(info_path, "r", encoding="utf-8") as f:
+                test_info = json.load(f)
+            if not merge_step_stats(test_dir, test_info):
+                return
+            with open(info_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(test_info, indent=4, ensure_ascii=False))
+        self._index_test_dir(test_dir)
+
+    def _write_test_info(self, file_path: str, content: str):
+        """写 test_info.json，并合并各步骤已完成的摘要统计"""
+        test_dir = os.path.dirname(file_path)
+        with self._file_lock(os.path.normpath(file_path)):
+            try:
+                test_info = json.loads(content)
+                if isinstance(test_info, dict) and merge_step_stats(test_dir, test_info):
+                    content = json.dumps(test_info, indent=4, ensure_ascii=False)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"合并步骤摘要失败 {file_path}: {e}")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(content)
+
+    def _finalize_test_dir(self, test_dir: str):
+        """
+        测试结束（写 test_info.json 前）收尾：没有收到最后一块（如测试中途停止）的
+        金字塔构建器和摘要累加器按已有数据写出并释放，不在进程中残留
+        """
+        test_dir = os.path.normpath(test_dir)
+
+        def _in_test_dir(path):
+            return os.path.dirname(os.path.normpath(path)) == test_dir
+
+        for file_path in [path for path in list(self.pyramid_builders) if _in_test_dir(path)]:
+            self._save_pyramid(file_path, None, False, True, 0)
+        for file_path in [path for path in list(self.stats_accumulators) if _in_test_dir(path)]:
+            self._save_step_stats(file_path, None, [], False, True)
+
+    def _index_test_dir(self, test_dir: str):
+        """把刚完成的测试写入测试索引，失败不影响保存结果"""
+        try:
+            with self.catalog_lock:
+                if self.catalog is None:
+                    self.catalog = TestCatalog()
+            self.catalog.index_test_dir(test_dir)
+        except Exception as e:
+            logger.warning(f"更新测试索引失败 {test_dir}: {e}")
+
     def _save_file(
         self,
         file_path: str,
@@ -356,6 +652,10 @@ class DataSaveManager:
                         fmt=['%.3f', '%g'],
                         final_chunk=final_chunk
                     )
+                    if success:
+                        self._save_columnar(file_path, transfer_data_np, mode, "Vg,Id", False,
+                                            transimpedance_ohms, 5, baseline_current)
+                        self._save_step_stats(file_path, transfer_data_np, ["Vg", "Id"], False, final_chunk)
                     if success:
                         logger.info(f"流式保存转移特性数据: {file_path}, 追加模式: {append}")
                     return success, size_written, error_msg
@@ -390,6 +690,9 @@ class DataSaveManager:
                             comments='',
                             fmt=['%.3f', '%g']  # Vg保留3位小数，Id使用通用格式
                         )
+                        self._save_columnar(file_path, combined_data, mode, "Vg,Id", True,
+                                            transimpedance_ohms, 5, baseline_current)
+                        self._save_step_stats(file_path, combined_data, ["Vg", "Id"], True, True)
                 else:
                     # 新文件或非追加模式
                     transfer_data_np = bytes_to_numpy(
@@ -408,6 +711,10 @@ class DataSaveManager:
                         comments='',
                         fmt=['%.3f', '%g']  # Vg保留3位小数，Id使用通用格式
                     )
+                    self._save_columnar(file_path, transfer_data_np, mode, "Vg,Id", True,
+                                        transimpedance_ohms, 5, baseline_current)
+                    self._save_step_stats(file_path, transfer_data_np, ["Vg", "Id"], True, True)
+                    self._add_rows(file_path, len(transfer_data_np))
                     
                     # 如果是追加模式，存入缓存
                     if append:
@@ -424,12 +731,7 @@ class DataSaveManager:
                     transient_packet_size = 7
                 if transient_packet_size not in (7, 9):
                     transient_packet_size = 7
-                if transient_packet_size == 9:
-                    header = "Time,Id,Vg"
-                    fmt = ['%.3f', '%g', '%.3f']
-                else:
-                    header = "Time,Id"
-                    fmt = ['%.3f', '%g']
+                header, fmt = csv_layout(mode, transient_packet_size)
                 if streaming_mode and append:
                     transient_data_np = bytes_to_numpy(
                         content,
@@ -445,6 +747,13 @@ class DataSaveManager:
                         fmt=fmt,
                         final_chunk=final_chunk
                     )
+                    if success:
+                        self._save_columnar(file_path, transient_data_np, mode, header, False,
+                                            transimpedance_ohms, transient_packet_size, baseline_current)
+                        self._save_pyramid(file_path, transient_data_np, False, final_chunk,
+                                           transient_packet_size)
+                        self._save_step_stats(file_path, transient_data_np, header.split(","), False,
+                                              final_chunk)
                     if success:
                         logger.info(f"流式保存瞬态特性数据: {file_path}, 追加模式: {append}")
                     return success, size_written, error_msg
@@ -478,6 +787,10 @@ class DataSaveManager:
                             comments='',
                             fmt=fmt
                         )
+                        self._save_columnar(file_path, combined_data, mode, header, True,
+                                            transimpedance_ohms, transient_packet_size, baseline_current)
+                        self._save_pyramid(file_path, combined_data, True, True, transient_packet_size)
+                        self._save_step_stats(file_path, combined_data, header.split(","), True, True)
                 else:
                     # 新文件或非追加模式
                     transient_data_np = bytes_to_numpy(
@@ -497,6 +810,11 @@ class DataSaveManager:
                         comments='',
                         fmt=fmt
                     )
+                    self._save_columnar(file_path, transient_data_np, mode, header, True,
+                                        transimpedance_ohms, transient_packet_size, baseline_current)
+                    self._save_pyramid(file_path, transient_data_np, True, True, transient_packet_size)
+                    self._save_step_stats(file_path, transient_data_np, header.split(","), True, True)
+                    self._add_rows(file_path, len(transient_data_np))
                     
                     # 如果是追加模式，存入缓存
                     if append:
@@ -506,11 +824,26 @@ class DataSaveManager:
                 logger.info(f"保存瞬态特性数据: {file_path}, 追加模式: {append}")
                 return True, os.path.getsize(file_path), None
                 
+            elif mode == "jsonl":
+                # JSON Lines 追加，一次一行，按文件加锁避免多个工作线程交错写入
+                lock = self._file_lock(file_path)
+                line = content if isinstance(content, str) else bytes(content).decode("utf-8")
+                with lock:
+                    with open(file_path, "a", encoding="utf-8") as f:
+                        f.write(line.rstrip("\n") + "\n")
+                return True, len(line.encode("utf-8")) + 1, None
+                
             elif mode == "json":
-                # JSON格式，直接保存
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(content)
+                # JSON格式，直接保存；测试信息文件合并步骤摘要后再写
+                if os.path.basename(file_path) == INFO_FILENAME:
+                    self._finalize_test_dir(os.path.dirname(file_path))
+                    self._write_test_info(file_path, content)
+                else:
+                    with open(file_path, "w", encoding="utf-8") as f:
+                        f.write(content)
                 logger.info(f"保存JSON数据: {file_path}")
+                if os.path.basename(file_path) == INFO_FILENAME:
+                    self._index_test_dir(os.path.dirname(file_path))
                 return True, os.path.getsize(file_path), None
                 
             else:
@@ -537,6 +870,8 @@ class DataSaveManager:
                         else:
                             f.write(content)
                 
+                if mode == "output" and file_path.endswith(".csv"):
+                    self._save_output_stats(file_path)
                 logger.info(f"保存其他类型数据: {file_path}, 追加模式: {append}")
                 return True, os.path.getsize(file_path), None
                 
@@ -15,6 +15,9 @@ import threading
 from typing import Dict, Any, Optional, List, Union, Tuple
 import numpy as np
 
+from app_config import get_stream_metrics_interval_sec, is_stream_metrics_enabled
+from backend_device_control_pyqt.core.stream_metrics import StreamMetricsTracker
+
 ########################### 日志设置 ###################################
 from logger_config import get_module_logger
 logger = get_module_logger() 
@@ -71,6 +74,10 @@ class DataTransmissionManager:
         # 最近活动的测试
         self.active_tests = {}  # {test_id: last_activity_time}
         
+        # 实时指标：对解码后的数据块增量计算，以 test_metrics 消息跟随数据发到Qt
+        self.stream_metrics = (StreamMetricsTracker(get_stream_metrics_interval_sec())
+                               if is_stream_metrics_enabled() else None)
+        
         logger.info("数据传输管理器初始化完成")
 
     def start(self):
@@ -164,7 +171,10 @@ class DataTransmissionManager:
                 self._forward_to_qt(message)
                 
             elif message_type == MSG_TEST_RESULT or message_type == MSG_TEST_ERROR:
-                # 结果或错误 - 转发到Qt和保存
+                # 结果或错误 - 转发到Qt和保存（先发出最后一个步骤的最终指标）
+                if self.stream_metrics and test_id:
+                    for metrics_message in self.stream_metrics.finish(test_id):
+                        self._forward_to_qt(metrics_message)
                 self._forward_to_qt(message)
                 
                 # 测试结果不再自动转发到保存进程
@@ -209,6 +219,14 @@ class DataTransmissionManager:
         # 转发实时数据到Qt界面
         self._forward_to_qt(message)
         
+        # 更新实时指标（出错不影响数据转发）
+        if self.stream_metrics:
+            try:
+                for metrics_message in self.stream_metrics.feed(message):
+                    self._forward_to_qt(metrics_message)
+            except Exception as e:
+                logger.debug(f"计算实时指标失败: {e}")
+        
         # 更新统计信息
         with self.stats_lock:
             self.stats["processed_data_points"] += 1
@@ -338,24 +356,14 @@ class DataTransmissionManager:
                     logger.debug("收到保存进程关闭消息")
                     continue
                 
-                # 处理保存结果
+                # 处理保存结果（save_result 为最终回执或错误，save_progress 为限频的进度摘要）
                 test_id = result.get("test_id")
                 status = result.get("status")
-                file_path = result.get("file_path")
                 
                 if test_id and status:
-                    # 构建结果消息
-                    result_message = {
-                        "type": "save_result",
-                        "test_id": test_id,
-                        "status": status,
-                        "file_path": file_path,
-                        "timestamp": time.time()
-                    }
-                    
-                    # 如果有错误信息，添加到消息中
-                    if result.get("error"):
-                        result_message["error"] = result.get("error")
+                    result_message = dict(result)
+                    result_message.setdefault("type", "save_result")
+                    result_message["timestamp"] = time.time()
                     
                     # 转发到Qt
                     self._forward_to_qt(result_message)
@@ -124,7 +124,8 @@ class ProcessDataBridge:
     
     async def send_data(self, test_id: str, data: Any, step_type: str, device_id: Optional[str] = None,
                       workflow_info: Optional[Dict[str, Any]] = None, recv_ts: Optional[float] = None,
-                      batch_points: Optional[int] = None):
+                      batch_points: Optional[int] = None,
+                      output_segments: Optional[List[Dict[str, Any]]] = None):
         """
         发送数据消息的便捷函数 - 只发送到数据传输进程，不再发送到保存进程
         
@@ -134,6 +135,7 @@ class ProcessDataBridge:
             step_type: 步骤类型
             device_id: 设备ID(可选)
             workflow_info: 工作流信息(可选)
+            output_segments: output步骤的数据段描述(可选)，每段包含栅压信息及在data中的字节偏移/长度
         """
         # 构建数据消息
         message = {
@@ -146,6 +148,8 @@ class ProcessDataBridge:
             message["recv_ts"] = recv_ts
         if batch_points is not None:
             message["batch_points"] = batch_points
+        if output_segments:
+            message["output_segments"] = output_segments
         
         # 添加设备ID
         if device_id:
@@ -1347,8 +1351,8 @@ def initialize_test_step_classes(data_bridge):
                 'step_info': None
             }))
         
-        def add_data(self, test_id, step_type, hex_data, workflow_info):
-            """添加数据到对应步骤的缓冲区"""
+        def add_data(self, test_id, step_type, hex_data, workflow_info, output_metadata=None):
+            """添加数据到对应步骤的缓冲区（output_metadata 为output步骤的栅压元数据）"""
             buffer = self.buffers[test_id][step_type]
             recv_ts = time.time()
             
@@ -1363,6 +1367,7 @@ def initialize_test_step_classes(data_bridge):
             # 添加数据
             buffer['data'].append({
                 'hex_data': hex_data,
+                'output_metadata': output_metadata,
                 'workflow_info': workflow_info,
                 'timestamp': recv_ts,
                 'recv_ts': recv_ts
@@ -1399,6 +1404,7 @@ def initialize_test_step_classes(data_bridge):
             latest_info = None
             first_recv_ts = None
             total_bytes = 0
+            output_segments = []
             
             while buffer['data']:
                 item = buffer['data'].popleft()
@@ -1415,8 +1421,13 @@ def initialize_test_step_classes(data_bridge):
                 elif isinstance(hex_data, (bytes, bytearray)):
                     if hex_chunks:
                         mixed_types = True
-                    byte_chunks.append(bytes(hex_data))
-                    total_bytes += len(byte_chunks[-1])
+                    chunk = bytes(hex_data)
+                    output_metadata = item.get('output_metadata')
+                    if output_metadata:
+                        self._append_output_segment(output_segments, output_metadata, total_bytes, len(chunk))
+                    if chunk:
+                        byte_chunks.append(chunk)
+                    total_bytes += len(chunk)
                 
                 if first_info is None:
                     first_info = item['workflow_info']
@@ -1425,13 +1436,17 @@ def initialize_test_step_classes(data_bridge):
 
             combined_data = None
             if mixed_types and hex_chunks:
-                # 混合类型时回退到hex字符串，保证兼容性
+                # 混合类型时回退到hex字符串，保证兼容性；字节偏移已失效，丢弃数据段描述
                 for chunk in byte_chunks:
                     hex_chunks.append(chunk.hex().upper())
                 combined_data = "".join(hex_chunks)
+                if output_segments:
+                    logger.warning(f"output数据混入hex字符串，丢弃 {len(output_segments)} 个数据段描述")
+                    output_segments = []
             elif hex_chunks:
                 combined_data = "".join(hex_chunks)
-            elif byte_chunks:
+            elif byte_chunks or output_segments:
+                # 只有开始信号时数据为空，但仍需发送数据段描述
                 combined_data = b"".join(byte_chunks)
             
             # 估算这个批次的数据点数量，方便前端算速率
@@ -1449,7 +1464,8 @@ def initialize_test_step_classes(data_bridge):
             batch_points = bytes_len // packet_size if packet_size else 0
 
             # 发送合并数据 - 使用第一个数据包的工作流信息确保步骤正确性
-            if combined_data is not None and combined_data != b"" and combined_data != "" and first_info:
+            has_payload = combined_data is not None and (len(combined_data) > 0 or bool(output_segments))
+            if has_payload and first_info:
                 try:
                     asyncio.create_task(
                         data_bridge.send_data(
@@ -1459,7 +1475,8 @@ def initialize_test_step_classes(data_bridge):
                             device_id=first_info.get('device_id', ''),
                             workflow_info=first_info,  # 使用第一个数据包的信息
                             recv_ts=first_recv_ts,
-                            batch_points=batch_points
+                            batch_points=batch_points,
+                            output_segments=output_segments or None
                         )
                     )
                     logger.debug(f"发送缓冲数据: test_id={test_id}, step_type={step_type}, data_len={len(combined_data)}")
@@ -1470,6 +1487,30 @@ def initialize_test_step_classes(data_bridge):
                     logger.debug(f"发送缓冲数据失败: {e}")
             
             buffer['last_flush'] = time.time()
+
+        @staticmethod
+        def _append_output_segment(segments, output_metadata, offset, length):
+            """
+            记录一个output数据段：同一栅压的连续数据段合并为一段，开始信号单独成段
+
+            每段字段: gate_voltage, gate_voltage_index, total_gate_voltages,
+            segment("start"/"data"), offset, length（字节）
+            """
+            segment_type = output_metadata.get("segment", "data")
+            last = segments[-1] if segments else None
+            if (segment_type == "data" and last is not None and last["segment"] == "data"
+                    and last["gate_voltage"] == output_metadata.get("gate_voltage")
+                    and last["offset"] + last["length"] == offset):
+                last["length"] += length
+                return
+            segments.append({
+                "gate_voltage": output_metadata.get("gate_voltage", 0),
+                "gate_voltage_index": output_metadata.get("gate_voltage_index", 0),
+                "total_gate_voltages": output_metadata.get("total_gate_voltages", 1),
+                "segment": segment_type,
+                "offset": offset,
+                "length": length if segment_type == "data" else 0,
+            })
         
         def should_send_progress(self, test_id):
             """检查是否应该发送进度（全局节流）"""
@@ -1525,12 +1566,13 @@ def initialize_test_step_classes(data_bridge):
             logger.error(f"发送进度失败: {e}")
     
     # 重写数据回调
-    def step_aware_data_callback(self, hex_data, dev_id: str):
+    def step_aware_data_callback(self, hex_data, dev_id: str, **kwargs):
         test_id = self.step_id
         step_type = self.get_step_type()  # 获取当前步骤类型
+        output_metadata = kwargs.get('output_metadata')
         # 若启用了流式保存，直接追加到流式缓存
         try:
-            if getattr(self, "streaming_saver", None):
+            if getattr(self, "streaming_saver", None) and hex_data:
                 self.streaming_saver.feed(hex_data)
         except Exception as e:
             logger.error(f"流式保存数据失败: {e}")
@@ -1542,6 +1584,8 @@ def initialize_test_step_classes(data_bridge):
         }
         if step_type == "transient":
             workflow_info["transient_packet_size"] = self.get_packet_size()
+        if self.decode_params:
+            workflow_info.update(self.decode_params)
         
         if self.workflow_progress_info:
             workflow_path = self.workflow_progress_info.get("workflow_path", [])
@@ -1554,7 +1598,7 @@ def initialize_test_step_classes(data_bridge):
             })
         
         # 添加到对应步骤类型的缓冲区
-        global_buffer.add_data(test_id, step_type, hex_data, workflow_info)
+        global_buffer.add_data(test_id, step_type, hex_data, workflow_info, output_metadata=output_metadata)
     
     # 应用补丁
     TestStep.progress_callback = step_aware_progress_callback
@@ -93,58 +93,65 @@ class OutputStep(TestStep):
         """
         if self.pending_data_buffer:
             logger.debug(f"清空待发送数据缓冲区，共 {len(self.pending_data_buffer)} 条数据")
-            for hex_data, dev_id in self.pending_data_buffer:
+            for raw_data, dev_id in self.pending_data_buffer:
                 # 发送缓冲的数据，使用当前的栅极电压
-                self.send_enhanced_data(hex_data, dev_id, self.current_gate_voltage)
+                self.send_enhanced_data(raw_data, dev_id, self.current_gate_voltage)
             self.pending_data_buffer.clear()
+
+    def build_output_metadata(self, gate_voltage: int, segment: str) -> Dict[str, Any]:
+        """
+        构造output数据段的元数据，随原始字节一起交给data_callback
+
+        Args:
+            gate_voltage: 栅极电压(mV)
+            segment: "start" 表示该栅压曲线开始（不带数据），"data" 表示数据段
+        """
+        return {
+            "gate_voltage": gate_voltage,
+            "gate_voltage_index": self.gate_voltages.index(gate_voltage),
+            "total_gate_voltages": len(self.gate_voltages),
+            "segment": segment,
+            "is_output_curve": True
+        }
     
     def send_enhanced_data(self, hex_data, dev_id: str, gate_voltage: int):
         """
         *** 新增：发送增强数据的统一方法 ***
+        原始字节保持为bytes，栅压信息通过 output_metadata 关键字参数传递
         """
         try:
-            if isinstance(hex_data, (bytes, bytearray)):
-                hex_data = bytes(hex_data).hex().upper()
+            if isinstance(hex_data, str):
+                raw_bytes = bytes.fromhex(hex_data.replace(" ", ""))
+            else:
+                raw_bytes = bytes(hex_data)
+        except Exception as e:
+            logger.error(f"转换output原始数据失败: {e}")
+            self.data_callback(hex_data, dev_id)
+            return
+
+        try:
             if gate_voltage is None:
                 # 如果栅极电压还没设置，缓存数据
-                logger.debug(f"栅极电压未设置，缓存数据: {len(hex_data)} 字符")
-                self.pending_data_buffer.append((hex_data, dev_id))
+                logger.debug(f"栅极电压未设置，缓存数据: {len(raw_bytes)} 字节")
+                self.pending_data_buffer.append((raw_bytes, dev_id))
                 return
 
             # 累积到对应栅极的原始数据缓冲，用于停止时仍能保存数据
-            try:
-                raw_bytes = bytes.fromhex(hex_data.replace(" ", "")) if isinstance(hex_data, str) else bytes(hex_data)
-                buffer = self.gate_data_buffers.setdefault(gate_voltage, bytearray())
-                buffer.extend(raw_bytes)
-            except Exception as e:
-                logger.error(f"累积output原始数据失败: {e}")
-                # 不中断发送
-                
-            # 构造output元数据
-            output_metadata = {
-                "gate_voltage": gate_voltage,
-                "gate_voltage_index": self.gate_voltages.index(gate_voltage),
-                "total_gate_voltages": len(self.gate_voltages),
-                "is_output_curve": True
-            }
-            
-            # 将元数据编码为特殊标记字符串
-            # 格式: OUTPUT_META:{gate_voltage}:{index}:{total}|{hex_data}
-            meta_prefix = f"OUTPUT_META:{gate_voltage}:{self.gate_voltages.index(gate_voltage)}:{len(self.gate_voltages)}|"
-            enhanced_hex_data = meta_prefix + hex_data
-            
-            # 使用原有的data_callback传递增强后的数据
-            self.data_callback(enhanced_hex_data, dev_id)
+            buffer = self.gate_data_buffers.setdefault(gate_voltage, bytearray())
+            buffer.extend(raw_bytes)
+
+            output_metadata = self.build_output_metadata(gate_voltage, "data")
+            self.data_callback(raw_bytes, dev_id, output_metadata=output_metadata)
             
-            logger.debug(f"发送增强output数据: test_id={self.step_id}, gate_voltage={gate_voltage}mV, data_len={len(hex_data)}")
+            logger.debug(f"发送增强output数据: test_id={self.step_id}, gate_voltage={gate_voltage}mV, data_len={len(raw_bytes)}")
         except Exception as e:
             logger.error(f"发送output数据失败: {str(e)}")
             # 降级：如果失败就发送原始数据
-            self.data_callback(hex_data, dev_id)
+            self.data_callback(raw_bytes, dev_id)
     
     def create_enhanced_data_callback(self, gate_voltage: int):
         """
-        *** 创建增强的数据回调函数，添加output元数据到hex数据 ***
+        *** 创建增强的数据回调函数，为原始数据附加output元数据 ***
         """
         def enhanced_data_callback(hex_data, dev_id: str):
             # 使用统一的发送方法
@@ -155,11 +162,11 @@ class OutputStep(TestStep):
     async def send_gate_voltage_start_signal(self, gate_voltage: int, dev_id: str):
         """
         *** 新增：发送栅极电压开始信号，让前端提前准备曲线 ***
+        开始信号是一个不带数据的 "start" 元数据段
         """
         try:
-            # 发送一个特殊的开始信号
-            start_signal = f"OUTPUT_START:{gate_voltage}:{self.gate_voltages.index(gate_voltage)}:{len(self.gate_voltages)}|"
-            self.data_callback(start_signal, dev_id)
+            output_metadata = self.build_output_metadata(gate_voltage, "start")
+            self.data_callback(b"", dev_id, output_metadata=output_metadata)
             logger.debug(f"发送栅极电压开始信号: {gate_voltage}mV")
             
             # 给前端一点时间处理
@@ -212,7 +219,9 @@ class OutputStep(TestStep):
                 timeout=None,
                 packet_size=self.get_packet_size(),
                 progress_callback=progress_callback_wrapper,
-                data_callback=enhanced_data_callback  # 使用增强回调
+                data_callback=enhanced_data_callback,  # 使用增强回调
+                capture_journal=self.capture_journal,
+                capture_info={"gate_voltage": gate_voltage, "gate_voltage_index": i}
             )
             
             # *** 关键修改4：扫描完成后，确保所有缓冲数据都被发送 ***
@@ -263,7 +272,7 @@ class OutputStep(TestStep):
     def combine_all_scan_data(self) -> bytes:
         """将所有栅极电压的数据合并为CSV格式的字节数据"""
         try:
-            from backend_device_control_pyqt.core.serial_data_parser import bytes_to_numpy
+            from backend_device_control_pyqt.core.serial_data_parser import bytes_to_numpy, format_output_csv
             
             # 解析每个栅极电压的数据
             parsed_data = {}
@@ -281,39 +290,7 @@ class OutputStep(TestStep):
                     if len(data_array) > 0:
                         parsed_data[vg] = data_array
             
-            if not parsed_data:
-                return b''
-            
-            # 找到所有的漏极电压值（从第一组数据中获取）
-            first_vg = list(parsed_data.keys())[0]
-            drain_voltages = parsed_data[first_vg][:, 0]  # 第一列是电压
-            
-            # 创建CSV内容
-            csv_lines = []
-            
-            # 创建表头
-            header = ["Vd"]
-            for vg in sorted(self.gate_voltages):
-                if vg in parsed_data:
-                    header.append(f"Id(Vg={vg}mV)")
-            csv_lines.append(",".join(header))
-            
-            # 添加数据行
-            for i, vd in enumerate(drain_voltages):
-                row = [f"{vd:.3f}"]
-                
-                for vg in sorted(self.gate_voltages):
-                    if vg in parsed_data and i < len(parsed_data[vg]):
-                        current = parsed_data[vg][i, 1]  # 第二列是电流
-                        row.append(f"{current:g}")
-                    else:
-                        row.append("")  # 数据缺失
-                
-                csv_lines.append(",".join(row))
-            
-            # 转换为字节
-            csv_content = "\n".join(csv_lines)
-            return csv_content.encode('utf-8')
+            return format_output_csv(parsed_data, self.gate_voltages)
             
         except Exception as e:
             logger.error(f"合并扫描数据失败: {str(e)}")
@@ -42,6 +42,8 @@ class TestStep(ABC):
         self.reason = None
         self.workflow_progress_info = workflow_progress_info or {}
         self.streaming_saver = None  # Optional IncrementalStepSaver for long-running steps
+        self.capture_journal = None  # Optional RawCaptureJournal for raw serial bytes
+        self.decode_params = {}  # transimpedance_ohms / baseline_current, attached to real-time data messages
         
     @abstractmethod
     async def execute(self) -> Tuple[bytes, str]:
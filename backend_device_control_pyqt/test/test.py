@@ -6,7 +6,9 @@ from datetime import datetime
 import os
 import time
 
-from app_config import get_incremental_save_interval_sec
+from app_config import get_incremental_save_interval_sec, is_raw_capture_enabled
+from backend_device_control_pyqt.core.capture_journal import RawCaptureJournal, journal_stem_for
+from backend_device_control_pyqt.core.step_log import STEP_LOG_FILENAME, TEMP_INFO_FILENAME, encode_step_entry
 
 
 class IncrementalStepSaver:
@@ -123,6 +125,38 @@ class Test:
         os.makedirs(self.test_dir, exist_ok=True)
         return self.test_dir
         
+    def _decode_params(self, step: TestStep) -> Dict[str, Any]:
+        """步骤数据的解码参数（跨阻、基线电流），步骤参数优先于测试元数据"""
+        params = step.params or {}
+        return {
+            "transimpedance_ohms": params.get("transimpedance_ohms", self.metadata.get("transimpedance_ohms", 100.0)),
+            "baseline_current": params.get("baseline_current", self.metadata.get("baseline_current", 0.0)),
+        }
+
+    def _open_capture_journal(self, step: TestStep, index: int, file_name: str) -> Optional[RawCaptureJournal]:
+        """为步骤创建原始数据日志，失败时仅记录错误，不影响测试"""
+        params = step.params or {}
+        meta = {
+            "test_id": self.test_id,
+            "device_id": self.device_id,
+            "test_type": self.test_type,
+            "step_index": index + 1,
+            "step_type": step.get_step_type(),
+            "data_mode": step.get_data_mode(),
+            "data_file": file_name,
+            "packet_size": step.get_packet_size(),
+            **self._decode_params(step),
+            "params": params,
+            "workflow_info": step.workflow_progress_info,
+        }
+        if step.get_step_type() == "output":
+            meta["gate_voltages"] = getattr(step, "gate_voltages", [])
+        try:
+            return RawCaptureJournal(journal_stem_for(os.path.join(self.test_dir, file_name)), meta)
+        except Exception as e:
+            logger.error(f"创建原始数据日志失败 ({file_name}): {e}")
+            return None
+
     async def execute(self, save_file_async_fn):
         """
         Execute all steps in the test sequence
@@ -149,6 +183,16 @@ class Test:
             "steps": []
         }
         
+        # 测试开始时写一次不含步骤列表的临时信息，步骤通过 steps.jsonl 追加
+        temp_test_info = dict(test_info)
+        temp_test_info.pop("steps")
+        temp_test_info["status"] = "in_progress"
+        temp_test_info["total_steps"] = len(self.steps)
+        temp_test_info["step_log"] = STEP_LOG_FILENAME
+        save_file_async_fn(f"{self.test_dir}/{TEMP_INFO_FILENAME}",
+                        json.dumps(temp_test_info, indent=4, ensure_ascii=False),
+                        'json')
+        
         was_stopped = False
         completed_steps = 0
         
@@ -163,6 +207,7 @@ class Test:
                 # 配置增量保存（仅适用于瞬态，且配置间隔>0）
                 incremental_interval = get_incremental_save_interval_sec()
                 streaming_saver = None
+                capture_journal = None
                 if step.get_step_type() == "transient" and incremental_interval > 0:
                     save_kwargs = {"transient_packet_size": step.get_packet_size()}
                     streaming_saver = IncrementalStepSaver(
@@ -187,6 +232,14 @@ class Test:
                     logger.info(f"Test {self.test_id} sync complete, executing step {i+1}")
                         
                 logger.info(f"Executing {step.get_step_type()} step {i+1} of test {self.test_id}")
+
+                # 实时数据随消息带上解码参数，数据传输进程据此计算实时指标
+                step.decode_params = self._decode_params(step)
+
+                # 可选：原样记录串口原始字节，用于崩溃后重建数据文件
+                if is_raw_capture_enabled():
+                    capture_journal = self._open_capture_journal(step, i, file_name)
+                    step.capture_journal = capture_journal
                         
                 # 执行步骤
                 data, reason = await step.execute()
@@ -205,6 +258,9 @@ class Test:
                 # 确保增量缓存刷盘
                 if streaming_saver:
                     streaming_saver.flush(force=True, final=True)
+                if capture_journal:
+                    capture_journal.close()
+                    step.capture_journal = None
             
             # 检查步骤后是否设置了停止标志（步骤执行期间可能被设置）
             if step.device._stop_event.is_set():
@@ -232,18 +288,16 @@ class Test:
                 test_info["steps"].append(step_info)
                 data_saved = True
             
-            # 每完成一个步骤就保存一次测试信息的临时副本
-            # 这确保即使在下一步开始时崩溃，也能有部分信息
+            # 每完成一个步骤向步骤日志追加一行，单步开销与已完成步骤数无关
+            # 崩溃后可由 test_info_temp.json + steps.jsonl 恢复部分信息
             if data_saved:
-                temp_test_info = test_info.copy()
-                temp_test_info["status"] = "in_progress"
-                temp_test_info["last_updated"] = datetime.now().isoformat()
-                temp_test_info["completed_steps"] = completed_steps
-                temp_test_info["total_steps"] = len(self.steps)
-                
-                save_file_async_fn(f"{self.test_dir}/test_info_temp.json", 
-                                json.dumps(temp_test_info, indent=4, ensure_ascii=False), 
-                                'json')
+                log_entry = dict(test_info["steps"][-1])
+                log_entry["step_index"] = i + 1
+                log_entry["completed_steps"] = completed_steps
+                log_entry["logged_at"] = datetime.now().isoformat()
+                save_file_async_fn(f"{self.test_dir}/{STEP_LOG_FILENAME}",
+                                encode_step_entry(log_entry),
+                                'jsonl')
             
             # 如果是停止状态，跳出循环
             if was_stopped:
@@ -63,7 +63,8 @@ class TransferStep(TestStep):
             timeout=None,
             packet_size=self.get_packet_size(),
             progress_callback=self.progress_callback,
-            data_callback=self.data_callback
+            data_callback=self.data_callback,
+            capture_journal=self.capture_journal
         )
         
         self.end_time = datetime.now().isoformat()
@@ -70,7 +70,8 @@ class TransientStep(TestStep):
             packet_size=self.get_packet_size(),
             progress_callback=self.progress_callback,
             data_callback=self.data_callback,
-            streaming_mode=streaming_mode
+            streaming_mode=streaming_mode,
+            capture_journal=self.capture_journal
         )
         
         self.end_time = datetime.now().isoformat()
@@ -228,6 +228,12 @@ class MainWindow(QMainWindow):
             # Save geometry
             self.save_geometry()
             
+            # Stop the real-time receiver thread before the backend queues go away
+            self.device_control.stop_realtime_receiver()
+
+            # Cancel history loaders/exports/analysis and wait for their threads
+            self.test_history.stop_background_tasks()
+
             # Shutdown backend
             self.backend.shutdown()
             
@@ -0,0 +1,44 @@
+"""
+Background batch analysis for the history page
+历史页的批量分析：在 QThread 中调用后端 analyze_saved_tests（内部为进程池），
+汇报进度并支持取消；完成后历史页刷新列表，新的指标即可用于排序和过滤。
+"""
+
+from typing import List, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+
+class BatchAnalysisWorker(QObject):
+    """在 QThread 中批量分析测试"""
+
+    progress = pyqtSignal(int, int)  # 已完成数, 总数
+    finished = pyqtSignal(object)    # analyze_saved_tests 的返回值
+    done = pyqtSignal()
+
+    def __init__(self, backend, test_dirs: Optional[List[str]] = None, force: bool = False):
+        super().__init__()
+        self.backend = backend
+        self.test_dirs = test_dirs
+        self.force = force
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            result = self.backend.analyze_saved_tests(
+                self.test_dirs, force=self.force,
+                progress_callback=lambda done, total, _test_dir: self.progress.emit(done, total),
+                cancel_check=lambda: self._cancelled)
+        except Exception as e:
+            logger.error(f"批量分析失败: {e}")
+            result = {"status": "error", "reason": str(e)}
+        self.finished.emit(result)
+        self.done.emit()
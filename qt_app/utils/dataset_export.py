@@ -0,0 +1,306 @@
+"""
+Consolidated long-format dataset export
+把多个测试的步骤数据合并为一个长表数据集：每行一个数据点，带测试/步骤/循环/芯片等键，
+output 步骤的多条曲线展开为多行（series 列为原列名）。
+
+- CSV：test_id, device_id, chip_id, device_number, step_index, step_type, iteration, series, x, value
+- 二进制：列式 ``.col`` 文件（见 columnar_store，可直接 np.memmap），数值列为
+  test, step_index, iteration, step, series, x, value，其中 test/step 为编码，
+  对应的测试信息、步骤信息和 series 列名写在同名 ``.keys.json`` 中
+
+每个步骤由进程池中的一个任务读取并编码，写到输出目录下的临时文件；主进程按顺序把
+临时文件分块追加到输出文件后删除，同时在途的任务数有上限，整个数据集不会一次性放进内存。
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend_device_control_pyqt.core.columnar_store import COLUMNAR_DTYPE, COLUMNAR_INDEX_SUFFIX, append_columnar
+from qt_app.utils.step_loader import read_step_cached
+from qt_app.utils.test_export import ExportCancelled
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+DATASET_FORMAT_CSV = "csv"
+DATASET_FORMAT_COLUMNAR = "col"
+DATASET_FORMATS = (DATASET_FORMAT_CSV, DATASET_FORMAT_COLUMNAR)
+
+CSV_COLUMNS = ("test_id", "device_id", "chip_id", "device_number", "step_index", "step_type",
+               "iteration", "series", "x", "value")
+COLUMNAR_COLUMNS = ("test", "step_index", "iteration", "step", "series", "x", "value")
+KEYS_SUFFIX = ".keys.json"
+# 二进制临时文件每次编码/追加的行数
+BLOCK_ROWS = 1 << 20
+APPEND_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def keys_path_for(dataset_path: str) -> str:
+    """二进制数据集对应的键表文件路径"""
+    stem, _ = os.path.splitext(dataset_path)
+    return stem + KEYS_SUFFIX
+
+
+def _csv_field(value: Any) -> str:
+    text = "" if value is None else str(value)
+    if any(c in text for c in ',"\r\n'):
+        text = '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _iteration_of(step: Dict[str, Any]) -> int:
+    """步骤所在循环的当前轮次（嵌套循环取最内层），不在循环中时为 0"""
+    iteration_info = (step.get("workflow_info") or {}).get("iteration_info") or {}
+    try:
+        return int(iteration_info.get("current") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def plan_dataset(tests: Sequence[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """
+    读取各测试的 test_info.json，列出要导出的步骤
+
+    Returns:
+        (测试键表, 步骤列表, 跳过的测试数)；步骤按测试、步骤顺序排列，
+        其 "test" 为测试键表中的序号
+    """
+    test_keys = []
+    steps = []
+    skipped = 0
+    for test in tests:
+        test_dir = test.get("dir_path", "")
+        try:
+            with open(os.path.join(test_dir, "test_info.json"), "r", encoding="utf-8") as f:
+                test_info = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"数据集导出跳过测试 {test_dir}: {e}")
+            skipped += 1
+            continue
+        metadata = test_info.get("metadata") if isinstance(test_info.get("metadata"), dict) else {}
+        test_code = len(test_keys)
+        test_keys.append({
+            "test_id": test_info.get("test_id", test.get("test_id", "")),
+            "device_id": test.get("device_id", ""),
+            "chip_id": str(test.get("chip_id") or metadata.get("chip_id", "") or ""),
+            "device_number": str(test.get("device_number") or metadata.get("device_number", "") or ""),
+            "name": test_info.get("name", test.get("name", "")),
+            "dir_path": test_dir,
+        })
+        for index, step in enumerate(test_info.get("steps") or []):
+            if not isinstance(step, dict) or not step.get("data_file"):
+                continue
+            data_path = os.path.join(test_dir, step["data_file"])
+            if not os.path.exists(data_path):
+                continue
+            steps.append({
+                "test": test_code,
+                "step_index": index + 1,
+                "step_type": step.get("type", ""),
+                "iteration": _iteration_of(step),
+                "data_file": data_path,
+            })
+    return test_keys, steps, skipped
+
+
+def _export_step(task: Dict[str, Any]) -> Tuple[int, List[str]]:
+    """
+    进程池任务：读取一个步骤并把长表行写到 task["temp_path"]
+
+    Returns:
+        (写出的行数, series 列名)
+    """
+    step = task["step"]
+    step_type = step["step_type"]
+    header, data = read_step_cached(step["data_file"], drop_incomplete=step_type != "output",
+                                    use_sidecar=task["use_sidecar"])
+    series = list(header[1:])
+    rows = 0
+    if len(data) == 0 or not series:
+        open(task["temp_path"], "wb").close()
+        return 0, series
+    x = np.asarray(data[:, 0], dtype=np.float64)
+    if task["format"] == DATASET_FORMAT_CSV:
+        keys = task["test_key"]
+        prefix = ",".join(_csv_field(value) for value in (
+            keys["test_id"], keys["device_id"], keys["chip_id"], keys["device_number"],
+            step["step_index"], step_type, step["iteration"]))
+        with open(task["temp_path"], "w", encoding="utf-8", newline="") as f:
+            for column, name in enumerate(series, start=1):
+                y = np.asarray(data[:, column], dtype=np.float64)
+                valid = ~(np.isnan(x) | np.isnan(y))
+                if not valid.any():
+                    continue
+                line_format = (prefix + "," + _csv_field(name)).replace("%", "%%") + ",%.10g,%.10g"
+                np.savetxt(f, np.column_stack((x[valid], y[valid])), fmt=line_format, newline="\n")
+                rows += int(valid.sum())
+    else:
+        with open(task["temp_path"], "wb") as f:
+            for column in range(1, len(series) + 1):
+                y = np.asarray(data[:, column], dtype=np.float64)
+                valid = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+                for start in range(0, len(valid), BLOCK_ROWS):
+                    rows_index = valid[start:start + BLOCK_ROWS]
+                    block = np.empty((len(rows_index), len(COLUMNAR_COLUMNS)), dtype=COLUMNAR_DTYPE)
+                    block[:, 0] = step["test"]
+                    block[:, 1] = step["step_index"]
+                    block[:, 2] = step["iteration"]
+                    block[:, 3] = task["step_code"]
+                    block[:, 4] = column - 1
+                    block[:, 5] = x[rows_index]
+                    block[:, 6] = y[rows_index]
+                    f.write(block.tobytes())
+                rows += len(valid)
+    return rows, series
+
+
+class DatasetExporter:
+    """
+    执行一次数据集导出（在工作线程中调用 run），接口与 TestExporter 相同，
+    进度按已完成的步骤数汇报
+    """
+
+    def __init__(self, tests: Sequence[Dict[str, Any]], target: str, dataset_format: str = DATASET_FORMAT_CSV,
+                 processes: Optional[int] = None, use_sidecar: bool = True):
+        if dataset_format not in DATASET_FORMATS:
+            raise ValueError(f"Unknown dataset format: {dataset_format}")
+        self.tests = list(tests)
+        self.target = target
+        self.dataset_format = dataset_format
+        self.processes = processes or max((os.cpu_count() or 2) - 1, 1)
+        self.use_sidecar = use_sidecar
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _output_paths(self) -> List[str]:
+        if self.dataset_format == DATASET_FORMAT_CSV:
+            return [self.target]
+        return [self.target, self.target + COLUMNAR_INDEX_SUFFIX, keys_path_for(self.target)]
+
+    def _remove_outputs(self):
+        for path in self._output_paths():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def run(self, progress_callback=None) -> Dict[str, Any]:
+        """
+        Returns:
+            {"exported", "skipped", "cancelled", "rows", "path"}；出错时抛出异常（部分结果已删除）
+        """
+        progress = progress_callback or (lambda done, total: None)
+        test_keys, steps, skipped = plan_dataset(self.tests)
+        progress(0, len(steps))
+        temp_dir = tempfile.mkdtemp(prefix=".dataset_", dir=os.path.dirname(os.path.abspath(self.target)))
+        try:
+            rows, exported_tests = self._run_pool(test_keys, steps, temp_dir, progress)
+        except ExportCancelled:
+            self._remove_outputs()
+            return {"exported": 0, "skipped": skipped, "cancelled": True, "rows": 0, "path": self.target}
+        except BaseException:
+            self._remove_outputs()
+            raise
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return {"exported": len(exported_tests), "skipped": skipped + len(test_keys) - len(exported_tests),
+                "cancelled": False, "rows": rows, "path": self.target}
+
+    def _open_output(self):
+        if self.dataset_format == DATASET_FORMAT_CSV:
+            output = open(self.target, "w", encoding="utf-8", newline="")
+            output.write(",".join(CSV_COLUMNS) + "\n")
+            return output
+        append_columnar(self.target, np.empty((0, len(COLUMNAR_COLUMNS))), COLUMNAR_COLUMNS,
+                        meta={"kind": "long_dataset", "keys_file": os.path.basename(keys_path_for(self.target))},
+                        reset=True)
+        return None
+
+    def _append_part(self, output, temp_path: str):
+        if self.dataset_format == DATASET_FORMAT_CSV:
+            with open(temp_path, "r", encoding="utf-8", newline="") as part:
+                shutil.copyfileobj(part, output, APPEND_CHUNK_SIZE)
+            return
+        width = len(COLUMNAR_COLUMNS)
+        with open(temp_path, "rb") as part:
+            while True:
+                block = np.fromfile(part, dtype=COLUMNAR_DTYPE, count=BLOCK_ROWS * width)
+                if block.size == 0:
+                    break
+                append_columnar(self.target, block.reshape(-1, width), COLUMNAR_COLUMNS)
+
+    def _run_pool(self, test_keys, steps, temp_dir, progress) -> Tuple[int, set]:
+        rows = 0
+        exported_tests = set()
+        output = self._open_output()
+        in_flight = deque()
+        pool = ProcessPoolExecutor(max_workers=self.processes)
+        try:
+            pending = iter(enumerate(steps))
+            # 在途任务数有上限，未追加的临时文件不会堆积
+            window = self.processes * 2
+            done = 0
+            while True:
+                while len(in_flight) < window:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    step_code, step = item
+                    task = {
+                        "step": step,
+                        "step_code": step_code,
+                        "test_key": test_keys[step["test"]],
+                        "format": self.dataset_format,
+                        "temp_path": os.path.join(temp_dir, f"{step_code}.part"),
+                        "use_sidecar": self.use_sidecar,
+                    }
+                    in_flight.append((step_code, task["temp_path"], pool.submit(_export_step, task)))
+                if not in_flight:
+                    break
+                step_code, temp_path, future = in_flight.popleft()
+                while not future.done():
+                    if self._cancelled.wait(0.05):
+                        raise ExportCancelled()
+                step_rows, series = future.result()
+                steps[step_code]["series"] = series
+                steps[step_code]["rows"] = step_rows
+                if step_rows:
+                    self._append_part(output, temp_path)
+                    rows += step_rows
+                    exported_tests.add(steps[step_code]["test"])
+                os.remove(temp_path)
+                done += 1
+                progress(done, len(steps))
+                if self._cancelled.is_set():
+                    raise ExportCancelled()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            if output is not None:
+                output.close()
+
+        if self.dataset_format == DATASET_FORMAT_COLUMNAR:
+            keys = {
+                "columns": list(COLUMNAR_COLUMNS),
+                "tests": test_keys,
+                "steps": [dict(step, data_file=os.path.relpath(step["data_file"], test_keys[step["test"]]["dir_path"]))
+                          for step in steps],
+            }
+            with open(keys_path_for(self.target), "w", encoding="utf-8") as f:
+                json.dump(keys, f, ensure_ascii=False, indent=2)
+        return rows, exported_tests
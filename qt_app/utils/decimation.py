@@ -0,0 +1,87 @@
+"""
+Min/max envelope decimation for plotting
+按像素桶取最小/最大值的降采样：每个桶保留极小值和极大值两个点（按原顺序），
+尖峰和掉点在任何缩放级别下都不会被抽掉，绘制点数只与屏幕宽度有关。
+"""
+
+import numpy as np
+
+
+def is_monotonic(x: np.ndarray) -> bool:
+    """x 是否单调不减（时间轴等），单调时可以按可见范围切片"""
+    if len(x) < 2:
+        return True
+    return bool(np.all(np.diff(x) >= 0))
+
+
+def visible_slice(x: np.ndarray, x_min: float, x_max: float) -> slice:
+    """
+    单调 x 在 [x_min, x_max] 内的索引范围，两侧各多带一个点，
+    让折线延伸到视图边缘之外
+    """
+    start = int(np.searchsorted(x, x_min, side="left"))
+    stop = int(np.searchsorted(x, x_max, side="right"))
+    return slice(max(start - 1, 0), min(stop + 1, len(x)))
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, buckets: int):
+    """
+    将 (x, y) 按索引等分为 buckets 个桶，每桶保留最小值和最大值对应的点
+
+    Args:
+        x, y: 等长一维数组
+        buckets: 桶数，通常取绘图区域像素宽度
+
+    Returns:
+        (x_out, y_out)，点数不超过 2 * buckets；数据本就不多时原样返回
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    buckets = max(int(buckets), 1)
+    if n <= 2 * buckets:
+        return x, y
+
+    size = -(-n // buckets)  # 向上取整
+    rows = -(-n // size)
+    pad = rows * size - n
+
+    y_low = y
+    y_high = y
+    nan_mask = np.isnan(y)
+    if nan_mask.any():
+        y_low = np.where(nan_mask, np.inf, y)
+        y_high = np.where(nan_mask, -np.inf, y)
+    if pad:
+        y_low = np.concatenate((y_low, np.full(pad, y_low[-1])))
+        y_high = np.concatenate((y_high, np.full(pad, y_high[-1])))
+
+    offsets = np.arange(rows) * size
+    idx_min = np.argmin(y_low.reshape(rows, size), axis=1) + offsets
+    idx_max = np.argmax(y_high.reshape(rows, size), axis=1) + offsets
+    np.minimum(idx_min, n - 1, out=idx_min)
+    np.minimum(idx_max, n - 1, out=idx_max)
+
+    # 每桶两个点按原始顺序排列，保持折线走向
+    pair = np.empty((rows, 2), dtype=np.int64)
+    pair[:, 0] = np.minimum(idx_min, idx_max)
+    pair[:, 1] = np.maximum(idx_min, idx_max)
+    indices = pair.ravel()
+    return x[indices], y[indices]
+
+
+def decimate_for_view(x: np.ndarray, y: np.ndarray, pixel_width: int, x_range=None, monotonic: bool = False):
+    """
+    按当前视图准备绘图数据：x 单调时先裁剪到可见范围，再按像素宽度做 min/max 降采样
+
+    Args:
+        x, y: 完整数据
+        pixel_width: 绘图区域宽度（像素）
+        x_range: (x_min, x_max) 当前可见范围，None 表示全部
+        monotonic: x 是否单调不减
+    """
+    if monotonic and x_range is not None and len(x) > 0:
+        window = visible_slice(x, x_range[0], x_range[1])
+        x = x[window]
+        y = y[window]
+    return minmax_decimate(x, y, max(int(pixel_width), 100))
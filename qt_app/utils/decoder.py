@@ -4,6 +4,7 @@ Converts hex strings to bytes and parses them into usable data
 支持output类型的多曲线数据处理
 """
 
+import re
 import sys
 import traceback
 import numpy as np
@@ -108,174 +109,268 @@ def decode_hex_to_bytes(hex_string):
         traceback.print_exc()
         return b''
 
-def decode_bytes_to_data(byte_data, mode='transfer', transimpedance_ohms=100.0, transient_packet_size: int = None,
-                         baseline_current: float = 0.0):
-    """
-    Decode bytes to data points - *** 改进output支持 ***
-    
-    Args:
-        byte_data: Raw byte data
-        mode: 'transfer', 'transient', or 'output'
-        
-    Returns:
-        list: List of [x, y] data points
-    """
+_OUTPUT_END_PREFIX = np.frombuffer(b'\xCD\xAB\xEF\xCD\xAB', dtype=np.uint8)
+
+
+def _resolve_packet_size(byte_data, mode, transient_packet_size):
     if transient_packet_size is not None:
         try:
             transient_packet_size = int(transient_packet_size)
         except (TypeError, ValueError):
             transient_packet_size = None
 
-    # Define packet size based on mode
-    if mode == 'transient':
-        if transient_packet_size in (7, 9):
-            packet_size = transient_packet_size
-        else:
-            data_len = len(byte_data) if byte_data else 0
-            if data_len and data_len % 9 == 0 and data_len % 7 != 0:
-                packet_size = 9
-            elif data_len and data_len % 7 == 0 and data_len % 9 != 0:
-                packet_size = 7
-            elif data_len and data_len % 9 == 0:
-                packet_size = 9
-            else:
-                packet_size = 7
-    else:
-        packet_size = 5
-    
+    if mode != 'transient':
+        return 5
+    if transient_packet_size in (7, 9):
+        return transient_packet_size
+    data_len = len(byte_data) if byte_data else 0
+    if data_len and data_len % 9 == 0 and data_len % 7 != 0:
+        return 9
+    if data_len and data_len % 7 == 0 and data_len % 9 != 0:
+        return 7
+    if data_len and data_len % 9 == 0:
+        return 9
+    return 7
+
+
+def decode_bytes_to_array(byte_data, mode='transfer', transimpedance_ohms=100.0, transient_packet_size: int = None,
+                          baseline_current: float = 0.0) -> np.ndarray:
+    """
+    Vectorized decode of raw packets into an (N, 2) float64 array of [x, y]
+
+    transient: [time(s), current]; transfer/output: [voltage(V), current].
+    结束序列分片会被跳过；transfer/output 额外过滤 |V|>5V、|I|>1A 及非有限值。
+    """
+    packet_size = _resolve_packet_size(byte_data, mode, transient_packet_size)
+    empty = np.empty((0, 2), dtype=np.float64)
+
     try:
         baseline_current = float(baseline_current)
     except (TypeError, ValueError):
         baseline_current = 0.0
-    
-    # Initialize result list
-    result = []
-    
-    # Check for empty data
+    try:
+        transimpedance_ohms = float(transimpedance_ohms)
+    except (TypeError, ValueError):
+        transimpedance_ohms = 100.0
+    if transimpedance_ohms <= 0:
+        transimpedance_ohms = 100.0
+
     if not byte_data or len(byte_data) < packet_size:
         logger.debug(f"解码: 数据为空或长度不足 ({len(byte_data) if byte_data else 0} 字节)")
-        return result
+        return empty
 
     try:
-        # Print some debug info
-        logger.debug(f"解码: 模式={mode}, 数据长度={len(byte_data)}字节, 包大小={packet_size}字节")
+        total_packets = len(byte_data) // packet_size
+        usable_bytes = total_packets * packet_size
+        data = np.frombuffer(bytes(byte_data[:usable_bytes]), dtype=np.uint8).reshape(total_packets, packet_size)
+
+        # Drop end-sequence fragments that can appear as full packets (e.g. 0xFE x7)
+        end_mask = np.all(data == 0xFE, axis=1) | np.all(data == 0xFF, axis=1)
+        if mode != 'transient':
+            end_mask |= np.all(data == _OUTPUT_END_PREFIX, axis=1)
+        if np.any(end_mask):
+            data = data[~end_mask]
+            if data.size == 0:
+                return empty
 
         if mode == 'transient':
-            # Fast path for transient using vectorized numpy operations
-            total_packets = len(byte_data) // packet_size
-            if total_packets == 0:
-                return result
-            usable_bytes = total_packets * packet_size
-            data = np.frombuffer(byte_data[:usable_bytes], dtype=np.uint8).reshape(total_packets, packet_size)
-
-            # Drop end-sequence fragments that can appear as full packets (e.g. 0xFE x7)
-            end_mask = np.all(data == 0xFE, axis=1) | np.all(data == 0xFF, axis=1)
-            if np.any(end_mask):
-                data = data[~end_mask]
-                if data.size == 0:
-                    return result
-
-            ts = (data[:, 0].astype(np.uint32) |
-                  (data[:, 1].astype(np.uint32) << 8) |
-                  (data[:, 2].astype(np.uint32) << 16) |
-                  (data[:, 3].astype(np.uint32) << 24))
-
-            if packet_size == 9:
-                current_bytes = data[:, 6:9]
-            else:
-                current_bytes = data[:, 4:7]
-
-            raw = (current_bytes[:, 0].astype(np.uint32) << 16) | (current_bytes[:, 1].astype(np.uint32) << 8) | current_bytes[:, 2].astype(np.uint32)
-            neg_mask = (raw & 0x00800000) != 0
-            raw_neg = ((~raw) & 0x007FFFFF) + 1
-            voltage = np.where(neg_mask,
-                               -(raw_neg.astype(np.float64) / 8388608.0) * 2.048,
-                               (raw.astype(np.float64) / 8388607.0) * 2.048)
-
-            current_value = -voltage / transimpedance_ohms - baseline_current
-            result = np.column_stack((ts.astype(np.float64) / 1000.0, current_value)).tolist()
-            logger.debug(f"解码完成: 生成了 {len(result)} 个数据点")
-            return result
-
-        # *** 改进：检查是否包含output结束序列 ***
-        if contains_output_end_sequence(byte_data):
-            logger.debug("检测到output结束序列，将在处理中跳过")
-        elif contains_end_sequence(byte_data):
-            logger.debug("检测到其他结束序列，将在处理中跳过")
-        
-        # Process each packet
-        packets_processed = 0
-        for i in range(0, len(byte_data) - packet_size + 1, packet_size):
-            # *** 改进：跳过各种类型的结束序列 ***
-            if is_any_end_sequence(byte_data, i, packet_size):
-                logger.debug(f"跳过结束序列在位置 {i}")
-                continue
-            
-            try:
-                if mode == 'transient':
-                    # Process transient data
-                    # Time stamp (4 bytes, little endian)
-                    ts = int.from_bytes(byte_data[i:i+4], byteorder='little', signed=False)
-
-                    if packet_size == 9:
-                        current_start = i + 6
-                        current_end = i + 9
-                    else:
-                        current_start = i + 4
-                        current_end = i + 7
-                    # Current (3 bytes)
-                    current_raw = int.from_bytes(b'\x00' + byte_data[current_start:current_end], byteorder='big')
-                    current_value = -ads_cal_voltage(current_raw) / transimpedance_ohms - baseline_current
-
-                    # Add data point - convert ms to seconds for time
-                    result.append([ts / 1000.0, current_value])
-                    
-                else:  # transfer or output
-                    # Process transfer/output data
-                    # Voltage (2 bytes, little endian, signed)
-                    voltage_raw = int.from_bytes(byte_data[i:i+2], byteorder='little', signed=True)
-
-                    if mode == 'output':
-                        # For output, this is drain voltage
-                        voltage = voltage_raw / 1000.0  # Convert to volts
-                    else:
-                        # For transfer, this is gate voltage
-                        voltage = voltage_raw / 1000.0  # Convert to volts
-
-                    # Current (3 bytes)
-                    current_raw = int.from_bytes(b'\x00' + byte_data[i+2:i+5], byteorder='big')
-                    current_value = -ads_cal_voltage(current_raw) / transimpedance_ohms - baseline_current
-
-                    # *** 数据验证：过滤异常值 ***
-                    # 电压合理范围：-5V 到 +5V（根据实际应用调整）
-                    # 电流合理范围：-1A 到 +1A
-                    if abs(voltage) > 5.0:
-                        logger.warning(f"跳过异常电压值: {voltage}V at packet {packets_processed}")
-                        continue
-                    if abs(current_value) > 1.0:
-                        logger.warning(f"跳过异常电流值: {current_value}A at packet {packets_processed}")
-                        continue
-
-                    # Add data point
-                    result.append([voltage, current_value])
-
-                    packets_processed += 1
-
-                    # Print the first few data points for debugging
-                    if packets_processed <= 3:
-                        logger.debug(f"数据点 {packets_processed}: Voltage={voltage}V, Current={current_value}A")
-                        
-            except Exception as e:
-                logger.warning(f"解析数据包 {i//packet_size} 时出错: {e}")
-                continue
-    
+            x = (data[:, 0].astype(np.uint32) |
+                 (data[:, 1].astype(np.uint32) << 8) |
+                 (data[:, 2].astype(np.uint32) << 16) |
+                 (data[:, 3].astype(np.uint32) << 24)).astype(np.float64) / 1000.0
+            current_bytes = data[:, 6:9] if packet_size == 9 else data[:, 4:7]
+        else:
+            x = (data[:, 0].astype(np.uint16) | (data[:, 1].astype(np.uint16) << 8)).view(np.int16) / 1000.0
+            current_bytes = data[:, 2:5]
+
+        raw = (current_bytes[:, 0].astype(np.uint32) << 16) | (current_bytes[:, 1].astype(np.uint32) << 8) | current_bytes[:, 2].astype(np.uint32)
+        neg_mask = (raw & 0x00800000) != 0
+        raw_neg = ((~raw) & 0x007FFFFF) + 1
+        voltage = np.where(neg_mask,
+                           -(raw_neg.astype(np.float64) / 8388608.0) * 2.048,
+                           (raw.astype(np.float64) / 8388607.0) * 2.048)
+        current_value = -voltage / transimpedance_ohms - baseline_current
+        result = np.column_stack((x, current_value))
+
+        if mode != 'transient':
+            # *** 数据验证：过滤异常值 *** 电压 -5V~+5V，电流 -1A~+1A
+            valid = np.isfinite(x) & np.isfinite(current_value) & (np.abs(x) <= 5.0) & (np.abs(current_value) <= 1.0)
+            if not np.all(valid):
+                logger.warning(f"跳过 {int(np.count_nonzero(~valid))} 个异常数据点")
+                result = result[valid]
+
+        logger.debug(f"解码完成: 生成了 {len(result)} 个数据点")
+        return result
     except Exception as e:
         logger.error(f"解码过程中出错: {e}")
         traceback.print_exc()
+        return empty
+
+
+def decode_bytes_to_data(byte_data, mode='transfer', transimpedance_ohms=100.0, transient_packet_size: int = None,
+                         baseline_current: float = 0.0):
+    """
+    Decode bytes to data points - *** 改进output支持 ***
     
-    # Print summary
-    logger.debug(f"解码完成: 生成了 {len(result)} 个数据点")
-    return result
+    Args:
+        byte_data: Raw byte data
+        mode: 'transfer', 'transient', or 'output'
+        
+    Returns:
+        list: List of [x, y] data points
+    """
+    return decode_bytes_to_array(
+        byte_data,
+        mode,
+        transimpedance_ohms=transimpedance_ohms,
+        transient_packet_size=transient_packet_size,
+        baseline_current=baseline_current,
+    ).tolist()
+
+_OUTPUT_MARKER_RE = re.compile(r"OUTPUT_(?:START|META):")
+
+
+def split_output_segments(hex_data):
+    """Split concatenated OUTPUT_START/OUTPUT_META segments into individual chunks."""
+    if not isinstance(hex_data, str):
+        return [hex_data]
+
+    matches = list(_OUTPUT_MARKER_RE.finditer(hex_data))
+    if not matches:
+        return [hex_data]
+
+    segments = []
+    # Keep any leading data before first marker (fallback)
+    if matches[0].start() > 0:
+        segments.append(hex_data[:matches[0].start()])
+
+    for idx, match in enumerate(matches):
+        start = match.start()
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(hex_data)
+        segments.append(hex_data[start:end])
+
+    return segments
+
+
+def parse_output_metadata(hex_data):
+    """
+    解析hex数据中的output元数据前缀
+
+    Returns:
+        (signal_type, output_metadata, clean_hex_data)，signal_type 为 "start"/"data"/None
+    """
+    if not isinstance(hex_data, str):
+        return None, None, hex_data
+
+    for prefix, signal_type in (("OUTPUT_START:", "start"), ("OUTPUT_META:", "data")):
+        if not hex_data.startswith(prefix):
+            continue
+        try:
+            if signal_type == "start":
+                meta_part, actual_hex_data = hex_data.rstrip("|"), ""
+            else:
+                meta_part, actual_hex_data = hex_data.split("|", 1)
+            meta_parts = meta_part.split(":")
+            if len(meta_parts) == 4:
+                output_metadata = {
+                    "gate_voltage": int(meta_parts[1]),
+                    "gate_voltage_index": int(meta_parts[2]),
+                    "total_gate_voltages": int(meta_parts[3]),
+                    "is_output_curve": True
+                }
+                return signal_type, output_metadata, actual_hex_data
+        except (ValueError, IndexError) as e:
+            logger.error(f"解析output元数据失败: {e}")
+        break
+
+    return None, None, hex_data
+
+
+def decode_realtime_message(message, transimpedance_ohms=100.0, baseline_current=0.0):
+    """
+    将一条 test_data 消息解码为绘图事件列表（可在后台线程中执行）
+
+    output 消息优先使用结构化的 message["output_segments"]（字节偏移 + 栅压信息），
+    旧版 OUTPUT_START/OUTPUT_META 前缀字符串仍可解析。
+
+    事件格式：
+        ("block", mode, array)          transfer/transient 单曲线数据块
+        ("output_start", metadata)      output 曲线开始信号
+        ("output_data", metadata, array) output 某条曲线的数据块
+        ("output_fallback", array)      无元数据的 output 数据（单曲线兼容模式）
+
+    Returns:
+        事件列表；不是 test_data 或没有数据时返回 None
+    """
+    if message.get("type") != "test_data":
+        return None
+    hex_data = message.get("data", "")
+    output_segments = message.get("output_segments")
+    if not hex_data and not output_segments:
+        return None
+
+    step_type = message.get("step_type", "")
+    events = []
+    if step_type != "output":
+        mode = 'transient' if step_type == 'transient' else 'transfer'
+        packet_size = None
+        if mode == 'transient':
+            packet_size = (message.get("workflow_info") or {}).get("transient_packet_size")
+        block = decode_bytes_to_array(
+            decode_hex_to_bytes(hex_data),
+            mode,
+            transimpedance_ohms=transimpedance_ohms,
+            transient_packet_size=packet_size,
+            baseline_current=baseline_current
+        )
+        events.append(("block", mode, block))
+        return events
+
+    def _decode_output(segment):
+        return decode_bytes_to_array(
+            decode_hex_to_bytes(segment),
+            mode='transfer',
+            transimpedance_ohms=transimpedance_ohms,
+            baseline_current=baseline_current
+        )
+
+    if output_segments:
+        raw = hex_data
+        if isinstance(raw, str):
+            raw = bytes.fromhex(raw.replace(" ", ""))
+        for segment in output_segments:
+            output_metadata = {
+                "gate_voltage": segment.get("gate_voltage", 0),
+                "gate_voltage_index": segment.get("gate_voltage_index", 0),
+                "total_gate_voltages": segment.get("total_gate_voltages", 1),
+                "is_output_curve": True
+            }
+            if segment.get("segment") == "start":
+                events.append(("output_start", output_metadata))
+                continue
+            offset = int(segment.get("offset", 0))
+            chunk = raw[offset:offset + int(segment.get("length", 0))]
+            if chunk:
+                events.append(("output_data", output_metadata, _decode_output(chunk)))
+        return events
+
+    if isinstance(hex_data, str) and ("OUTPUT_START:" in hex_data or "OUTPUT_META:" in hex_data):
+        for segment in split_output_segments(hex_data):
+            if not segment:
+                continue
+            signal_type, output_metadata, clean_hex_data = parse_output_metadata(segment)
+            if signal_type == "start":
+                events.append(("output_start", output_metadata))
+            elif signal_type == "data" and output_metadata:
+                if clean_hex_data:
+                    events.append(("output_data", output_metadata, _decode_output(clean_hex_data)))
+            elif not (isinstance(segment, str) and segment.startswith("OUTPUT_")):
+                # 只有完全没有元数据前缀时才降级
+                events.append(("output_fallback", _decode_output(segment)))
+        return events
+
+    events.append(("output_fallback", _decode_output(hex_data)))
+    return events
 
 def contains_end_sequence(byte_data):
     """
@@ -0,0 +1,34 @@
+"""
+Text for the live metrics published by the backend
+实时指标（后端 test_metrics 消息，见 backend stream_metrics）的显示文本，
+实时页和总览卡片共用；界面端只做格式化，不做逐点计算。
+"""
+
+from typing import Any, Dict, Optional
+
+from qt_app.i18n import tr
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.3g}"
+
+
+def format_live_metrics(step_type: str, metrics: Optional[Dict[str, Any]]) -> str:
+    """按步骤类型把指标字典格式化为一行文本，没有可显示的指标时返回空字符串"""
+    if not metrics:
+        return ""
+    if step_type == "transfer":
+        return tr("realtime.metrics_transfer",
+                  vth=_fmt(metrics.get("vth")),
+                  gm=_fmt(metrics.get("gm_max")),
+                  ss=_fmt(metrics.get("subthreshold_swing")),
+                  ratio=_fmt(metrics.get("on_off_ratio")))
+    if step_type == "transient":
+        return tr("realtime.metrics_transient",
+                  cycles=metrics.get("cycles", 0),
+                  i_high=_fmt(metrics.get("i_high")),
+                  i_low=_fmt(metrics.get("i_low")),
+                  tau_rise=_fmt(metrics.get("tau_rise")),
+                  tau_fall=_fmt(metrics.get("tau_fall")),
+                  noise=_fmt(metrics.get("noise_rms")))
+    return ""
@@ -0,0 +1,76 @@
+"""
+Nearest-point lookup for plot hover
+绘图悬停用的最近点查找：每个步骤加载后只建一次按 x 排序的索引
+（x 单调时直接使用原数组，包括内存映射），查询时在屏幕归一化坐标
+（按当前视图的 x/y 范围缩放）中计算距离，用 searchsorted 只检查光标附近
+一个 x 窗口内的点，窗口按已找到的最近距离收缩或扩大，结果与全量扫描一致。
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+# 首次查找窗口的半宽（归一化单位，约为视图宽度的 1/500）
+_INITIAL_HALF_WIDTH = 0.002
+
+
+class NearestPointIndex:
+    """单条曲线的最近点索引"""
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, monotonic: bool = False):
+        if monotonic:
+            self._x = x
+            self._y = y
+        else:
+            # NaN 排在末尾，searchsorted 不会落到其中
+            order = np.argsort(x, kind="stable")
+            self._x = np.asarray(x)[order]
+            self._y = np.asarray(y)[order]
+
+    def __len__(self):
+        return len(self._x)
+
+    def _best_in(self, x: float, y: float, x_scale: float, y_scale: float,
+                 half_width: float) -> Tuple[int, float]:
+        """在 |dx| <= half_width（归一化）窗口内找最近点，返回 (索引, 归一化距离)，无点时索引为 -1"""
+        dx_limit = half_width * x_scale
+        start = int(np.searchsorted(self._x, x - dx_limit, side="left"))
+        stop = int(np.searchsorted(self._x, x + dx_limit, side="right"))
+        if stop <= start:
+            return -1, np.inf
+        du = (np.asarray(self._x[start:stop], dtype=np.float64) - x) / x_scale
+        dv = (np.asarray(self._y[start:stop], dtype=np.float64) - y) / y_scale
+        dist2 = du * du + dv * dv
+        dist2[np.isnan(dist2)] = np.inf
+        best = int(np.argmin(dist2))
+        return start + best, float(np.sqrt(dist2[best]))
+
+    def query(self, x: float, y: float, x_scale: float, y_scale: float,
+              max_distance: float) -> Optional[Tuple[float, float]]:
+        """
+        查找离 (x, y) 最近的数据点
+
+        Args:
+            x, y: 光标的数据坐标
+            x_scale, y_scale: 当前视图的 x/y 范围，距离按它们归一化
+            max_distance: 归一化距离阈值，超过时返回 None
+
+        Returns:
+            (x, y) 最近点坐标或 None
+        """
+        if len(self._x) == 0 or not x_scale or not y_scale:
+            return None
+        x_scale = abs(x_scale)
+        y_scale = abs(y_scale)
+        half_width = min(_INITIAL_HALF_WIDTH, max_distance)
+        while True:
+            index, distance = self._best_in(x, y, x_scale, y_scale, half_width)
+            if index >= 0 and distance <= half_width:
+                break  # 窗口外的点 |dx| 已大于该距离，不可能更近
+            if half_width >= max_distance:
+                break
+            # 找到的点更远时把窗口扩大到该距离；窗口内没有点时成倍扩大
+            half_width = min(distance if index >= 0 else half_width * 8, max_distance)
+        if index < 0 or distance > max_distance:
+            return None
+        return float(self._x[index]), float(self._y[index])
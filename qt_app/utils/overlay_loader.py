@@ -0,0 +1,86 @@
+"""
+Parallel step loading for multi-curve overlays
+多曲线叠加对比的并行加载：每个要叠加的步骤一个 QRunnable，在线程池中解析
+test_info.json 找到对应步骤并读取数据（优先使用内存缓存和旁路缓存），
+加载完一条就交给界面绘制一条。
+"""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from app_config import is_step_sidecar_enabled
+from qt_app.utils.step_cache import get_step_cache
+from qt_app.utils.step_loader import read_step_cached
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+
+def resolve_step(test_dir: str, step_index: int, step_type: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    在测试中找要叠加的步骤：优先同序号同类型，其次第一个同类型步骤
+
+    Returns:
+        test_info 中的步骤字典（带 index），找不到时返回 None
+    """
+    with open(os.path.join(test_dir, "test_info.json"), "r", encoding="utf-8") as f:
+        steps = json.load(f).get("steps") or []
+    candidates = [dict(step, index=i) for i, step in enumerate(steps)
+                  if isinstance(step, dict) and step.get("data_file")]
+    for step in candidates:
+        if step["index"] == step_index and (step_type is None or step.get("type") == step_type):
+            return step
+    for step in candidates:
+        if step_type is None or step.get("type") == step_type:
+            return step
+    return None
+
+
+class OverlayLoadSignals(QObject):
+    loaded = pyqtSignal(int, object, object, object)  # request_id, 曲线描述, header, data
+    failed = pyqtSignal(int, object, str)             # request_id, 曲线描述, 错误信息
+
+
+class OverlayLoadTask(QRunnable):
+    """
+    加载一条叠加曲线
+
+    source 为 {"test_dir", "label", 以及 "step"（已知步骤）或 "step_index"/"step_type"（按规则查找）}，
+    加载完成后原样随信号返回，并补充实际使用的 step。
+    """
+
+    def __init__(self, request_id: int, source: Dict[str, Any], signals: OverlayLoadSignals):
+        super().__init__()
+        self.request_id = request_id
+        self.source = dict(source)
+        self.signals = signals
+
+    def run(self):
+        try:
+            step = self.source.get("step")
+            if step is None:
+                step = resolve_step(self.source["test_dir"], self.source.get("step_index", 0),
+                                    self.source.get("step_type"))
+                if step is None:
+                    self.signals.failed.emit(self.request_id, self.source, "no matching step")
+                    return
+            self.source["step"] = step
+            file_path = os.path.join(self.source["test_dir"], step["data_file"])
+            drop_incomplete = step.get("type") != "output"
+            cache = get_step_cache()
+            cached = cache.get(file_path, drop_incomplete)
+            if cached is None:
+                header, data = read_step_cached(file_path, drop_incomplete=drop_incomplete,
+                                                use_sidecar=is_step_sidecar_enabled())
+                cache.put(file_path, drop_incomplete, header, data)
+            else:
+                header, data = cached
+            self.signals.loaded.emit(self.request_id, self.source, header, data)
+        except Exception as e:
+            logger.warning(f"叠加曲线加载失败 {self.source.get('test_dir')}: {e}")
+            self.signals.failed.emit(self.request_id, self.source, str(e))
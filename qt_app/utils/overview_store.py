@@ -0,0 +1,131 @@
+"""
+Shared series store for the overview tab
+总览页共享的数据存储：每个设备按曲线保存最近的数据（环形缓冲区），
+接收数据时只追加并标记为脏，由总览页的统一帧调度器按需取出绘制。
+"""
+
+from typing import Any, Dict, List, Optional
+
+from qt_app.utils.decoder import decode_realtime_message
+from qt_app.utils.ring_buffer import RingBuffer
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+SINGLE_CURVE = "Current"
+
+
+class OverviewSeriesStore:
+    """按设备端口保存总览用的曲线数据"""
+
+    def __init__(self, capacity: int = 20000, transient_window_sec: float = 10.0):
+        self.capacity = capacity
+        self.transient_window_sec = transient_window_sec
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def reset(self, port: str, transimpedance_ohms: float = 100.0, baseline_current: float = 0.0):
+        """测试开始时清空设备数据，并记录解码参数（接收线程未解码时使用）"""
+        self.entries[port] = {
+            "step_id": None,
+            "step_type": None,
+            "curves": {},  # {curve_name: RingBuffer}
+            "dirty": True,
+            "total_points": 0,
+            "transimpedance_ohms": transimpedance_ohms,
+            "baseline_current": baseline_current,
+            "metrics": None,  # 当前步骤的实时指标 test_metrics["metrics"]
+        }
+
+    def get(self, port: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(port)
+
+    def remove(self, port: str):
+        self.entries.pop(port, None)
+
+    def _curve(self, entry: Dict[str, Any], name: str) -> RingBuffer:
+        curve = entry["curves"].get(name)
+        if curve is None:
+            curve = RingBuffer(self.capacity, 2)
+            entry["curves"][name] = curve
+        return curve
+
+    def ingest(self, port: str, messages: List[Dict[str, Any]]) -> bool:
+        """
+        追加一批消息中的数据
+
+        Returns:
+            是否有新数据
+        """
+        entry = self.entries.get(port)
+        if entry is None:
+            self.reset(port)
+            entry = self.entries[port]
+
+        changed = False
+        for message in messages:
+            if message.get("type") == "test_metrics":
+                changed |= self._ingest_metrics(entry, message)
+                continue
+            if message.get("type") != "test_data":
+                continue
+            events = message.get("decoded")
+            if events is None:
+                try:
+                    events = decode_realtime_message(
+                        message,
+                        transimpedance_ohms=entry["transimpedance_ohms"],
+                        baseline_current=entry["baseline_current"],
+                    )
+                except Exception as e:
+                    logger.error(f"总览数据解码失败 {port}: {e}")
+                    events = None
+            if not events:
+                continue
+
+            # 步骤变化时清空曲线
+            step_type = message.get("step_type", "")
+            workflow_info = message.get("workflow_info") or {}
+            step_id = f"{workflow_info.get('step_index', -1)}-{step_type}-{workflow_info.get('path_readable', '')}"
+            if step_id != entry["step_id"]:
+                entry["step_id"] = step_id
+                entry["step_type"] = step_type
+                entry["curves"] = {}
+                entry["metrics"] = None
+                changed = True
+
+            for event in events:
+                kind = event[0]
+                if kind == "block":
+                    block = event[2]
+                elif kind == "output_data":
+                    block = event[2]
+                elif kind == "output_fallback":
+                    block = event[1]
+                else:
+                    continue
+                if len(block) == 0:
+                    continue
+                name = f"Vg={event[1].get('gate_voltage', 0)}mV" if kind == "output_data" else SINGLE_CURVE
+                curve = self._curve(entry, name)
+                curve.extend(block)
+                if step_type == "transient":
+                    curve.trim_before(curve.last(0) - self.transient_window_sec, 0)
+                entry["total_points"] += len(block)
+                changed = True
+
+        if changed:
+            entry["dirty"] = True
+        return changed
+
+    @staticmethod
+    def _ingest_metrics(entry: Dict[str, Any], message: Dict[str, Any]) -> bool:
+        """记录后端发来的实时指标；不属于当前步骤的（步骤切换后迟到的最终指标）忽略"""
+        step_type = message.get("step_type", "")
+        workflow_info = message.get("workflow_info") or {}
+        step_id = f"{workflow_info.get('step_index', -1)}-{step_type}-{workflow_info.get('path_readable', '')}"
+        if entry["step_id"] is not None and step_id != entry["step_id"]:
+            return False
+        entry["metrics"] = message.get("metrics")
+        return True
@@ -0,0 +1,102 @@
+"""
+Real-time data receiver running off the GUI thread
+后台接收线程：从后端队列取出实时消息并完成解码，每帧合并为一批交给GUI线程，
+GUI线程只负责把解码好的数据块写入缓冲区和 setData。
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from qt_app.utils.decoder import decode_realtime_message
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+
+class RealtimeReceiver(QObject):
+    """
+    在 QThread 中运行的接收/解码工作对象
+
+    test_data 消息解码后以 message["decoded"] 携带事件列表（格式见
+    decoder.decode_realtime_message）；未登记解码参数的测试保持原样，由GUI端解码。
+    """
+
+    batch_ready = pyqtSignal(list)
+    finished = pyqtSignal()
+
+    def __init__(self, backend, frame_interval: float = 0.1, max_batch: int = 5000):
+        super().__init__()
+        self.backend = backend
+        self.frame_interval = frame_interval
+        self.max_batch = max_batch
+        self._decode_params: Dict[str, Dict[str, float]] = {}  # {test_id: {transimpedance_ohms, baseline_current}}
+        self._params_lock = threading.Lock()
+        self._stopped = False
+
+    def register_test(self, test_id: str, transimpedance_ohms: float, baseline_current: float):
+        """登记测试的解码参数（跨阻、基线电流）"""
+        if not test_id:
+            return
+        with self._params_lock:
+            self._decode_params[test_id] = {
+                "transimpedance_ohms": transimpedance_ohms,
+                "baseline_current": baseline_current,
+            }
+
+    def unregister_test(self, test_id: str):
+        with self._params_lock:
+            self._decode_params.pop(test_id, None)
+
+    def stop(self):
+        self._stopped = True
+
+    def _decode(self, message: Dict[str, Any]):
+        if message.get("type") != "test_data":
+            return
+        with self._params_lock:
+            params = self._decode_params.get(message.get("test_id"))
+        if params is None:
+            return
+        try:
+            decoded = decode_realtime_message(message, **params)
+        except Exception as e:
+            logger.error(f"后台解码实时数据失败: {e}")
+            return
+        if decoded is not None:
+            message["decoded"] = decoded
+
+    def run(self):
+        """循环取数据直到 stop()，每个帧间隔发出一批消息"""
+        logger.info("实时数据接收线程启动")
+        batch: List[Dict[str, Any]] = []
+        deadline = time.time() + self.frame_interval
+        while not self._stopped:
+            if not getattr(self.backend, "is_running", True):
+                time.sleep(self.frame_interval)
+                continue
+            timeout = min(max(deadline - time.time(), 0.001), 0.02)
+            data: Optional[Dict[str, Any]] = None
+            try:
+                data = self.backend.get_real_time_data(timeout=timeout)
+            except Exception as e:
+                logger.error(f"接收实时数据失败: {e}")
+                time.sleep(self.frame_interval)
+            if data:
+                self._decode(data)
+                batch.append(data)
+
+            now = time.time()
+            if now >= deadline or len(batch) >= self.max_batch:
+                # 空批次也发出，GUI端借此刷新数据速率等统计
+                self.batch_ready.emit(batch)
+                batch = []
+                deadline = now + self.frame_interval
+        if batch:
+            self.batch_ready.emit(batch)
+        logger.info("实时数据接收线程退出")
+        self.finished.emit()
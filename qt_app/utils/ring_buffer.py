@@ -0,0 +1,119 @@
+"""
+Fixed-capacity ring buffer for real-time plotting
+实时绘图用的定长环形缓冲区：预分配存储，按块原地追加，始终提供连续视图
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    预分配的多列环形缓冲区
+
+    底层存储为 2 * capacity 行，数据始终位于 [start, end) 的连续区域，因此
+    view() 可以直接交给 setData 而无需拷贝。写满存储末尾时把最近的数据整体
+    搬到开头，每个数据点平均只被搬运常数次，单次追加的开销与历史长度无关。
+    """
+
+    def __init__(self, capacity: int, columns: int = 2, growable: bool = False, dtype=np.float64):
+        self.capacity = max(int(capacity), 1)
+        self.columns = columns
+        self.growable = growable
+        self._storage = np.empty((self.capacity * 2, columns), dtype=dtype)
+        self._start = 0
+        self._end = 0
+        self.total_appended = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def dropped(self) -> int:
+        """因容量限制被丢弃的数据点数"""
+        return self.total_appended - len(self)
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+        self.total_appended = 0
+
+    def _grow(self, needed: int):
+        new_capacity = self.capacity
+        while new_capacity < needed:
+            new_capacity *= 2
+        storage = np.empty((new_capacity * 2, self.columns), dtype=self._storage.dtype)
+        size = len(self)
+        storage[:size] = self._storage[self._start:self._end]
+        self._storage = storage
+        self.capacity = new_capacity
+        self._start = 0
+        self._end = size
+
+    def extend(self, block: np.ndarray):
+        """追加一个 (N, columns) 的数据块"""
+        if block is None:
+            return
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block.reshape(-1, self.columns)
+        n = block.shape[0]
+        if n == 0:
+            return
+        self.total_appended += n
+        block = block[:, :self.columns]
+
+        if self.growable and len(self) + n > self.capacity:
+            self._grow(len(self) + n)
+
+        if n >= self.capacity:
+            # 单块超过容量：只保留最新的 capacity 行
+            self._storage[:self.capacity] = block[-self.capacity:]
+            self._start = 0
+            self._end = self.capacity
+            return
+
+        if self._end + n > self._storage.shape[0]:
+            # 存储末尾空间不足：把需要保留的最近数据搬到开头
+            keep = min(len(self), self.capacity - n)
+            self._storage[:keep] = self._storage[self._end - keep:self._end]
+            self._start = 0
+            self._end = keep
+
+        self._storage[self._end:self._end + n] = block
+        self._end += n
+        if len(self) > self.capacity:
+            self._start = self._end - self.capacity
+
+    def view(self) -> np.ndarray:
+        """当前数据的连续视图 (N, columns)，下一次追加前有效"""
+        return self._storage[self._start:self._end]
+
+    def column(self, index: int) -> np.ndarray:
+        return self._storage[self._start:self._end, index]
+
+    def last(self, index: int = 0):
+        """最新一行指定列的值，缓冲区为空时返回 None"""
+        if self._end == self._start:
+            return None
+        return self._storage[self._end - 1, index]
+
+    def trim_before(self, value: float, index: int = 0) -> int:
+        """
+        丢弃指定列小于 value 的前缀（要求该列单调递增，如时间戳）
+
+        Returns:
+            丢弃的行数
+        """
+        if self._end == self._start:
+            return 0
+        column = self._storage[self._start:self._end, index]
+        if column[0] >= value:
+            return 0
+        drop = int(np.searchsorted(column, value, side="left"))
+        self._start += drop
+        return drop
+
+    def keep_last(self, count: int):
+        """只保留最近 count 行"""
+        if len(self) > count:
+            self._start = self._end - max(int(count), 0)
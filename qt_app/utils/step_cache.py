@@ -0,0 +1,117 @@
+"""
+In-memory LRU cache of decoded step arrays
+已解码步骤数据的内存 LRU 缓存：按 (文件路径, 大小, mtime, 丢行规则) 作键，
+总字节数超过预算时淘汰最久未使用的条目。绘图、悬停查找和导出共用同一实例，
+在步骤/测试之间来回切换时无需再次读取文件。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app_config import get_step_cache_budget_mb
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+CacheKey = Tuple[str, int, int, bool]
+
+
+def step_cache_key(file_path: str, drop_incomplete: bool) -> Optional[CacheKey]:
+    """根据文件当前的大小和 mtime 生成缓存键；文件不存在时返回 None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, drop_incomplete
+
+
+class StepDataCache:
+    """
+    带字节预算的 LRU 缓存，可在加载线程和界面线程间共享（内部加锁）
+
+    文件被改写后 mtime/大小变化，旧条目不再命中，最终被淘汰。
+    单个条目超过预算时不缓存。
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = max(int(budget_bytes), 0)
+        self._entries: "OrderedDict[CacheKey, Tuple[List[str], np.ndarray]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def used_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, file_path: str, drop_incomplete: bool) -> Optional[Tuple[List[str], np.ndarray]]:
+        """返回 (header, data)，未命中时返回 None"""
+        key = step_cache_key(file_path, drop_incomplete)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, file_path: str, drop_incomplete: bool, header: List[str], data: np.ndarray):
+        key = step_cache_key(file_path, drop_incomplete)
+        if key is None:
+            return
+        size = int(data.nbytes)
+        if size > self.budget_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1].nbytes
+            self._entries[key] = (list(header), data)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._bytes > self.budget_bytes and self._entries:
+            _, (_, data) = self._entries.popitem(last=False)
+            self._bytes -= data.nbytes
+
+    def discard_under(self, directory: str):
+        """丢弃某目录下所有文件的条目（删除测试前释放内存映射）"""
+        prefix = os.path.join(os.path.abspath(directory), "")
+        with self._lock:
+            for key in [key for key in self._entries if key[0].startswith(prefix)]:
+                self._bytes -= self._entries.pop(key)[1].nbytes
+
+    def set_budget(self, budget_bytes: int):
+        with self._lock:
+            self.budget_bytes = max(int(budget_bytes), 0)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_shared_cache: Optional[StepDataCache] = None
+
+
+def get_step_cache() -> StepDataCache:
+    """进程内共享的步骤数据缓存，预算取自 performance_config.json"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = StepDataCache(int(get_step_cache_budget_mb() * 1024 * 1024))
+    return _shared_cache
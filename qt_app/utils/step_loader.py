@@ -0,0 +1,227 @@
+"""
+Background step-data loading for the history viewer
+历史页步骤数据的后台加载：按块读取CSV并用 numpy 整块解析为数组，
+加载过程中定期把已读部分交给界面渐进绘制，切换选择时可随时取消。
+解析结果写入 .npy 旁路缓存（见 step_sidecar），再次打开时直接内存映射。
+"""
+
+import json
+import os
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from qt_app.utils.step_cache import StepDataCache
+from qt_app.utils.step_sidecar import load_sidecar, source_signature, write_sidecar
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+CHUNK_ROWS = 100000
+
+
+class LoadCancelled(Exception):
+    """加载被取消"""
+
+
+def _parse_chunk(lines: List[str], columns: int) -> np.ndarray:
+    """把一块CSV行解析为 (N, columns) 数组；空单元格或无法解析的值为 NaN"""
+    try:
+        data = np.loadtxt(lines, delimiter=",", dtype=np.float64, ndmin=2)
+        if data.shape[1] == columns:
+            return data
+    except ValueError:
+        pass
+    # 存在空单元格/非数值或列数不足时退回 genfromtxt，补齐列后缺失值填 NaN
+    lines = [line.rstrip("\r\n") + "," * max(columns - 1 - line.count(","), 0) for line in lines]
+    data = np.genfromtxt(lines, delimiter=",", dtype=np.float64, filling_values=np.nan,
+                         invalid_raise=False, usecols=range(columns))
+    return np.asarray(data, dtype=np.float64).reshape(-1, columns)
+
+
+def read_step_csv(file_path: str, drop_incomplete: bool = True, chunk_rows: int = CHUNK_ROWS,
+                  cancel_check: Optional[Callable[[], bool]] = None,
+                  on_chunk: Optional[Callable[[List[str], List[np.ndarray]], None]] = None
+                  ) -> Tuple[List[str], np.ndarray]:
+    """
+    分块读取步骤CSV
+
+    Args:
+        file_path: CSV文件路径（首行为表头）
+        drop_incomplete: True 时丢弃任一列为 NaN 的行（两列数据）；False 时只丢弃首列为 NaN 的行（output多列）
+        chunk_rows: 每块行数
+        cancel_check: 返回 True 时中止并抛出 LoadCancelled
+        on_chunk: 每解析完一块调用 on_chunk(header, chunks)
+
+    Returns:
+        (header, data)，data 为 (N, 列数) 数组
+    """
+    chunks: List[np.ndarray] = []
+    with open(file_path, "r") as f:
+        header = [name.strip() for name in f.readline().strip().split(",")]
+        columns = len(header)
+        while True:
+            if cancel_check is not None and cancel_check():
+                raise LoadCancelled()
+            lines = [line for line in (f.readline() for _ in range(chunk_rows)) if line]
+            if not lines:
+                break
+            lines = [line for line in lines if line.strip()]
+            if lines:
+                data = _parse_chunk(lines, columns)
+                mask = ~np.isnan(data).any(axis=1) if drop_incomplete else ~np.isnan(data[:, 0])
+                chunks.append(data[mask])
+                if on_chunk is not None:
+                    on_chunk(header, chunks)
+    if chunks:
+        data = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+    else:
+        data = np.empty((0, columns), dtype=np.float64)
+    return header, data
+
+
+def read_step_cached(data_path: str, drop_incomplete: bool = True, use_sidecar: bool = True,
+                     **read_kwargs) -> Tuple[List[str], np.ndarray]:
+    """
+    读取步骤数据：旁路缓存有效时直接映射，否则解析CSV并写出缓存
+
+    read_kwargs 原样传给 read_step_csv（chunk_rows / cancel_check / on_chunk）。
+    """
+    if use_sidecar:
+        cached = load_sidecar(data_path, drop_incomplete)
+        if cached is not None:
+            return cached
+    signature = source_signature(data_path)
+    header, data = read_step_csv(data_path, drop_incomplete=drop_incomplete, **read_kwargs)
+    if use_sidecar:
+        write_sidecar(data_path, header, data, drop_incomplete, signature)
+    return header, data
+
+
+class StepLoadWorker(QObject):
+    """
+    在 QThread 中加载一个步骤数据文件
+
+    每个请求带有 request_id，界面据此丢弃已过期（选择已变化）的结果。
+    给定 cache 时，完整读取的结果放入共享的 StepDataCache。
+    """
+
+    partial = pyqtSignal(int, object, object)   # request_id, header, data（已读部分）
+    finished = pyqtSignal(int, object, object)  # request_id, header, data
+    failed = pyqtSignal(int, str)
+    done = pyqtSignal()
+
+    def __init__(self, request_id: int, file_path: str, step_type: str, partial_interval: float = 0.25,
+                 use_sidecar: bool = True, cache: Optional[StepDataCache] = None):
+        super().__init__()
+        self.request_id = request_id
+        self.file_path = file_path
+        self.step_type = step_type
+        self.use_sidecar = use_sidecar
+        self.cache = cache
+        self.partial_interval = partial_interval
+        self._cancelled = False
+        self._last_partial = time.time()
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _on_chunk(self, header, chunks):
+        now = time.time()
+        if now - self._last_partial < self.partial_interval:
+            return
+        self._last_partial = now
+        self.partial.emit(self.request_id, header, np.concatenate(chunks))
+
+    def run(self):
+        try:
+            drop_incomplete = self.step_type != "output"
+            header, data = read_step_cached(
+                self.file_path,
+                drop_incomplete=drop_incomplete,
+                use_sidecar=self.use_sidecar,
+                cancel_check=lambda: self._cancelled,
+                on_chunk=self._on_chunk,
+            )
+            if self.cache is not None:
+                self.cache.put(self.file_path, drop_incomplete, header, data)
+            if not self._cancelled:
+                self.finished.emit(self.request_id, header, data)
+        except LoadCancelled:
+            logger.debug(f"步骤数据加载已取消: {self.file_path}")
+        except Exception as e:
+            logger.error(f"加载步骤数据失败 {self.file_path}: {e}")
+            if not self._cancelled:
+                self.failed.emit(self.request_id, str(e))
+        finally:
+            self.done.emit()
+
+
+def list_step_files(test_dir: str) -> List[Tuple[str, str]]:
+    """测试目录中的 (CSV路径, 步骤类型)，优先取 test_info.json 的步骤列表"""
+    result = []
+    try:
+        with open(os.path.join(test_dir, "test_info.json"), "r", encoding="utf-8") as f:
+            steps = json.load(f).get("steps") or []
+        for step in steps:
+            data_file = step.get("data_file") if isinstance(step, dict) else None
+            if data_file:
+                result.append((os.path.join(test_dir, data_file), step.get("type", "")))
+    except Exception:
+        result = []
+    if not result:
+        # 步骤列表缺失时从文件名 <序号>_<类型>.csv 推断
+        for name in sorted(os.listdir(test_dir)):
+            if name.endswith(".csv"):
+                step_type = os.path.splitext(name)[0].split("_", 1)[-1]
+                result.append((os.path.join(test_dir, name), step_type))
+    return result
+
+
+class SidecarPrewarmWorker(QObject):
+    """
+    在 QThread 中为若干测试目录预先生成旁路缓存（已有有效缓存的步骤跳过）
+    """
+
+    finished = pyqtSignal(int)  # 新生成的缓存数量
+    done = pyqtSignal()
+
+    def __init__(self, test_dirs: Sequence[str]):
+        super().__init__()
+        self.test_dirs = list(test_dirs)
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        built = 0
+        try:
+            for test_dir in self.test_dirs:
+                if self._cancelled or not os.path.isdir(test_dir):
+                    continue
+                for file_path, step_type in list_step_files(test_dir):
+                    if self._cancelled:
+                        break
+                    if not os.path.exists(file_path):
+                        continue
+                    drop_incomplete = step_type != "output"
+                    if load_sidecar(file_path, drop_incomplete) is not None:
+                        continue
+                    try:
+                        signature = source_signature(file_path)
+                        header, data = read_step_csv(file_path, drop_incomplete=drop_incomplete,
+                                                     cancel_check=lambda: self._cancelled)
+                    except Exception as e:
+                        logger.debug(f"预生成旁路缓存跳过 {file_path}: {e}")
+                        continue
+                    if write_sidecar(file_path, header, data, drop_incomplete, signature):
+                        built += 1
+            logger.debug(f"旁路缓存预生成完成，新生成 {built} 个")
+            self.finished.emit(built)
+        finally:
+            self.done.emit()
@@ -0,0 +1,115 @@
+"""
+Binary sidecar cache for saved step CSVs
+已保存步骤CSV的二进制旁路缓存：首次打开某个步骤时把解析好的数组写成
+``<stem>.npy``，并在 ``<stem>.npy.json`` 中记录源CSV的大小和 mtime。
+之后再打开同一步骤时校验通过即直接内存映射 .npy，不再解析文本。
+CSV 仍是唯一的存档格式，旁路文件可随时删除，导出时也会被忽略。
+"""
+
+import json
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+SIDECAR_EXTENSION = ".npy"
+SIDECAR_META_SUFFIX = ".json"
+SIDECAR_VERSION = 1
+# 导出测试目录时忽略的旁路文件
+SIDECAR_IGNORE_PATTERNS = ("*" + SIDECAR_EXTENSION, "*" + SIDECAR_EXTENSION + SIDECAR_META_SUFFIX)
+
+
+def sidecar_path_for(data_path: str) -> str:
+    """根据 CSV 路径得到同名的旁路 .npy 路径"""
+    stem, _ = os.path.splitext(data_path)
+    return stem + SIDECAR_EXTENSION
+
+
+def _meta_path_for(sidecar_path: str) -> str:
+    return sidecar_path + SIDECAR_META_SUFFIX
+
+
+def source_signature(data_path: str) -> Tuple[int, int]:
+    stat = os.stat(data_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def load_sidecar(data_path: str, drop_incomplete: bool) -> Optional[Tuple[List[str], np.ndarray]]:
+    """
+    读取与 CSV 对应的旁路缓存
+
+    Args:
+        data_path: 步骤CSV路径
+        drop_incomplete: 与 read_step_csv 相同的丢行规则，规则不同的缓存视为无效
+
+    Returns:
+        (header, data)，data 为只读内存映射；缓存不存在、过期或损坏时返回 None
+    """
+    path = sidecar_path_for(data_path)
+    meta_path = _meta_path_for(path)
+    if not os.path.exists(path) or not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        size, mtime_ns = source_signature(data_path)
+        if (meta.get("version") != SIDECAR_VERSION
+                or meta.get("source_size") != size
+                or meta.get("source_mtime_ns") != mtime_ns
+                or meta.get("drop_incomplete") != drop_incomplete):
+            return None
+        data = np.load(path, mmap_mode="r", allow_pickle=False)
+        header = list(meta.get("header") or [])
+        if data.ndim != 2 or data.shape[1] != len(header):
+            return None
+        return header, data
+    except Exception as e:
+        logger.warning(f"读取旁路缓存 {path} 失败: {e}")
+        return None
+
+
+def write_sidecar(data_path: str, header: Sequence[str], data: np.ndarray, drop_incomplete: bool,
+                  signature: Optional[Tuple[int, int]] = None) -> bool:
+    """
+    为 CSV 写出旁路缓存（先写临时文件再替换，元数据最后写入）
+
+    Args:
+        signature: 解析前取得的 (大小, mtime_ns)；解析期间 CSV 被改写时放弃写入
+
+    Returns:
+        是否写入成功；目录只读等情况下只记录日志
+    """
+    path = sidecar_path_for(data_path)
+    meta_path = _meta_path_for(path)
+    try:
+        current = source_signature(data_path)
+        if signature is not None and signature != current:
+            return False
+        meta = {
+            "version": SIDECAR_VERSION,
+            "source_size": current[0],
+            "source_mtime_ns": current[1],
+            "drop_incomplete": drop_incomplete,
+            "header": list(header),
+            "rows": int(len(data)),
+        }
+        # 先删除旧元数据，避免新数据写到一半时旧元数据仍被认为有效
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(data, dtype=np.float64), allow_pickle=False)
+        os.replace(tmp_path, path)
+        tmp_meta = meta_path + ".tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_meta, meta_path)
+        return True
+    except Exception as e:
+        logger.warning(f"写入旁路缓存 {path} 失败: {e}")
+        return False
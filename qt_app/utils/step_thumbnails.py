@@ -0,0 +1,64 @@
+"""
+Background step-summary backfill for the test list thumbnails
+测试列表缩略图的后台补算：新保存的测试在保存进程中已写入步骤摘要（含缩略折线），
+旧测试首次出现在列表中时由线程池读取数据计算摘要，写出 ``<stem>.stats.json``
+并重新索引，列表绘制只使用索引中的摘要，界面线程不解析任何数据文件。
+"""
+
+import os
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from app_config import is_step_sidecar_enabled
+from backend_device_control_pyqt.core.step_stats import compute_step_stats, stats_path_for, write_step_stats
+from qt_app.utils.step_loader import list_step_files, read_step_cached
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+
+def backfill_step_stats(test_dir: str) -> int:
+    """
+    为测试目录中缺少摘要的步骤计算并写出摘要
+
+    Returns:
+        新写出的摘要数
+    """
+    written = 0
+    for file_path, step_type in list_step_files(test_dir):
+        if not os.path.exists(file_path) or os.path.exists(stats_path_for(file_path)):
+            continue
+        header, data = read_step_cached(file_path, drop_incomplete=step_type != "output",
+                                        use_sidecar=is_step_sidecar_enabled())
+        if len(header) < 2:
+            continue
+        current_columns = list(range(1, len(header))) if step_type == "output" else [1]
+        write_step_stats(file_path, compute_step_stats(data, header, current_columns))
+        written += 1
+    return written
+
+
+class StatsBackfillSignals(QObject):
+    finished = pyqtSignal(str, object)  # test_dir, 重新索引后的测试条目（无更新时为 None）
+
+
+class StatsBackfillTask(QRunnable):
+    """在 QThreadPool 中补算一个测试的步骤摘要并重新索引"""
+
+    def __init__(self, test_dir: str, backend, signals: StatsBackfillSignals):
+        super().__init__()
+        self.test_dir = test_dir
+        self.backend = backend
+        self.signals = signals
+
+    def run(self):
+        entry = None
+        try:
+            if backfill_step_stats(self.test_dir):
+                entry = self.backend.reindex_saved_test(self.test_dir)
+        except Exception as e:
+            logger.warning(f"补算步骤摘要失败 {self.test_dir}: {e}")
+        finally:
+            self.signals.finished.emit(self.test_dir, entry)
@@ -0,0 +1,282 @@
+"""
+Background export of saved tests
+历史测试的后台导出：复制为目录（多个文件并行复制）或流式写入单个 zip / tar.gz
+归档（边读边压缩，不在内存或磁盘上生成中间副本）。按字节汇报进度，可随时取消，
+取消或出错时删除已写出的部分结果。旁路缓存只是本机加速用，不随数据导出。
+"""
+
+import fnmatch
+import os
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from qt_app.utils.step_sidecar import SIDECAR_IGNORE_PATTERNS
+
+########################### 日志设置 ###################################
+from logger_config import get_module_logger
+logger = get_module_logger()
+#####################################################################
+
+EXPORT_FORMAT_FOLDER = "folder"
+EXPORT_FORMAT_ZIP = "zip"
+EXPORT_FORMAT_TAR_GZ = "tar.gz"
+EXPORT_FORMATS = (EXPORT_FORMAT_FOLDER, EXPORT_FORMAT_ZIP, EXPORT_FORMAT_TAR_GZ)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+PROGRESS_INTERVAL_SEC = 0.1
+
+
+class ExportCancelled(Exception):
+    """导出被用户取消"""
+
+
+def export_dir_name(test: Dict[str, Any]) -> str:
+    """导出后的目录名：测试名和描述作前缀（只保留字母数字和 _-，最长 50 字符）加原目录名"""
+    test_name = test.get("name", "").replace(" ", "_")
+    test_desc = test.get("description", "").replace(" ", "_")
+    prefix = ""
+    if test_name:
+        prefix += test_name + "_"
+    if test_desc:
+        prefix += test_desc + "_"
+    if not prefix:
+        prefix = "Test_"
+    prefix = ''.join(c for c in prefix if c.isalnum() or c in '_-')[:50]
+    return prefix + os.path.basename(os.path.normpath(test.get("dir_path", "")))
+
+
+def plan_export(tests: Sequence[Dict[str, Any]], dest_dir: str = None) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    确定每个测试的源目录和导出名称
+
+    名称已存在（目标目录中或本次导出中重复）时插入时间戳/序号保证唯一。
+
+    Returns:
+        ([(源目录, 导出名称)], 跳过的测试数)
+    """
+    entries = []
+    used = set()
+    skipped = 0
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    for test in tests:
+        source_dir = test.get("dir_path", "")
+        if not source_dir or not os.path.isdir(source_dir):
+            skipped += 1
+            continue
+        name = export_dir_name(test)
+        base = os.path.basename(os.path.normpath(source_dir))
+        prefix = name[:len(name) - len(base)]
+        candidate = name
+        counter = 1
+        while candidate in used or (dest_dir and os.path.exists(os.path.join(dest_dir, candidate))):
+            suffix = timestamp if counter == 1 else f"{timestamp}{counter}"
+            candidate = f"{prefix}{suffix}_{base}"
+            counter += 1
+        used.add(candidate)
+        entries.append((source_dir, candidate))
+    return entries, skipped
+
+
+def _ignored(name: str) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in SIDECAR_IGNORE_PATTERNS)
+
+
+def collect_files(entries: Sequence[Tuple[str, str]]) -> List[Tuple[str, str, int]]:
+    """列出要导出的文件 [(源路径, 导出相对路径, 字节数)]，跳过旁路缓存"""
+    files = []
+    for source_dir, name in entries:
+        for root, dirs, filenames in os.walk(source_dir):
+            dirs[:] = sorted(d for d in dirs if not _ignored(d))
+            rel_root = os.path.relpath(root, source_dir)
+            for filename in sorted(filenames):
+                if _ignored(filename):
+                    continue
+                path = os.path.join(root, filename)
+                rel_path = os.path.normpath(os.path.join(name, rel_root, filename))
+                try:
+                    files.append((path, rel_path, os.path.getsize(path)))
+                except OSError as e:
+                    logger.warning(f"导出时跳过无法访问的文件 {path}: {e}")
+    return files
+
+
+class _ProgressReader:
+    """包装源文件：每次读取累计进度并检查取消（供 tarfile.addfile 使用）"""
+
+    def __init__(self, handle, on_bytes, cancelled: threading.Event):
+        self._handle = handle
+        self._on_bytes = on_bytes
+        self._cancelled = cancelled
+
+    def read(self, size=-1):
+        if self._cancelled.is_set():
+            raise ExportCancelled()
+        chunk = self._handle.read(size)
+        self._on_bytes(len(chunk))
+        return chunk
+
+
+class TestExporter:
+    """
+    执行一次导出（在工作线程中调用 run），进度通过 progress_callback(已完成字节, 总字节) 汇报
+    """
+
+    def __init__(self, tests: Sequence[Dict[str, Any]], target: str, export_format: str = EXPORT_FORMAT_FOLDER,
+                 workers: int = 4, compress_level: int = 6):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        self.tests = list(tests)
+        self.target = target
+        self.export_format = export_format
+        self.workers = max(int(workers), 1)
+        self.compress_level = compress_level
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._done_bytes = 0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _add_bytes(self, count: int):
+        with self._lock:
+            self._done_bytes += count
+
+    def run(self, progress_callback=None) -> Dict[str, Any]:
+        """
+        Returns:
+            {"exported", "skipped", "cancelled", "bytes", "path"}；出错时抛出异常（部分结果已清理）
+        """
+        dest_dir = self.target if self.export_format == EXPORT_FORMAT_FOLDER else None
+        entries, skipped = plan_export(self.tests, dest_dir)
+        files = collect_files(entries)
+        total = sum(size for _, _, size in files)
+        progress = progress_callback or (lambda done, total_bytes: None)
+        progress(0, total)
+        try:
+            if self.export_format == EXPORT_FORMAT_FOLDER:
+                self._copy_folders(entries, files, total, progress)
+            else:
+                self._write_archive(files, total, progress)
+        except ExportCancelled:
+            return {"exported": 0, "skipped": skipped, "cancelled": True, "bytes": self._done_bytes,
+                    "path": self.target}
+        progress(total, total)
+        return {"exported": len(entries), "skipped": skipped, "cancelled": False, "bytes": total,
+                "path": self.target}
+
+    def _copy_file(self, src: str, dst: str):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            while True:
+                if self._cancelled.is_set():
+                    raise ExportCancelled()
+                chunk = fsrc.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                fdst.write(chunk)
+                self._add_bytes(len(chunk))
+        shutil.copystat(src, dst)
+
+    def _copy_folders(self, entries, files, total, progress):
+        created = [os.path.join(self.target, name) for _, name in entries]
+        try:
+            for path in created:
+                os.makedirs(path)
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = {pool.submit(self._copy_file, src, os.path.join(self.target, rel))
+                           for src, rel, _ in files}
+                while pending:
+                    finished, pending = wait(pending, timeout=PROGRESS_INTERVAL_SEC, return_when=FIRST_EXCEPTION)
+                    for future in finished:
+                        if future.exception() is not None:
+                            self._cancelled.set()  # 让其余复制尽快停下
+                            for other in pending:
+                                other.cancel()
+                            wait(pending)
+                            raise future.exception()
+                    progress(self._done_bytes, total)
+        except BaseException:
+            for path in created:
+                shutil.rmtree(path, ignore_errors=True)
+            raise
+
+    def _write_archive(self, files, total, progress):
+        part_path = self.target + ".part"
+        last_report = [0.0]
+
+        def on_bytes(count):
+            self._add_bytes(count)
+            now = time.monotonic()
+            if now - last_report[0] >= PROGRESS_INTERVAL_SEC:
+                last_report[0] = now
+                progress(self._done_bytes, total)
+
+        try:
+            if self.export_format == EXPORT_FORMAT_ZIP:
+                with zipfile.ZipFile(part_path, "w", compression=zipfile.ZIP_DEFLATED,
+                                     compresslevel=self.compress_level, allowZip64=True) as archive:
+                    for src, rel, _ in files:
+                        info = zipfile.ZipInfo.from_file(src, rel.replace(os.sep, "/"))
+                        info.compress_type = zipfile.ZIP_DEFLATED
+                        with open(src, "rb") as fsrc, archive.open(info, "w", force_zip64=True) as fdst:
+                            while True:
+                                if self._cancelled.is_set():
+                                    raise ExportCancelled()
+                                chunk = fsrc.read(COPY_CHUNK_SIZE)
+                                if not chunk:
+                                    break
+                                fdst.write(chunk)
+                                on_bytes(len(chunk))
+            else:
+                with tarfile.open(part_path, "w:gz", compresslevel=self.compress_level) as archive:
+                    for src, rel, _ in files:
+                        info = archive.gettarinfo(src, rel.replace(os.sep, "/"))
+                        with open(src, "rb") as fsrc:
+                            archive.addfile(info, _ProgressReader(fsrc, on_bytes, self._cancelled))
+            os.replace(part_path, self.target)
+        except BaseException:
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+            raise
+
+
+class TestExportWorker(QObject):
+    """
+    在 QThread 中执行导出（TestExporter 或 DatasetExporter，二者都提供 run/cancel）
+    """
+
+    progress = pyqtSignal(object, object)  # 已完成字节, 总字节（可能超过 32 位整数）
+    finished = pyqtSignal(object)          # run() 的结果字典
+    failed = pyqtSignal(str)
+    done = pyqtSignal()
+
+    def __init__(self, exporter):
+        super().__init__()
+        self.exporter = exporter
+
+    def cancel(self):
+        self.exporter.cancel()
+
+    def run(self):
+        try:
+            result = self.exporter.run(lambda done_bytes, total: self.progress.emit(done_bytes, total))
+            self.finished.emit(result)
+        except Exception as e:
+            logger.error(f"导出测试失败: {e}")
+            self.failed.emit(str(e))
+        finally:
+            self.done.emit()
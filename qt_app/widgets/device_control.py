@@ -14,6 +14,7 @@ from PyQt5.QtGui import QIcon, QColor, QBrush, QFont
 
 from qt_app.widgets.workflow_editor import WorkflowEditorWidget
 from qt_app.widgets.realtime_plot import RealtimePlotWidget
+from qt_app.utils.realtime_receiver import RealtimeReceiver
 
 # Import translation support
 from qt_app.i18n.translator import tr
@@ -25,6 +26,8 @@ logger = get_module_logger()
 
 DEFAULT_TRANSIMPEDANCE_OHMS = 100.0
 ADC_FULL_SCALE_VOLTAGE = 2.048
+# 表示测试结束的后端消息（处理时会注销测试、结束图表）
+_LIFECYCLE_MESSAGE_TYPES = ("test_result", "test_complete", "test_error")
 
 def normalize_transimpedance(value, default=DEFAULT_TRANSIMPEDANCE_OHMS):
     try:
@@ -197,7 +200,7 @@ class DeviceControlWidget(QWidget):
 
     devices_updated = pyqtSignal(list)
     # Signals for sharing real-time data and lifecycle events with other tabs
-    real_time_data = pyqtSignal(str, dict)
+    real_time_data = pyqtSignal(str, list)  # (device_port, 本帧该设备的消息列表)
     test_started = pyqtSignal(str, str, dict)
     test_completed = pyqtSignal(str, str)
     
@@ -208,6 +211,7 @@ class DeviceControlWidget(QWidget):
         # Store device-specific data
         self.workflows = {}  # {device_port: workflow_steps}
         self.current_test_ids = {}  # {device_port: test_id}
+        self._port_by_test_id = {}  # {test_id: device_port}，与 current_test_ids 同步维护，用于消息路由
         self.plot_widgets = {}  # {device_port: RealtimePlotWidget}
         self.test_info = {}  # {device_port: test_info_dict}
         
@@ -238,10 +242,15 @@ class DeviceControlWidget(QWidget):
         # Setup UI
         self.setup_ui()
         
-        # Setup update timer for real-time data
-        self.update_timer = QTimer(self)
-        self.update_timer.timeout.connect(self.update_real_time_data)
-        self.update_timer.start(100)  # 100ms interval for more responsive updates
+        # Real-time data: a receiver thread drains and decodes the backend queue,
+        # then delivers one batch per 100ms frame to the GUI thread
+        self.realtime_receiver = RealtimeReceiver(backend, frame_interval=0.1)
+        self.realtime_thread = QThread(self)
+        self.realtime_receiver.moveToThread(self.realtime_thread)
+        self.realtime_thread.started.connect(self.realtime_receiver.run)
+        self.realtime_receiver.batch_ready.connect(self.update_real_time_data)
+        self.realtime_receiver.finished.connect(self.realtime_thread.quit)
+        self.realtime_thread.start()
         
         # *** 新增：设备状态更新定时器 ***
         self.device_status_timer = QTimer(self)
@@ -943,6 +952,23 @@ class DeviceControlWidget(QWidget):
             self.plot_layout.addWidget(self.placeholder_label)
             self.placeholder_label.setVisible(True)
 
+    def _set_active_test(self, port, test_id):
+        """登记设备端口上的活跃测试，同时维护 test_id→port 索引"""
+        previous = self.current_test_ids.get(port)
+        if previous and self._port_by_test_id.get(previous) == port:
+            del self._port_by_test_id[previous]
+        self.current_test_ids[port] = test_id
+        self._port_by_test_id[test_id] = port
+
+    def _clear_active_test(self, port):
+        """移除设备端口上的活跃测试"""
+        test_id = self.current_test_ids.pop(port, None)
+        if test_id is not None:
+            if self._port_by_test_id.get(test_id) == port:
+                del self._port_by_test_id[test_id]
+            self.realtime_receiver.unregister_test(test_id)
+        return test_id
+
     def _emit_test_started(self, port, test_id, device_info, test_name, test_description, transimpedance_ohms, baseline_current):
         """
         Emit test_started with enriched metadata for other tabs.
@@ -1094,7 +1120,7 @@ class DeviceControlWidget(QWidget):
                 self._latency_count = 0
                 
                 # Store test ID for this device
-                self.current_test_ids[self.selected_port] = test_id
+                self._set_active_test(self.selected_port, test_id)
                 
                 # Create or update plot widget
                 if self.selected_port not in self.plot_widgets:
@@ -1107,6 +1133,7 @@ class DeviceControlWidget(QWidget):
                     self.plot_widgets[self.selected_port].set_test_id(test_id)
                     self.plot_widgets[self.selected_port].set_transimpedance_ohms(transimpedance_ohms)
                     self.plot_widgets[self.selected_port].set_baseline_current(baseline_current)
+                self.realtime_receiver.register_test(test_id, transimpedance_ohms, baseline_current)
                 
                 # Update plot visibility
                 self.update_plot_visibility()
@@ -1252,7 +1279,7 @@ class DeviceControlWidget(QWidget):
                 
                 if result.get("status") == "ok":
                     # Store test ID
-                    self.current_test_ids[port] = test_id
+                    self._set_active_test(port, test_id)
                     self.sync_test_ids[port] = test_id
                     
                     # Create or update plot widget
@@ -1266,6 +1293,7 @@ class DeviceControlWidget(QWidget):
                         self.plot_widgets[port].set_test_id(test_id)
                         self.plot_widgets[port].set_transimpedance_ohms(transimpedance_ohms)
                         self.plot_widgets[port].set_baseline_current(baseline_current)
+                    self.realtime_receiver.register_test(test_id, transimpedance_ohms, baseline_current)
 
                     # Broadcast per-device start for overview tab
                     self._emit_test_started(
@@ -1319,7 +1347,7 @@ class DeviceControlWidget(QWidget):
                         if result.get("status") == "ok" and port in self.current_test_ids:
                             if port in self.plot_widgets:
                                 self.plot_widgets[port].set_test_completed()
-                            del self.current_test_ids[port]
+                            self._clear_active_test(port)
                             stopped_count += 1
                 except Exception:
                     pass
@@ -1346,7 +1374,7 @@ class DeviceControlWidget(QWidget):
                         if port in self.plot_widgets:
                             self.plot_widgets[port].set_test_completed()
                         if port in self.current_test_ids:
-                            del self.current_test_ids[port]
+                            self._clear_active_test(port)
                         if port in self.sync_test_ids:
                             del self.sync_test_ids[port]
                         stopped_count += 1
@@ -1382,7 +1410,7 @@ class DeviceControlWidget(QWidget):
                     self.plot_widgets[self.selected_port].set_test_completed()
                 
                 # Remove test ID
-                del self.current_test_ids[self.selected_port]
+                self._clear_active_test(self.selected_port)
 
                 # Broadcast completion
                 self._emit_test_completed(self.selected_port, active_test_id)
@@ -1475,19 +1503,23 @@ class DeviceControlWidget(QWidget):
                 QMessageBox.critical(self, tr("main.dialog.error"), tr("device_control.dialog.import_workflow_error", error=str(e)))
     
     
-    def update_real_time_data(self):
-        """Update real-time data for active plots - 批量处理版本 + 测试完成检测"""
-        # 批量处理队列中的所有消息
+    def stop_realtime_receiver(self):
+        """停止实时数据接收线程（应用退出时在关闭后端之前调用）"""
+        self.realtime_receiver.stop()
+        self.realtime_thread.quit()
+        self.realtime_thread.wait(2000)
+
+    def update_real_time_data(self, batch):
+        """Update real-time data for active plots - 处理接收线程送来的一批消息 + 测试完成检测"""
         processed = 0
-        max_process = 500  # 一次循环中最多处理500条消息，避免无限循环
         now = time.time()
+        groups = {}  # {device_port: [message, ...]}
         
-        while processed < max_process:
-            # 非阻塞方式获取数据
-            data = self.backend.get_real_time_data(timeout=0.001)  # 使用较小超时
-            if not data:
-                break  # 队列为空，退出循环
-            
+        for data in batch:
+            # 测试结束类消息会注销测试并结束图表：先分发本批中排在它之前的数据，保持到达顺序
+            if data.get("type") in _LIFECYCLE_MESSAGE_TYPES and groups:
+                self._dispatch_port_groups(groups)
+                groups = {}
             # *** 新增：检查测试完成消息 ***
             self.handle_backend_message(data)
             
@@ -1508,32 +1540,15 @@ class DeviceControlWidget(QWidget):
                 if self._latency_count == 0:
                     self._points_duration += 0.1
             
-            # 处理数据
+            # 按设备端口分组，本帧结束后每个设备只分发一次
             test_id = data.get('test_id')
-            if not test_id:
-                processed += 1
-                continue
-                
-            # 找到对应的设备
-            device_port = None
-            for port, tid in self.current_test_ids.items():
-                if tid == test_id:
-                    device_port = port
-                    break
-            
-            # 如果找到设备且有活跃的图表
+            device_port = self._port_by_test_id.get(test_id) if test_id else None
             if device_port:
-                try:
-                    self.real_time_data.emit(device_port, data.copy())
-                except Exception:
-                    pass
-
-            if device_port and device_port in self.plot_widgets:
-                plot_widget = self.plot_widgets[device_port]
-                plot_widget.process_message(data)
-                
+                groups.setdefault(device_port, []).append(data)
             processed += 1
         
+        self._dispatch_port_groups(groups)
+        
         # 更新数据统计
         now = time.time()
         time_diff = now - self.last_data_time
@@ -1559,6 +1574,17 @@ class DeviceControlWidget(QWidget):
         else:
             self.data_count += processed
     
+    def _dispatch_port_groups(self, groups):
+        """把按设备端口分组的消息分发给外部监听和对应图表"""
+        for device_port, messages in groups.items():
+            try:
+                self.real_time_data.emit(device_port, messages)
+            except Exception:
+                pass
+            plot_widget = self.plot_widgets.get(device_port)
+            if plot_widget:
+                plot_widget.process_messages(messages)
+    
     def prepare_for_tab_change(self):
         """在切换标签页前保存当前工作流配置和测试信息"""
         self.save_current_workflow()
@@ -1601,6 +1627,13 @@ class DeviceControlWidget(QWidget):
                 # 测试错误消息 - 也表示测试结束
                 self.handle_test_error(test_id, message)
                 
+            elif msg_type == "save_result" and message.get("status") == "error":
+                # 保存失败会立即上报（进度摘要与最终回执无需界面处理）
+                logger.error(
+                    f"测试 {test_id} 保存文件失败: {message.get('file_path')} - "
+                    f"{message.get('error') or message.get('last_error')}"
+                )
+                
             # elif msg_type == "test_progress":
             #     # 检查进度是否为100%
             #     progress = message.get("progress", 0)
@@ -1625,11 +1658,7 @@ class DeviceControlWidget(QWidget):
             return
             
         # 查找对应的设备端口
-        device_port = None
-        for port, tid in list(self.current_test_ids.items()):
-            if tid == test_id:
-                device_port = port
-                break
+        device_port = self._port_by_test_id.get(test_id)
         
         if device_port:
             logger.info(f"检测到测试完成: {test_id} (设备: {device_port})")
@@ -1639,7 +1668,7 @@ class DeviceControlWidget(QWidget):
                 self.plot_widgets[device_port].set_test_completed()
             
             # *** 关键：从活跃测试列表中移除 ***
-            del self.current_test_ids[device_port]
+            self._clear_active_test(device_port)
 
             # Broadcast completion
             self._emit_test_completed(device_port, test_id)
@@ -1667,11 +1696,7 @@ class DeviceControlWidget(QWidget):
             return
             
         # 查找对应的设备端口
-        device_port = None
-        for port, tid in list(self.current_test_ids.items()):
-            if tid == test_id:
-                device_port = port
-                break
+        device_port = self._port_by_test_id.get(test_id)
         
         if device_port:
             error_msg = message.get("error", "未知错误")
@@ -1682,7 +1707,7 @@ class DeviceControlWidget(QWidget):
                 self.plot_widgets[device_port].set_test_completed()
             
             # *** 关键：从活跃测试列表中移除 ***
-            del self.current_test_ids[device_port]
+            self._clear_active_test(device_port)
 
             # Broadcast completion to listeners
             self._emit_test_completed(device_port, test_id)
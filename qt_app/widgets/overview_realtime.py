@@ -1,5 +1,5 @@
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from PyQt5.QtWidgets import (
     QWidget,
@@ -14,11 +14,14 @@ from PyQt5.QtWidgets import (
     QToolButton,
     QMenu,
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
+import pyqtgraph as pg
 
 from qt_app.i18n import tr
-from qt_app.widgets.realtime_plot import RealtimePlotWidget
+from qt_app.utils.decimation import minmax_decimate
+from qt_app.utils.live_metrics import format_live_metrics
+from qt_app.utils.overview_store import OverviewSeriesStore
 
 ########################### 日志设置 ###################################
 from logger_config import get_module_logger
@@ -27,8 +30,19 @@ logger = get_module_logger()
 #####################################################################
 
 
+CURVE_COLORS = [
+    '#0000FF', '#FF0000', '#00AA00', '#8B4513', '#9400D3',
+    '#FF8C00', '#000000', '#DC143C', '#006400', '#4B0082',
+]
+
+
 class OverviewRealtimeWidget(QWidget):
-    """Tab for monitoring all devices' real-time plots simultaneously."""
+    """
+    Tab for monitoring all devices' real-time plots simultaneously.
+
+    每个设备卡片只是一个轻量的 PlotWidget（无交互、按像素降采样），数据写入共享的
+    OverviewSeriesStore；统一的帧定时器按设定帧率只刷新有新数据且当前可见的卡片。
+    """
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -36,10 +50,17 @@ class OverviewRealtimeWidget(QWidget):
         self.columns_count = 2
         self.plot_height = 440
         self.min_column_width = 320
-        self._chrome_height = 140  # Approximate non-plot height for uniform cards
+        self._chrome_height = 160  # Approximate non-plot height for uniform cards
         self.filter_actions: Dict[str, Any] = {}
+        self.store = OverviewSeriesStore()
+        self.frame_fps = 10
         self._setup_ui()
 
+        # 统一帧调度：所有卡片共用一个定时器
+        self.frame_timer = QTimer(self)
+        self.frame_timer.timeout.connect(self._render_frame)
+        self.frame_timer.start(int(1000 / self.frame_fps))
+
     def _setup_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(8, 8, 8, 8)
@@ -75,6 +96,15 @@ class OverviewRealtimeWidget(QWidget):
         self.height_spin.valueChanged.connect(self._on_height_changed)
         control_row.addWidget(self.height_spin, 0, Qt.AlignLeft)
 
+        self.fps_label = QLabel(tr("overview.fps_label"))
+        control_row.addWidget(self.fps_label, 0, Qt.AlignLeft)
+        self.fps_spin = QSpinBox()
+        self.fps_spin.setRange(1, 30)
+        self.fps_spin.setValue(self.frame_fps)
+        self.fps_spin.setSuffix(tr("overview.fps_suffix"))
+        self.fps_spin.valueChanged.connect(self._on_fps_changed)
+        control_row.addWidget(self.fps_spin, 0, Qt.AlignLeft)
+
         self.filter_button = QToolButton()
         self.filter_button.setText(tr("overview.filter_label"))
         self.filter_button.setPopupMode(QToolButton.InstantPopup)
@@ -107,14 +137,18 @@ class OverviewRealtimeWidget(QWidget):
         panel["meta"]["port"] = port
         panel["meta"]["test_id"] = test_id
         panel["completed"] = False
-        plot: RealtimePlotWidget = panel["plot"]
-        plot.set_test_id(test_id)
-        plot.display_max_points = 3000
+        self._clear_panel_curves(panel)
 
-        # Apply device-specific settings if provided
+        # Device-specific decode settings (used when the receiver thread did not decode)
+        transimpedance_ohms = 100.0
+        baseline_current = 0.0
         if metadata:
-            plot.set_transimpedance_ohms(metadata.get("transimpedance_ohms"))
-            plot.set_baseline_current(metadata.get("baseline_current"))
+            try:
+                transimpedance_ohms = float(metadata.get("transimpedance_ohms") or 100.0)
+                baseline_current = float(metadata.get("baseline_current") or 0.0)
+            except (TypeError, ValueError):
+                pass
+        self.store.reset(port, transimpedance_ohms, baseline_current)
 
         self._update_panel_labels(port)
         panel["status_label"].setText(tr("overview.card_running"))
@@ -123,14 +157,14 @@ class OverviewRealtimeWidget(QWidget):
         self._ensure_filter_action(port, panel["meta"])
         self._apply_filter_visibility(port)
 
-    def handle_real_time_data(self, port: str, data: Dict[str, Any]):
-        """Forward real-time data to the corresponding plot."""
+    def handle_real_time_data(self, port: str, messages: List[Dict[str, Any]]):
+        """Append one frame's batch of real-time messages to the shared store; drawing happens on the frame timer."""
         panel = self.device_panels.get(port)
         if not panel:
             return
         try:
-            panel["plot"].process_message(data)
-            panel["last_update"] = time.time()
+            if self.store.ingest(port, messages):
+                panel["last_update"] = time.time()
         except Exception as exc:
             logger.error(f"Forwarding real-time data failed for {port}: {exc}")
 
@@ -141,10 +175,6 @@ class OverviewRealtimeWidget(QWidget):
             return
         panel["completed"] = True
         panel["status_label"].setText(tr("overview.card_completed"))
-        try:
-            panel["plot"].set_test_completed()
-        except Exception:
-            pass
         self._update_panel_labels(port)
         self._ensure_filter_action(port, panel.get("meta", {}))
 
@@ -177,7 +207,17 @@ class OverviewRealtimeWidget(QWidget):
         info_label.setStyleSheet("color: #666;")
         panel_layout.addWidget(info_label)
 
-        plot = RealtimePlotWidget(port)
+        metrics_label = QLabel()
+        metrics_label.setStyleSheet("color: #333;")
+        panel_layout.addWidget(metrics_label)
+
+        plot = pg.PlotWidget()
+        plot.setBackground('w')
+        plot.showGrid(x=True, y=True, alpha=0.3)
+        plot.setMenuEnabled(False)
+        plot.hideButtons()
+        plot.setMouseEnabled(x=False, y=False)
+        plot.setLabel('left', tr("realtime.y_axis_current"))
         self._apply_plot_height(plot)
         panel_layout.addWidget(plot)
 
@@ -186,7 +226,10 @@ class OverviewRealtimeWidget(QWidget):
             "title_label": title_label,
             "status_label": status_label,
             "info_label": info_label,
+            "metrics_label": metrics_label,
             "plot": plot,
+            "curves": {},  # {curve_name: PlotDataItem}
+            "step_type": None,
             "meta": {},
             "completed": False,
             "last_update": None,
@@ -196,6 +239,62 @@ class OverviewRealtimeWidget(QWidget):
         self._rebuild_grid()
         return panel
 
+    def _on_fps_changed(self, value: int):
+        self.frame_fps = max(1, value)
+        self.frame_timer.start(int(1000 / self.frame_fps))
+
+    def _clear_panel_curves(self, panel: Dict[str, Any]):
+        for item in panel["curves"].values():
+            panel["plot"].removeItem(item)
+        panel["curves"] = {}
+        panel["step_type"] = None
+
+    def _render_frame(self):
+        """帧定时器：只重绘有新数据、未被过滤且在滚动区域内可见的卡片"""
+        if not self.isVisible():
+            return
+        for port, panel in self.device_panels.items():
+            entry = self.store.get(port)
+            if not entry or not entry["dirty"]:
+                continue
+            container = panel["container"]
+            if not container.isVisible() or container.visibleRegion().isEmpty():
+                continue
+            self._render_panel(panel, entry)
+            entry["dirty"] = False
+
+    def _render_panel(self, panel: Dict[str, Any], entry: Dict[str, Any]):
+        plot = panel["plot"]
+        self._update_metrics_label(panel, entry)
+        if entry["step_type"] != panel["step_type"]:
+            self._clear_panel_curves(panel)
+            panel["step_type"] = entry["step_type"]
+            if entry["step_type"] == "transient":
+                plot.setLabel('bottom', tr("realtime.x_axis_time"))
+            elif entry["step_type"] == "output":
+                plot.setLabel('bottom', tr("realtime.x_axis_drain_voltage"))
+            else:
+                plot.setLabel('bottom', tr("realtime.x_axis_gate_voltage"))
+
+        # 曲线在步骤切换时被清空
+        for name in [n for n in panel["curves"] if n not in entry["curves"]]:
+            plot.removeItem(panel["curves"].pop(name))
+
+        width = int(plot.getViewBox().width()) or 300
+        for name, series in entry["curves"].items():
+            item = panel["curves"].get(name)
+            if item is None:
+                color = CURVE_COLORS[len(panel["curves"]) % len(CURVE_COLORS)]
+                item = plot.plot([], [], pen=pg.mkPen(color=color, width=1.5))
+                panel["curves"][name] = item
+            x, y = minmax_decimate(series.column(0), series.column(1), width)
+            item.setData(x, y)
+
+    def _update_metrics_label(self, panel: Dict[str, Any], entry: Dict[str, Any]):
+        text = format_live_metrics(entry["step_type"], entry.get("metrics"))
+        if panel["metrics_label"].text() != text:
+            panel["metrics_label"].setText(text)
+
     def _rebuild_grid(self):
         """Re-apply grid positions based on columns."""
         # Clear existing items
@@ -232,7 +331,7 @@ class OverviewRealtimeWidget(QWidget):
             self._apply_plot_height(panel["plot"])
         self._rebuild_grid()
 
-    def _apply_plot_height(self, plot: RealtimePlotWidget):
+    def _apply_plot_height(self, plot: pg.PlotWidget):
         plot.setMinimumHeight(self.plot_height)
         plot.setMaximumHeight(self.plot_height)
         self._rebuild_grid()
@@ -317,9 +416,14 @@ class OverviewRealtimeWidget(QWidget):
         self.columns_spin.setSuffix(tr("overview.columns_suffix"))
         self.height_label.setText(tr("overview.height_label"))
         self.height_spin.setSuffix(tr("overview.height_suffix"))
+        self.fps_label.setText(tr("overview.fps_label"))
+        self.fps_spin.setSuffix(tr("overview.fps_suffix"))
         self._refresh_filter_button_text()
         for port in list(self.device_panels.keys()):
             self._update_panel_labels(port)
+            entry = self.store.get(port)
+            if entry:
+                self._update_metrics_label(self.device_panels[port], entry)
 
     def update_device_list(self, devices: list):
         """Synchronize filter list with device control panel."""
@@ -1,6 +1,5 @@
 import numpy as np
 import time
-import re
 import traceback
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QFrame, QHBoxLayout, QCheckBox, QPushButton
 from PyQt5.QtCore import Qt, QTimer
@@ -8,7 +7,12 @@ from PyQt5.QtGui import QFont, QColor
 
 from qt_app.i18n import tr
 import pyqtgraph as pg
-from qt_app.utils.decoder import decode_hex_to_bytes, decode_bytes_to_data
+from qt_app.utils.decoder import (decode_hex_to_bytes, decode_bytes_to_array,
+                                  parse_output_metadata, split_output_segments,
+                                  decode_realtime_message)
+from qt_app.utils.ring_buffer import RingBuffer
+from qt_app.utils.decimation import decimate_for_view
+from qt_app.utils.live_metrics import format_live_metrics
 
 ########################### 日志设置 ###################################
 from logger_config import get_module_logger
@@ -38,17 +42,21 @@ class RealtimePlotWidget(QWidget):
         
         # 内存安全设置
         self.MAX_POINTS = 10000
+        # transient 按时间窗口裁剪，容量只作为高采样率时的上限
+        self.TRANSIENT_MAX_POINTS = 100000
         self.use_circular_buffer = True
         
         # === 单曲线数据结构（用于transfer和transient）===
-        self.data_x = np.array([])
-        self.data_y = np.array([])
-        self.new_point_buffer_x = []
-        self.new_point_buffer_y = []
+        # 预分配环形缓冲区 [x, y]；新解码的数据块先挂在 pending 列表，
+        # 在定时器刷新时一次性原地写入，保证 setData 之间存储不被改动
+        self.series = RingBuffer(self.MAX_POINTS, 2, growable=not self.use_circular_buffer)
+        self.pending_blocks = []
         self.last_sample_ts = 0.0
         
         # === 多曲线数据结构（仅用于output）===
-        self.output_curves_data = {}  # {curve_name: {'x': [...], 'y': [...]}}
+        # 每个栅压一条曲线，数据块先挂在 pending 中，帧定时器刷新时原地追加并重绘
+        self.output_curves_data = {}  # {curve_name: RingBuffer}
+        self.output_pending = {}  # {curve_name: [block, ...]}
         self.current_output_gate_voltage = None
         self.output_data_buffer = []
         self.expected_gate_voltages = set()
@@ -169,6 +177,12 @@ class RealtimePlotWidget(QWidget):
         self.step_info_label = QLabel(tr("realtime.waiting_data"))
         step_info_layout.addWidget(self.step_info_label)
         
+        # 后端实时计算的器件指标（test_metrics 消息）
+        self.metrics_label = QLabel()
+        self.metrics_label.setStyleSheet("color: #333;")
+        step_info_layout.addWidget(self.metrics_label, 1)
+        self._live_metrics = None  # (step_id, step_type, metrics)
+        
         self.clear_btn = QPushButton(tr("realtime.clear_button"))
         self.clear_btn.setStyleSheet("""
             QPushButton {
@@ -267,12 +281,22 @@ class RealtimePlotWidget(QWidget):
     def toggle_circular_buffer(self, enabled):
         """开关环形缓冲区"""
         self.use_circular_buffer = enabled
+        self.series.growable = not enabled
+        for series in self.output_curves_data.values():
+            series.growable = not enabled
         if enabled:
             # 如果启用，且当前数据已超过最大值，立即裁剪
-            if len(self.data_x) > self.MAX_POINTS:
-                self.data_x = self.data_x[-self.MAX_POINTS:]
-                self.data_y = self.data_y[-self.MAX_POINTS:]
-                self.update_plot()
+            if len(self.series) > self.MAX_POINTS:
+                self.series.keep_last(self.MAX_POINTS)
+                self.update_plot(force=True)
+            # output 各条曲线按帧刷新时的同一上限裁剪并重绘
+            max_points_per_curve = self.MAX_POINTS // max(1, len(self.output_curves_data))
+            for curve_name, series in self.output_curves_data.items():
+                if len(series) > max_points_per_curve:
+                    series.keep_last(max_points_per_curve)
+                    line = self.plot_lines.get(curve_name)
+                    if line is not None:
+                        line.setData(series.column(0), series.column(1))
     
     def toggle_auto_scrolling(self, enabled):
         """切换自动滚动时间窗口功能"""
@@ -299,19 +323,20 @@ class RealtimePlotWidget(QWidget):
     def clear_data(self):
         """手动清除图表数据"""
         # 清除单曲线数据
-        self.data_x = np.array([])
-        self.data_y = np.array([])
-        self.new_point_buffer_x = []
-        self.new_point_buffer_y = []
+        self.series.clear()
+        self.pending_blocks = []
 
         # 清除多曲线数据
         self.output_curves_data = {}
+        self.output_pending = {}
         self.current_output_gate_voltage = None
         self.output_data_buffer = []
         self.expected_gate_voltages = set()
 
         # 重置统计
         self.total_received_points = 0
+        self._live_metrics = None
+        self.metrics_label.clear()
 
         # 清除图例
         self.legend.clear()
@@ -343,6 +368,14 @@ class RealtimePlotWidget(QWidget):
             self.plot_widget.removeItem(line)
         self.plot_lines = {}
         
+        # transient 使用更大的缓冲容量，其余类型使用 MAX_POINTS
+        capacity = self.TRANSIENT_MAX_POINTS if step_type == 'transient' else self.MAX_POINTS
+        if self.series.capacity != capacity and not self.series.growable:
+            self.series = RingBuffer(capacity, 2, growable=not self.use_circular_buffer)
+        else:
+            self.series.clear()
+        self.pending_blocks = []
+        
         # 根据步骤类型创建相应的绘图对象
         if step_type in ['transfer', 'transient']:
             # 创建单曲线绘图对象
@@ -453,74 +486,11 @@ class RealtimePlotWidget(QWidget):
     
     def parse_output_metadata(self, hex_data):
         """解析hex数据中的output元数据前缀"""
-        if not isinstance(hex_data, str):
-            return None, None, hex_data
-            
-        # 检查output开始信号
-        if hex_data.startswith("OUTPUT_START:"):
-            try:
-                meta_part = hex_data.rstrip("|")
-                meta_parts = meta_part.split(":")
-                if len(meta_parts) == 4 and meta_parts[0] == "OUTPUT_START":
-                    gate_voltage = int(meta_parts[1])
-                    gate_voltage_index = int(meta_parts[2])
-                    total_gate_voltages = int(meta_parts[3])
-                    
-                    output_metadata = {
-                        "gate_voltage": gate_voltage,
-                        "gate_voltage_index": gate_voltage_index,
-                        "total_gate_voltages": total_gate_voltages,
-                        "is_output_curve": True
-                    }
-                    
-                    return "start", output_metadata, ""
-            except (ValueError, IndexError) as e:
-                logger.error(f"解析output开始信号失败: {e}")
-        
-        # 检查output数据元数据
-        elif hex_data.startswith("OUTPUT_META:"):
-            try:
-                meta_part, actual_hex_data = hex_data.split("|", 1)
-                meta_parts = meta_part.split(":")
-                if len(meta_parts) == 4 and meta_parts[0] == "OUTPUT_META":
-                    gate_voltage = int(meta_parts[1])
-                    gate_voltage_index = int(meta_parts[2])
-                    total_gate_voltages = int(meta_parts[3])
-                    
-                    output_metadata = {
-                        "gate_voltage": gate_voltage,
-                        "gate_voltage_index": gate_voltage_index,
-                        "total_gate_voltages": total_gate_voltages,
-                        "is_output_curve": True
-                    }
-                    
-                    return "data", output_metadata, actual_hex_data
-            except (ValueError, IndexError) as e:
-                logger.error(f"解析output元数据失败: {e}")
-        
-        return None, None, hex_data
+        return parse_output_metadata(hex_data)
 
     def _split_output_segments(self, hex_data: str):
         """Split concatenated OUTPUT_START/OUTPUT_META segments into individual chunks."""
-        if not isinstance(hex_data, str):
-            return [hex_data]
-
-        marker_re = re.compile(r"OUTPUT_(?:START|META):")
-        matches = list(marker_re.finditer(hex_data))
-        if not matches:
-            return [hex_data]
-
-        segments = []
-        # Keep any leading data before first marker (fallback)
-        if matches[0].start() > 0:
-            segments.append(hex_data[:matches[0].start()])
-
-        for idx, match in enumerate(matches):
-            start = match.start()
-            end = matches[idx + 1].start() if idx + 1 < len(matches) else len(hex_data)
-            segments.append(hex_data[start:end])
-
-        return segments
+        return split_output_segments(hex_data)
     
     def prepare_output_curve(self, gate_voltage: int, total_gate_voltages: int):
         """提前准备output曲线"""
@@ -531,7 +501,7 @@ class RealtimePlotWidget(QWidget):
         
         # 确保有对应的曲线数据结构
         if curve_name not in self.output_curves_data:
-            self.output_curves_data[curve_name] = {'x': [], 'y': []}
+            self.output_curves_data[curve_name] = RingBuffer(self.MAX_POINTS, 2, growable=not self.use_circular_buffer)
         
         # 确保有对应的绘图曲线
         if curve_name not in self.plot_lines:
@@ -572,6 +542,11 @@ class RealtimePlotWidget(QWidget):
             
             self.output_data_buffer.clear()
     
+    def process_messages(self, messages):
+        """处理同一设备一帧内的一批消息（消息字典与其他接收方共享，只读不改）"""
+        for message in messages:
+            self.process_message(message)
+    
     def process_message(self, message):
         """处理来自后端的消息 - 修复版本"""
         try:
@@ -579,9 +554,10 @@ class RealtimePlotWidget(QWidget):
             self._set_debug_message(tr("realtime.received", type=msg_type))
             
             if msg_type == "test_data":
-                # 获取原始数据
+                # 获取原始数据（接收线程已解码时直接使用解码结果）
                 hex_data = message.get("data", "")
-                if not hex_data:
+                decoded = message.get("decoded")
+                if not hex_data and decoded is None and not message.get("output_segments"):
                     return
                     
                 # 获取步骤类型和索引
@@ -614,6 +590,9 @@ class RealtimePlotWidget(QWidget):
                 self.current_step_type = step_type
                 self.current_step_index = step_index
                 self.current_step_id = step_id
+                if self._live_metrics and self._live_metrics[0] != step_id:
+                    self._live_metrics = None
+                    self.metrics_label.clear()
                 if step_changed or step_type != self._last_label_step_type:
                     self._apply_step_labels(step_type)
                 
@@ -629,11 +608,23 @@ class RealtimePlotWidget(QWidget):
                     self.reset_plot_for_step_type(step_type)
                 
                 # === 根据步骤类型处理数据 ===
-                if step_type == 'output':
+                if decoded is None and message.get("output_segments"):
+                    # 结构化的output数据段（接收线程未解码时在此解码）
+                    decoded = decode_realtime_message(
+                        message,
+                        transimpedance_ohms=self.transimpedance_ohms,
+                        baseline_current=self.baseline_current
+                    ) or []
+                if decoded is not None:
+                    self.apply_decoded_events(decoded)
+                elif step_type == 'output':
                     self.process_output_step(hex_data)
                 else:
                     self.process_traditional_step(hex_data, step_type)
                     
+            elif msg_type == "test_metrics":
+                self.apply_live_metrics(message)
+            
             elif msg_type == "test_progress":
                 progress = abs(message.get("progress", 0) * 100)
                 if progress >= 100:
@@ -649,6 +640,52 @@ class RealtimePlotWidget(QWidget):
             logger.error(f"Error processing message: {str(e)}")
             traceback.print_exc()
     
+    def apply_live_metrics(self, message):
+        """显示后端计算的实时指标；只显示当前步骤的（数据清空后迟到的旧步骤指标忽略）"""
+        workflow_info = message.get("workflow_info") or {}
+        step_type = message.get("step_type", "")
+        step_id = f"{workflow_info.get('step_index', -1)}-{step_type}-{workflow_info.get('path_readable', '')}"
+        if self.current_step_id and step_id != self.current_step_id:
+            return
+        self._live_metrics = (step_id, step_type, message.get("metrics"))
+        text = format_live_metrics(step_type, message.get("metrics"))
+        if self.metrics_label.text() != text:
+            self.metrics_label.setText(text)
+    
+    def apply_decoded_events(self, events):
+        """应用接收线程解码好的事件（见 decoder.decode_realtime_message），GUI线程只做缓存与绘图"""
+        for event in events:
+            kind = event[0]
+            if kind == "block":
+                self._ensure_single_plot_line("Current")
+                self.append_block(event[2], event[1])
+            elif kind == "output_start":
+                self._ensure_output_autorange()
+                self.prepare_output_curve(event[1]["gate_voltage"], event[1]["total_gate_voltages"])
+                self._set_debug_message(tr("realtime.preparing_curve", voltage=event[1]["gate_voltage"]), force=True)
+            elif kind == "output_data":
+                self._ensure_output_autorange()
+                self.add_output_block(event[1], event[2])
+            elif kind == "output_fallback":
+                self._ensure_single_plot_line(tr("realtime.output_current_fallback"))
+                block = event[1]
+                if len(block) > 0:
+                    self.total_received_points += len(block)
+                    self.pending_blocks.append(block)
+                    self._set_debug_message(tr("realtime.added_points_fallback", count=len(block)))
+
+    def _ensure_single_plot_line(self, name):
+        if not self.single_plot_line:
+            self.single_plot_line = self.plot_widget.plot([], [],
+                                                        pen=pg.mkPen(color='b', width=2),
+                                                        name=name)
+
+    def _ensure_output_autorange(self):
+        # 只在第一次进入output步骤时触发
+        if not self.plot_lines and not self.output_curves_data:
+            self._maybe_enable_autorange(x=True, y=True, force=True)
+            logger.info("首次进入output步骤，启用自动范围调整")
+
     def process_traditional_step(self, hex_data, step_type):
         """处理传统步骤（transfer/transient）- 使用单曲线逻辑"""
         if not hex_data:
@@ -657,37 +694,34 @@ class RealtimePlotWidget(QWidget):
         mode = 'transient' if step_type == 'transient' else 'transfer'
         
         # 确保有单曲线绘图对象
-        if not self.single_plot_line:
-            self.single_plot_line = self.plot_widget.plot([], [], 
-                                                        pen=pg.mkPen(color='b', width=2),
-                                                        name="Current")
+        self._ensure_single_plot_line("Current")
         
         # 解析数据
         byte_data = decode_hex_to_bytes(hex_data)
         if not byte_data:
             return
 
-        # 解析新数据点
-        new_points = decode_bytes_to_data(
+        # 解析新数据块 (N, 2)
+        block = decode_bytes_to_array(
             byte_data,
             mode,
             transimpedance_ohms=self.transimpedance_ohms,
             transient_packet_size=self.transient_packet_size if mode == 'transient' else None,
             baseline_current=self.baseline_current
         )
+        self.append_block(block, mode)
 
-        # 添加数据点到缓冲区，带数据验证
-        if new_points:
-            self.total_received_points += len(new_points)
-            if mode in ('transfer', 'transient'):
-                self.new_point_buffer_x.extend([point[0] for point in new_points])
-                self.new_point_buffer_y.extend([point[1] for point in new_points])
-                if mode == 'transient':
-                    self.last_sample_ts = new_points[-1][0]
-                    self._set_debug_message(f"t={self.last_sample_ts:.3f}s | +{len(new_points)} pts")
-                else:
-                    self._set_debug_message(tr("realtime.added_points", count=len(new_points), mode=mode))
-                return
+    def append_block(self, block, mode):
+        """将解码后的数据块挂入待绘制队列（单曲线模式）"""
+        if block is None or len(block) == 0:
+            return
+        self.total_received_points += len(block)
+        self.pending_blocks.append(block)
+        if mode == 'transient':
+            self.last_sample_ts = float(block[-1, 0])
+            self._set_debug_message(f"t={self.last_sample_ts:.3f}s | +{len(block)} pts")
+        else:
+            self._set_debug_message(tr("realtime.added_points", count=len(block), mode=mode))
     
     def process_output_step(self, hex_data):
         """处理output步骤 - 使用多曲线逻辑"""
@@ -695,10 +729,7 @@ class RealtimePlotWidget(QWidget):
             return
         
         # 关键修复：确保output步骤的视图范围正确
-        # 只在第一次进入output步骤时触发
-        if not self.plot_lines and not self.output_curves_data:
-            self._maybe_enable_autorange(x=True, y=True, force=True)
-            logger.info("首次进入output步骤，启用自动范围调整")
+        self._ensure_output_autorange()
         
         # 解析output元数据（支持拼接的多段数据）
         if isinstance(hex_data, str) and ("OUTPUT_START:" in hex_data or "OUTPUT_META:" in hex_data):
@@ -752,177 +783,138 @@ class RealtimePlotWidget(QWidget):
     
     def process_output_realtime_data_immediate(self, hex_data, output_metadata):
         """立即处理output数据"""
-        gate_voltage = output_metadata.get("gate_voltage", 0)
-        curve_name = f"Id(Vg={gate_voltage}mV)"
-
         # 解析hex数据
         byte_data = decode_hex_to_bytes(hex_data)
         if not byte_data:
             return
 
-        # 解析新数据点
-        new_points = decode_bytes_to_data(
+        # output使用transfer格式，解码时已过滤非有限值及超出 ±5V / ±1A 的异常点
+        block = decode_bytes_to_array(
             byte_data,
             mode='transfer',
             transimpedance_ohms=self.transimpedance_ohms,
             baseline_current=self.baseline_current
-        )  # output使用transfer格式
-
-        if new_points and curve_name in self.output_curves_data:
-            # 添加数据点到对应曲线，并进行额外验证
-            valid_points_added = 0
-            for point in new_points:
-                # 额外的数据验证层：过滤异常值
-                voltage = point[0]
-                current = point[1]
-
-                # 检查是否为有效数值（不是NaN或Inf）
-                if not (np.isfinite(voltage) and np.isfinite(current)):
-                    logger.warning(f"跳过非有效数值: voltage={voltage}, current={current}")
-                    continue
-
-                # 检查电压范围（根据实际应用调整）
-                if abs(voltage) > 5.0:
-                    logger.warning(f"跳过异常电压值 {voltage}V in curve {curve_name}")
-                    continue
-
-                # 检查电流范围
-                if abs(current) > 1.0:
-                    logger.warning(f"跳过异常电流值 {current}A in curve {curve_name}")
-                    continue
+        )
+        self.add_output_block(output_metadata, block)
 
-                # 数据有效，添加到曲线
-                self.output_curves_data[curve_name]['x'].append(voltage)
-                self.output_curves_data[curve_name]['y'].append(current)
-                valid_points_added += 1
+    def add_output_block(self, output_metadata, block):
+        """将一个解码后的数据块挂到对应栅压曲线的待绘制队列，重绘在帧定时器中进行"""
+        gate_voltage = output_metadata.get("gate_voltage", 0)
+        curve_name = f"Id(Vg={gate_voltage}mV)"
 
-            # 更新统计（只计数接收到的点，不管是否有效）
-            self.total_received_points += len(new_points)
+        # 曲线还没准备好时先创建
+        if curve_name not in self.plot_lines or curve_name not in self.output_curves_data:
+            self.prepare_output_curve(gate_voltage, output_metadata.get("total_gate_voltages", 1))
 
-            # 如果有有效数据点被添加
-            if valid_points_added > 0:
-                # 内存保护
-                if self.use_circular_buffer:
-                    max_points_per_curve = self.MAX_POINTS // max(1, len(self.output_curves_data))
-                    for curve_data in self.output_curves_data.values():
-                        if len(curve_data['x']) > max_points_per_curve:
-                            curve_data['x'] = curve_data['x'][-max_points_per_curve:]
-                            curve_data['y'] = curve_data['y'][-max_points_per_curve:]
+        if len(block) == 0:
+            return
+        self.output_pending.setdefault(curve_name, []).append(block)
+        self.total_received_points += len(block)
 
-                # 立即更新曲线显示
-                if curve_name in self.plot_lines and self.output_curves_data[curve_name]['x']:
-                    self.plot_lines[curve_name].setData(
-                        self.output_curves_data[curve_name]['x'],
-                        self.output_curves_data[curve_name]['y']
-                    )
+    def update_output_curves(self):
+        """帧刷新：把待绘制数据块原地追加到各栅压曲线，只重绘有新数据的曲线"""
+        if not self.output_pending:
+            return
+        pending, self.output_pending = self.output_pending, {}
+        had_data = sum(1 for series in self.output_curves_data.values() if len(series))
+        max_points_per_curve = self.MAX_POINTS // max(1, len(self.output_curves_data))
 
-                # 关键修复：确保output数据显示时自动调整范围
-                # 仅在接收到第一批数据时触发，避免频繁调整
-                total_curves_with_data = sum(1 for data in self.output_curves_data.values() if data['x'])
-                if total_curves_with_data <= 2 and len(self.output_curves_data[curve_name]['x']) <= 50:
-                    self._maybe_enable_autorange(x=True, y=True)
+        for curve_name, blocks in pending.items():
+            series = self.output_curves_data.get(curve_name)
+            if series is None:
+                continue
+            series.extend(blocks[0] if len(blocks) == 1 else np.concatenate(blocks))
+            # 内存保护
+            if self.use_circular_buffer:
+                series.keep_last(max_points_per_curve)
+            line = self.plot_lines.get(curve_name)
+            if line is not None and len(series):
+                line.setData(series.column(0), series.column(1))
 
-                # 更新数据计数
-                total_points = sum(len(data['x']) for data in self.output_curves_data.values())
-                curve_count = len(self.output_curves_data)
-                self.data_count_label.setText(tr("realtime.points_label_curves", points=total_points, curves=curve_count))
+        # 关键修复：确保output数据显示时自动调整范围
+        # 仅在最初几条曲线开始有数据时触发，避免频繁调整
+        if had_data <= 2:
+            self._maybe_enable_autorange(x=True, y=True)
 
-                logger.info(f"添加 {valid_points_added}/{len(new_points)} 个有效数据点到 {curve_name}")
-            else:
-                logger.warning(f"所有 {len(new_points)} 个数据点都被过滤，未添加到 {curve_name}")
+        # 更新数据计数
+        total_points = sum(len(series) for series in self.output_curves_data.values())
+        curve_count = len(self.output_curves_data)
+        self.data_count_label.setText(tr("realtime.points_label_curves", points=total_points, curves=curve_count))
     
     def process_output_fallback(self, hex_data):
         """处理output的向后兼容模式（单曲线）"""
         # 确保有单曲线绘图对象
-        if not self.single_plot_line:
-            self.single_plot_line = self.plot_widget.plot([], [], 
-                                                        pen=pg.mkPen(color='b', width=2),
-                                                        name=tr("realtime.output_current_fallback"))
+        self._ensure_single_plot_line(tr("realtime.output_current_fallback"))
         
         # 解析数据
         byte_data = decode_hex_to_bytes(hex_data)
         if not byte_data:
             return
 
-        new_points = decode_bytes_to_data(
+        # 解码时已过滤非有限值及超出 ±5V / ±1A 的异常点
+        block = decode_bytes_to_array(
             byte_data,
             mode='transfer',
             transimpedance_ohms=self.transimpedance_ohms,
             baseline_current=self.baseline_current
         )
 
-        if new_points:
-            self.total_received_points += len(new_points)
-            valid_points = 0
-
-            for point in new_points:
-                x_val = point[0]
-                y_val = point[1]
-
-                # 数据验证
-                if not (np.isfinite(x_val) and np.isfinite(y_val)):
-                    logger.warning(f"跳过非有效数值: x={x_val}, y={y_val}")
-                    continue
-
-                if abs(x_val) > 5.0:
-                    logger.warning(f"跳过异常电压值: {x_val}V")
-                    continue
-
-                if abs(y_val) > 1.0:
-                    logger.warning(f"跳过异常电流值: {y_val}A")
-                    continue
-
-                # 数据有效，添加到缓冲区
-                self.new_point_buffer_x.append(x_val)
-                self.new_point_buffer_y.append(y_val)
-                valid_points += 1
-
-            if valid_points > 0:
-                self._set_debug_message(tr("realtime.added_points_fallback", count=valid_points))
+        if len(block) > 0:
+            self.total_received_points += len(block)
+            self.pending_blocks.append(block)
+            self._set_debug_message(tr("realtime.added_points_fallback", count=len(block)))
     
-    def update_plot(self):
+    def _decimated_series(self):
+        """按绘图区域像素宽度（及 display_max_points 上限）降采样当前数据"""
+        x = self.series.column(0)
+        y = self.series.column(1)
+        buckets = int(self.plot_widget.getViewBox().width()) or 1000
+        if self.display_max_points:
+            buckets = min(buckets, max(self.display_max_points // 2, 1))
+        if len(y) <= 2 * buckets:
+            return x, y
+        # 瞬态时间轴单调递增，用户缩放查看时只处理可见部分
+        x_range = None
+        if self.current_step_type == 'transient' and not self.auto_scrolling_enabled:
+            x_range = self.plot_widget.getViewBox().viewRange()[0]
+        return decimate_for_view(x, y, buckets, x_range=x_range,
+                                 monotonic=x_range is not None)
+
+    def update_plot(self, force=False):
         """更新图表绘图"""
-        # output多曲线模式不需要这里更新，因为在接收数据时已经实时更新
+        # output多曲线模式：各栅压曲线在帧刷新时批量更新
         if self.current_step_type == 'output' and self.output_curves_data:
+            self.update_output_curves()
             return
             
-        # 单曲线模式更新
-        if not self.new_point_buffer_x or not self.single_plot_line:
+        # 单曲线模式更新：没有新数据时不重绘
+        if not self.single_plot_line or (not self.pending_blocks and not force):
             return
-            
-        # 使用NumPy高效连接数组
-        buffer_x = np.array(self.new_point_buffer_x)
-        buffer_y = np.array(self.new_point_buffer_y)
-        
-        # 如果是新图表，直接设置数据
-        if self.data_x.size == 0:
-            self.data_x = buffer_x
-            self.data_y = buffer_y
+        
+        first_data = len(self.series) == 0
+        
+        # 将待绘制数据块原地写入环形缓冲区
+        if self.pending_blocks:
+            if len(self.pending_blocks) == 1:
+                self.series.extend(self.pending_blocks[0])
+            else:
+                self.series.extend(np.concatenate(self.pending_blocks))
+            self.pending_blocks = []
+        if len(self.series) == 0:
+            return
+        if first_data:
             self._maybe_enable_autorange(x=True, y=True, force=True)
-        else:
-            # 连接到现有数组
-            self.data_x = np.append(self.data_x, buffer_x)
-            self.data_y = np.append(self.data_y, buffer_y)
-        
-        # 内存保护（transient启用时间窗口时改为时间裁剪）
-        if self.current_step_type == 'transient' and self.auto_scrolling_enabled and self.data_x.size:
-            max_time = self.data_x[-1]
-            window_start = max_time - self.window_size
+        
+        # 内存保护（transient启用时间窗口时改为时间裁剪，使用最新写入的时间戳）
+        if self.current_step_type == 'transient' and self.auto_scrolling_enabled:
+            window_start = self.series.last(0) - self.window_size
             if window_start > 0:
-                start_idx = np.searchsorted(self.data_x, window_start, side="left")
-                if start_idx > 0:
-                    self.data_x = self.data_x[start_idx:]
-                    self.data_y = self.data_y[start_idx:]
-        elif self.use_circular_buffer and len(self.data_x) > self.MAX_POINTS:
-            self.data_x = self.data_x[-self.MAX_POINTS:]
-            self.data_y = self.data_y[-self.MAX_POINTS:]
-        
-        # 清空缓冲区
-        self.new_point_buffer_x = []
-        self.new_point_buffer_y = []
+                self.series.trim_before(window_start, 0)
+        elif self.use_circular_buffer:
+            self.series.keep_last(self.MAX_POINTS)
         
         # 设置符号
-        total_points = self.data_x.size
+        total_points = len(self.series)
         point_symbols_enabled = self.symbol_check.isChecked()
         
         if total_points > 1000 and not point_symbols_enabled:
@@ -931,13 +923,8 @@ class RealtimePlotWidget(QWidget):
             self.single_plot_line.setSymbol('o') 
             self.single_plot_line.setSymbolSize(4)
         
-        # 更新图表数据（显示端采样）
-        display_x = self.data_x
-        display_y = self.data_y
-        if self.display_max_points and total_points > self.display_max_points:
-            indices = np.linspace(0, total_points - 1, self.display_max_points, dtype=int)
-            display_x = self.data_x[indices]
-            display_y = self.data_y[indices]
+        # 更新图表数据（显示端按像素宽度做 min/max 包络降采样，保留尖峰）
+        display_x, display_y = self._decimated_series()
         self.single_plot_line.setData(display_x, display_y)
         
         # 滚动窗口支持
@@ -959,8 +946,8 @@ class RealtimePlotWidget(QWidget):
     def sliding_window(self):
         """滚动窗口处理"""
         if self.current_step_type == 'transient' and self.auto_scrolling_enabled:
-            if len(self.data_x) > 1:
-                max_time = np.max(self.data_x)
+            if len(self.series) > 1:
+                max_time = self.series.last(0)
                 if max_time > self.window_size:
                     min_time = max_time - self.window_size
                     self.plot_widget.setXRange(min_time, max_time)
@@ -1002,6 +989,8 @@ class RealtimePlotWidget(QWidget):
 
         # Step info and clear button
         self.clear_btn.setText(tr("realtime.clear_button"))
+        if self._live_metrics:
+            self.metrics_label.setText(format_live_metrics(self._live_metrics[1], self._live_metrics[2]))
 
         # Plot labels and title
         # The title and labels are updated dynamically in process_message,
@@ -1037,7 +1026,7 @@ class RealtimePlotWidget(QWidget):
              self._set_debug_message(tr("realtime.no_data_received"))
         
         # This will be updated on the next data point, but we can update it now
-        self.update_plot()
+        self.update_plot(force=True)
         
         # Fallback name
         if self.single_plot_line and self.single_plot_line.name() == "Output Current":
@@ -1,7 +1,5 @@
 import os
 import json
-import csv
-import math
 import shutil  # Added for file/directory operations
 import numpy as np
 from datetime import datetime
@@ -11,13 +9,29 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QSplitter,
                            QTabWidget, QSizePolicy, QHeaderView, 
                            QFormLayout, QMessageBox, QStyledItemDelegate, QStyle,
                            QFileDialog, QToolBar, QAction, QAbstractItemView, 
-                           QComboBox, QApplication)  # Added QComboBox for sorting options
-from PyQt5.QtCore import Qt, QSize, QRect, QMimeData, pyqtSignal
-from PyQt5.QtGui import QIcon, QColor, QFont, QPalette, QBrush, QDrag, QPainter
+                           QComboBox, QApplication, QLineEdit, QInputDialog,
+                           QProgressDialog)  # Added QComboBox for sorting options
+from PyQt5.QtCore import Qt, QSize, QRect, QMimeData, QTimer, QThread, QThreadPool, QPointF, pyqtSignal
+from PyQt5.QtGui import QIcon, QColor, QFont, QPalette, QBrush, QDrag, QPainter, QPen, QPolygonF
 from qt_app.i18n import tr
 
 from qt_app.i18n import tr
 import pyqtgraph as pg
+from qt_app.utils.decimation import decimate_for_view, is_monotonic, minmax_decimate, visible_slice
+from qt_app.utils.nearest_point import NearestPointIndex
+from qt_app.utils.analysis_worker import BatchAnalysisWorker
+from qt_app.utils.overlay_loader import OverlayLoadSignals, OverlayLoadTask
+from qt_app.utils.step_loader import SidecarPrewarmWorker, StepLoadWorker
+from qt_app.utils.step_cache import get_step_cache
+from qt_app.utils.step_thumbnails import StatsBackfillSignals, StatsBackfillTask
+from qt_app.utils.dataset_export import DATASET_FORMAT_COLUMNAR, DATASET_FORMAT_CSV, DATASET_FORMATS, DatasetExporter
+from qt_app.utils.test_export import (EXPORT_FORMAT_FOLDER, EXPORT_FORMAT_TAR_GZ, EXPORT_FORMAT_ZIP,
+                                      TestExporter, TestExportWorker)
+from app_config import (is_step_sidecar_enabled, get_step_sidecar_prewarm_tests, get_export_copy_workers,
+                        get_export_compress_level, get_dataset_export_processes)
+from backend_device_control_pyqt.core.columnar_store import open_columnar, columnar_path_for
+from backend_device_control_pyqt.core.test_catalog import parse_range_expressions
+from backend_device_control_pyqt.core.minmax_pyramid import open_pyramid, pyramid_dir_for
 ########################### 日志设置 ###################################
 from logger_config import get_module_logger
 logger = get_module_logger() 
@@ -214,7 +228,7 @@ class SortingContainer(QWidget):
         
         # 初始化排序块
         self.sort_blocks = {}
-        self.sort_order = ['time', 'name', 'device', 'chip_id', 'device_number', 'description']
+        self.sort_order = ['time', 'name', 'device', 'chip_id', 'device_number', 'description', 'vth', 'gm_max']
         self.sort_directions = {}  # 追踪每个字段的升降序
         
         # 排序块定义
@@ -224,7 +238,9 @@ class SortingContainer(QWidget):
             ('device', tr('history.sort.device')),
             ('chip_id', tr('history.sort.chip_id')),
             ('device_number', tr('history.sort.device_number')),
-            ('description', tr('history.sort.description'))
+            ('description', tr('history.sort.description')),
+            ('vth', tr('history.sort.vth')),
+            ('gm_max', tr('history.sort.gm_max'))
         ]
         
         # 创建排序块
@@ -253,7 +269,9 @@ class SortingContainer(QWidget):
             'device': tr('history.sort.device'),
             'chip_id': tr('history.sort.chip_id'),
             'device_number': tr('history.sort.device_number'),
-            'description': tr('history.sort.description')
+            'description': tr('history.sort.description'),
+            'vth': tr('history.sort.vth'),
+            'gm_max': tr('history.sort.gm_max')
         }
         for key, block in self.sort_blocks.items():
             if key in translations:
@@ -330,9 +348,44 @@ class SortingContainer(QWidget):
 class CustomTestItemDelegate(QStyledItemDelegate):
     """Custom delegate for rendering test list items with more information"""
     
+    # 步骤缩略图的尺寸与颜色
+    SPARK_WIDTH = 40
+    SPARK_HEIGHT = 16
+    SPARK_GAP = 4
+    SPARK_COLORS = {"transfer": QColor(24, 144, 255), "transient": QColor(82, 196, 26),
+                    "output": QColor(250, 140, 22)}
+    
     def sizeHint(self, option, index):
         """Return the size needed to display the item"""
+        test = index.data(Qt.UserRole)
+        # 索引条目预留缩略图行（补算完成后高度不变，无需重新布局）
+        if isinstance(test, dict) and "step_stats" in test and test.get("step_count"):
+            return QSize(option.rect.width(), 70 + self.SPARK_HEIGHT + 6)
         return QSize(option.rect.width(), 70)  # Altura aumentada para mostrar más información
+    
+    def _paint_sparklines(self, painter, rect, step_stats, fallback_color):
+        """在 rect 中从左到右绘制各步骤的 min/max 缩略折线（数据来自测试索引）"""
+        left = rect.left()
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        for step in step_stats:
+            values = step.get("sparkline")
+            if not values:
+                continue
+            if left + self.SPARK_WIDTH > rect.right():
+                break
+            low = min(values)
+            span = (max(values) - low) or 1.0
+            last = max(len(values) - 1, 1)
+            polygon = QPolygonF([
+                QPointF(left + self.SPARK_WIDTH * i / last,
+                        rect.bottom() - (value - low) / span * rect.height())
+                for i, value in enumerate(values)
+            ])
+            painter.setPen(QPen(self.SPARK_COLORS.get(step.get("type"), fallback_color), 1))
+            painter.drawPolyline(polygon)
+            left += self.SPARK_WIDTH + self.SPARK_GAP
+        painter.restore()
         
     def paint(self, painter, option, index):
         """Custom painting for test items"""
@@ -385,11 +438,30 @@ class CustomTestItemDelegate(QStyledItemDelegate):
             if isinstance(test_info, dict):
                 desc = test_info.get("description", "")
         
-        if len(desc) > 60:  # Truncar descripciones largas
-            desc = desc[:57] + "..."
+        # 右侧显示保存时写入的摘要统计（来自测试索引，不读取数据文件）
+        stats_text = ""
+        if test.get("total_points") is not None:
+            imax = test.get("max_abs_current")
+            ratio = test.get("on_off_ratio")
+            stats_text = tr("history.list_stats", points=f"{test['total_points']:,}",
+                            imax=f"{imax:.2e}" if imax is not None else "-",
+                            ratio=f"{ratio:.1e}" if ratio is not None else "-")
+        analysis = test.get("analysis") or {}
+        if analysis.get("vth") is not None or analysis.get("gm_max") is not None:
+            vth = analysis.get("vth")
+            gm = analysis.get("gm_max")
+            analysis_text = tr("history.list_analysis", vth=f"{vth:.3g}" if vth is not None else "-",
+                               gm=f"{gm:.2e}" if gm is not None else "-")
+            stats_text = f"{stats_text} · {analysis_text}" if stats_text else analysis_text
+        
+        max_desc = 36 if stats_text else 60
+        if len(desc) > max_desc:  # Truncar descripciones largas
+            desc = desc[:max_desc - 3] + "..."
             
         desc_rect = QRect(rect.left() + 10, rect.top() + 25, rect.width() - 20, 20)
         painter.drawText(desc_rect, Qt.AlignLeft | Qt.AlignVCenter, desc)
+        if stats_text:
+            painter.drawText(desc_rect, Qt.AlignRight | Qt.AlignVCenter, stats_text)
         
         # 从test_info获取芯片ID和器件编号
         test_info = test.get("test_info", {})
@@ -437,16 +509,39 @@ class CustomTestItemDelegate(QStyledItemDelegate):
                 
         right_rect = QRect(rect.left() + 10, rect.top() + 45, rect.width() - 20, 20)
         painter.drawText(right_rect, Qt.AlignRight | Qt.AlignVCenter, right_text)
+        
+        # 底部一行步骤缩略图
+        step_stats = test.get("step_stats") or []
+        if step_stats:
+            spark_rect = QRect(rect.left() + 10, rect.top() + 68, rect.width() - 20, self.SPARK_HEIGHT)
+            self._paint_sparklines(painter, spark_rect, step_stats, sec_color)
+
+# 悬停显示最近点的距离阈值（按视图 x/y 范围归一化）
+HOVER_MAX_DISTANCE = (2 ** 0.5) / 20
+# 叠加曲线超过该数量时不再逐条加图例
+OVERLAY_LEGEND_LIMIT = 20
+
 
 class TestHistoryWidget(QWidget):
     """
     Widget for viewing and analyzing historical test data - 支持output多曲线显示
     """
     
+    # 测试列表每页条数（从测试索引分页读取）
+    PAGE_SIZE = 200
+
     def __init__(self, backend):
         super().__init__()
         self.backend = backend
         
+        # 分页与搜索
+        self.page_index = 0
+        self.total_tests = 0
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(300)
+        self._search_timer.timeout.connect(self._on_search_committed)
+        
         # Current selections
         self.selected_device = None
         self.selected_test = None
@@ -456,18 +551,65 @@ class TestHistoryWidget(QWidget):
         self.devices = []
         self.tests = []
         self.test_info = {}
-        self.step_data = []
+        self.step_data = np.empty((0, 2))  # 单曲线数据 (N, 2)
         self.step_data_dict = {}  # 新增：支持多曲线数据存储
+        # 单曲线完整数据（numpy），绘图时按视图范围和像素宽度降采样
+        self._plot_x = None
+        self._plot_y = None
+        self._plot_monotonic = False
+        self._hover_index = None  # 悬停最近点索引，首次悬停时按当前数据建立
+        # 长瞬态步骤：min/max 金字塔 + 列式文件（memmap），不再整体读入CSV
+        self._pyramid = None
+        self._redecimate_timer = QTimer(self)
+        self._redecimate_timer.setSingleShot(True)
+        self._redecimate_timer.setInterval(30)
+        self._redecimate_timer.timeout.connect(self._redecimate_single_curve)
+        # 后台加载步骤数据：当前请求与仍在运行的线程
+        self._load_request_id = 0
+        self._loading_step = None  # (request_id, step_type, data_file)
+        self._load_worker = None
+        self._load_threads = {}  # {request_id: (QThread, StepLoadWorker)}
+        # 最近测试的旁路缓存预生成（每次启动只做一次）
+        self._prewarm_started = False
+        self._prewarm_thread = None
+        self._prewarm_worker = None
+        # 后台批量分析
+        self._analysis_thread = None
+        self._analysis_worker = None
+        self._analysis_dialog = None
+        # 后台导出
+        self._export_thread = None
+        self._export_worker = None
+        self._export_dialog = None
+        
+        # 旧测试的步骤摘要/缩略图由线程池在后台补算
+        self._backfill_pool = QThreadPool(self)
+        self._backfill_pool.setMaxThreadCount(2)
+        self._backfill_signals = StatsBackfillSignals(self)
+        self._backfill_signals.finished.connect(self._on_stats_backfilled)
+        self._backfill_requested = set()
+        
+        # 多曲线叠加：并行加载，每条曲线按视图降采样
+        self._overlay_pool = QThreadPool(self)
+        self._overlay_pool.setMaxThreadCount(max(min(QThreadPool.globalInstance().maxThreadCount(), 4), 1))
+        self._overlay_signals = OverlayLoadSignals(self)
+        self._overlay_signals.loaded.connect(self._on_overlay_loaded)
+        self._overlay_signals.failed.connect(self._on_overlay_failed)
+        self._overlay_request_id = 0
+        self._overlay_expected = 0
+        self._overlay_curves = []  # [{"x", "y", "monotonic", "line"}]
         
         # Sorting preferences - 更新为新的拖拽排序
-        self.sort_priorities = ['time', 'name', 'device', 'chip_id', 'device_number', 'description']
+        self.sort_priorities = ['time', 'name', 'device', 'chip_id', 'device_number', 'description', 'vth', 'gm_max']
         self.sort_directions = {
             'time': False,      # 时间默认降序
             'name': True,       # 名称默认升序
             'device': True,     # 设备默认升序
             'chip_id': True,    # 芯片ID默认升序
             'device_number': True,  # 器件编号默认升序
-            'description': True     # 描述默认升序
+            'description': True,    # 描述默认升序
+            'vth': True,        # 批量分析的阈值电压
+            'gm_max': True      # 批量分析的峰值跨导
         }
         
         # Plot lines for multiple curves
@@ -548,6 +690,16 @@ class TestHistoryWidget(QWidget):
         self.delete_action.triggered.connect(self.delete_selected_tests)
         test_toolbar.addAction(self.delete_action)
         
+        # Overlay selected tests/steps
+        self.overlay_action = QAction(QIcon.fromTheme("view-statistics"), tr("history.overlay_selected"), self)
+        self.overlay_action.triggered.connect(self.overlay_selected)
+        test_toolbar.addAction(self.overlay_action)
+        
+        # Batch analysis (Vth / gm / SS / hysteresis / time constants)
+        self.analyze_action = QAction(QIcon.fromTheme("system-run"), tr("history.analyze_selected"), self)
+        self.analyze_action.triggered.connect(self.analyze_tests)
+        test_toolbar.addAction(self.analyze_action)
+        
         test_list_layout.addWidget(test_toolbar)
         
         # Selected count label
@@ -556,6 +708,13 @@ class TestHistoryWidget(QWidget):
         self.selection_label.setStyleSheet("color: #666; font-size: 11px;")
         test_list_layout.addWidget(self.selection_label)
         
+        # 搜索框：名称/描述/芯片ID/器件编号子串，输入停顿后再查询
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText(tr("history.search_placeholder"))
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(lambda _text: self._search_timer.start())
+        test_list_layout.addWidget(self.search_edit)
+        
         # Test list with multi-selection
         self.test_list = QListWidget()
         self.test_list.setItemDelegate(CustomTestItemDelegate())  # Use custom delegate
@@ -566,6 +725,21 @@ class TestHistoryWidget(QWidget):
         self.test_list.itemSelectionChanged.connect(self.on_selection_changed)
         test_list_layout.addWidget(self.test_list)
         
+        # 分页控制
+        page_layout = QHBoxLayout()
+        page_layout.setContentsMargins(0, 0, 0, 0)
+        self.page_prev_btn = QPushButton(tr("history.page_prev"))
+        self.page_prev_btn.clicked.connect(lambda: self._change_page(-1))
+        page_layout.addWidget(self.page_prev_btn)
+        self.page_label = QLabel()
+        self.page_label.setAlignment(Qt.AlignCenter)
+        self.page_label.setStyleSheet("color: #666; font-size: 11px;")
+        page_layout.addWidget(self.page_label, 1)
+        self.page_next_btn = QPushButton(tr("history.page_next"))
+        self.page_next_btn.clicked.connect(lambda: self._change_page(1))
+        page_layout.addWidget(self.page_next_btn)
+        test_list_layout.addLayout(page_layout)
+        
         left_layout.addWidget(self.test_list_group)
         
         # Middle panel - Step list
@@ -580,6 +754,8 @@ class TestHistoryWidget(QWidget):
         self.step_list = QTreeWidget()
         self.step_list.setHeaderLabels([tr("history.tree_headers.step"), tr("history.tree_headers.type"), tr("history.tree_headers.params")])
         self.step_list.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        # 按住 Ctrl/Shift 可多选步骤用于叠加对比
+        self.step_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.step_list.currentItemChanged.connect(self.on_step_selected)
         step_list_layout.addWidget(self.step_list)
         
@@ -630,6 +806,8 @@ class TestHistoryWidget(QWidget):
 
         # 添加鼠标移动事件处理
         self.plot_widget.scene().sigMouseMoved.connect(self.on_mouse_moved)
+        # 缩放/平移后按新的可见范围重新降采样
+        self.plot_widget.getViewBox().sigRangeChanged.connect(self._schedule_redecimate)
 
         plot_layout.addWidget(self.plot_widget)
         
@@ -698,6 +876,14 @@ class TestHistoryWidget(QWidget):
         self.data_file_form_label = QLabel(tr("history.data_stats.filename"))
         self.data_stats_layout.addRow(self.data_file_form_label, self.data_file_label)
         
+        # 保存时写入的步骤摘要统计（无需读取数据文件）
+        self.summary_labels = {}
+        self.summary_form_labels = {}
+        for key in ("current_range", "max_abs_current", "on_off_ratio", "current_mean_std"):
+            self.summary_labels[key] = QLabel()
+            self.summary_form_labels[key] = QLabel(tr(f"history.data_stats.{key}"))
+            self.data_stats_layout.addRow(self.summary_form_labels[key], self.summary_labels[key])
+        
         details_layout.addWidget(self.data_stats_group)
         
         self.details_tab_index = self.data_tabs.addTab(details_tab, tr("history.details_tab"))
@@ -729,16 +915,9 @@ class TestHistoryWidget(QWidget):
     def refresh_devices(self):
         """Refresh the device list"""
         try:
-            # Get all saved tests
-            all_tests = self.backend.list_saved_tests()
-            
-            # Extract unique device IDs
-            device_ids = set()
-            for test in all_tests:
-                device_ids.add(test.get("device_id", ""))
-            
-            # Update devices list
-            self.devices = sorted(list(device_ids))
+            # 设备列表直接取自测试索引，不再读取全部测试
+            self.devices = self.backend.list_saved_device_ids()
+            self._start_sidecar_prewarm()
             
             # Remember current selection
             current_device = self.selected_device
@@ -784,31 +963,14 @@ class TestHistoryWidget(QWidget):
             return
         
         try:
-            # Get tests for selected device (or all tests if "ALL" is selected)
-            if self.selected_device == "ALL":
-                self.tests = self.backend.list_saved_tests()  # Get all tests
-            else:
-                self.tests = self.backend.list_saved_tests(self.selected_device)
-            
             # Remember current selection
             current_test_id = None
             if self.selected_test:
                 current_test_id = self.selected_test.get("test_id")
             
-            # Load additional test info for all tests
-            for test in self.tests:
-                test_dir = test.get("dir_path")
-                if test_dir and os.path.exists(test_dir):
-                    test_data = self.backend.get_saved_test_data(test_dir)
-                    if test_data and test_data.get("status") == "ok":
-                        test_info = test_data.get("test_info", {})
-                        # 更新test对象的description
-                        if "description" in test_info:
-                            test["description"] = test_info["description"]
-                        test["test_info"] = test_info
-            
-            # Sort tests according to current sorting preference
-            self.tests = self.sort_tests(self.tests)
+            # 只读取当前页：过滤、排序、分页都在测试索引中完成
+            self.tests = self._query_test_page()
+            self._update_page_controls()
             
             # Update test list widget
             self.test_list.clear()
@@ -818,6 +980,7 @@ class TestHistoryWidget(QWidget):
                 item.setData(Qt.UserRole, test)
                 item.setText(test.get("name", tr("history.unnamed_test")))
                 self.test_list.addItem(item)
+            self._request_stats_backfill(self.tests)
             
             # Restore selection if possible
             if current_test_id:
@@ -840,6 +1003,103 @@ class TestHistoryWidget(QWidget):
         except Exception as e:
             QMessageBox.warning(self, tr("main.dialog.error"), tr("history.dialog.error_refresh_tests", error=str(e)))
     
+    def _request_stats_backfill(self, tests):
+        """当前页中来自索引、已结束但还没有步骤摘要的测试，提交后台补算（每个测试只提交一次）"""
+        for test in tests:
+            test_dir = test.get("dir_path")
+            if ("step_stats" not in test or test.get("step_stats") or not test.get("step_count")
+                    or test.get("status") not in ("completed", "stopped", "error")
+                    or not test_dir or test_dir in self._backfill_requested):
+                continue
+            self._backfill_requested.add(test_dir)
+            self._backfill_pool.start(StatsBackfillTask(test_dir, self.backend, self._backfill_signals))
+
+    def _on_stats_backfilled(self, test_dir, entry):
+        """补算完成：用重新索引的条目替换列表项数据，委托据此重绘"""
+        if not entry:
+            return
+        for i in range(self.test_list.count()):
+            item = self.test_list.item(i)
+            test = item.data(Qt.UserRole)
+            if test and test.get("dir_path") == entry.get("dir_path"):
+                item.setData(Qt.UserRole, entry)
+                self.tests = [entry if t.get("dir_path") == entry.get("dir_path") else t for t in self.tests]
+                if self.selected_test and self.selected_test.get("dir_path") == entry.get("dir_path"):
+                    self.selected_test = entry
+                break
+
+    def _current_filters(self):
+        """当前设备选择与搜索框对应的查询条件"""
+        filters = {}
+        if self.selected_device and self.selected_device != "ALL":
+            filters["device_id"] = self.selected_device
+        # 搜索框中的 "vth>0.2"、"gm>=1e-3" 等表达式作为指标范围过滤，其余文字按子串搜索
+        range_filters, text = parse_range_expressions(self.search_edit.text().strip())
+        filters.update(range_filters)
+        if text:
+            filters["text"] = text
+        return filters
+
+    def _query_test_page(self):
+        """从测试索引读取当前页；页码越界时退回最后一页"""
+        filters = self._current_filters()
+        sort = [(key, self.sort_directions.get(key, True)) for key in self.sort_priorities]
+        result = self.backend.query_saved_tests(filters, sort,
+                                                offset=self.page_index * self.PAGE_SIZE,
+                                                limit=self.PAGE_SIZE)
+        if result.get("status") != "ok":
+            return self._load_test_page_fallback(filters)
+        self.total_tests = result.get("total", 0)
+        last_page = max((self.total_tests - 1) // self.PAGE_SIZE, 0)
+        if self.page_index > last_page:
+            self.page_index = last_page
+            result = self.backend.query_saved_tests(filters, sort,
+                                                    offset=self.page_index * self.PAGE_SIZE,
+                                                    limit=self.PAGE_SIZE)
+        return result.get("tests", [])
+
+    def _load_test_page_fallback(self, filters):
+        """测试索引不可用时：整体读取后在内存中过滤排序，再取当前页"""
+        tests = self.backend.list_saved_tests(filters.get("device_id"))
+        for test in tests:
+            if "test_info" in test:
+                continue
+            test_dir = test.get("dir_path")
+            if test_dir and os.path.exists(test_dir):
+                test_data = self.backend.get_saved_test_data(test_dir)
+                if test_data and test_data.get("status") == "ok":
+                    test_info = test_data.get("test_info", {})
+                    # 更新test对象的description
+                    if "description" in test_info:
+                        test["description"] = test_info["description"]
+                    test["test_info"] = test_info
+        text = filters.get("text", "").lower()
+        if text:
+            tests = [test for test in tests if text in " ".join((
+                test.get("name", ""), test.get("description", ""),
+                self.get_chip_id(test), self.get_device_number(test))).lower()]
+        tests = self.sort_tests(tests)
+        self.total_tests = len(tests)
+        last_page = max((self.total_tests - 1) // self.PAGE_SIZE, 0)
+        self.page_index = min(self.page_index, last_page)
+        start = self.page_index * self.PAGE_SIZE
+        return tests[start:start + self.PAGE_SIZE]
+
+    def _update_page_controls(self):
+        pages = max(-(-self.total_tests // self.PAGE_SIZE), 1)
+        self.page_label.setText(tr("history.page_label", page=self.page_index + 1, pages=pages,
+                                   total=self.total_tests))
+        self.page_prev_btn.setEnabled(self.page_index > 0)
+        self.page_next_btn.setEnabled(self.page_index + 1 < pages)
+
+    def _change_page(self, delta):
+        self.page_index = max(self.page_index + delta, 0)
+        self.refresh_tests()
+
+    def _on_search_committed(self):
+        self.page_index = 0
+        self.refresh_tests()
+
     def get_selected_tests(self):
         """Get all currently selected tests"""
         selected_items = self.test_list.selectedItems()
@@ -853,70 +1113,197 @@ class TestHistoryWidget(QWidget):
         return selected_tests
     
     def export_selected_tests(self):
-        """Export selected tests to a user-specified directory"""
+        """Export selected tests in the background, as folders or a single archive"""
         selected_tests = self.get_selected_tests()
         
         if not selected_tests:
             QMessageBox.information(self, tr("history.dialog.export.title"), tr("history.dialog.export.no_selection"))
             return
+        if self._export_thread is not None:
+            QMessageBox.information(self, tr("history.dialog.export.title"), tr("history.dialog.export.in_progress"))
+            return
+        
+        # Ask for export format
+        format_labels = {
+            tr("history.dialog.export.format_folder"): EXPORT_FORMAT_FOLDER,
+            tr("history.dialog.export.format_zip"): EXPORT_FORMAT_ZIP,
+            tr("history.dialog.export.format_tar_gz"): EXPORT_FORMAT_TAR_GZ,
+            tr("history.dialog.export.format_dataset_csv"): DATASET_FORMAT_CSV,
+            tr("history.dialog.export.format_dataset_col"): DATASET_FORMAT_COLUMNAR,
+        }
+        label, ok = QInputDialog.getItem(self, tr("history.dialog.export.title"), tr("history.dialog.export.format_prompt"),
+                                         list(format_labels), 0, False)
+        if not ok:
+            return
+        export_format = format_labels[label]
         
-        # Ask for destination directory
-        dest_dir = QFileDialog.getExistingDirectory(self, tr("history.dialog.export.select_directory"), "", QFileDialog.ShowDirsOnly)
-        if not dest_dir:
+        # Ask for destination directory / archive file
+        if export_format == EXPORT_FORMAT_FOLDER:
+            target = QFileDialog.getExistingDirectory(self, tr("history.dialog.export.select_directory"), "", QFileDialog.ShowDirsOnly)
+        else:
+            prefix = "dataset" if export_format in DATASET_FORMATS else "tests"
+            default_name = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+            target, _ = QFileDialog.getSaveFileName(self, tr("history.dialog.export.select_file"), default_name,
+                                                    f"*.{export_format}")
+            if target and not target.endswith("." + export_format):
+                target += "." + export_format
+        if not target:
             return  # User canceled
-            
-        try:
-            exported_count = 0
-            skipped_count = 0
-            
-            for test in selected_tests:
-                # Get test info
-                test_name = test.get("name", "").replace(" ", "_")
-                test_desc = test.get("description", "").replace(" ", "_")
-                source_dir = test.get("dir_path", "")
-                
-                if not source_dir or not os.path.exists(source_dir):
-                    skipped_count += 1
-                    continue
-                
-                # Create new directory name with test name and description prefix
-                prefix = ""
-                if test_name:
-                    prefix += test_name + "_"
-                if test_desc:
-                    prefix += test_desc + "_"
-                    
-                # If no prefix was created, use a default
-                if not prefix:
-                    prefix = "Test_"
-                    
-                # Make sure prefix is not too long and has valid characters
-                prefix = ''.join(c for c in prefix if c.isalnum() or c in '_-')
-                if len(prefix) > 50:  # Truncate if too long
-                    prefix = prefix[:50]
-                    
-                new_dir_name = prefix + os.path.basename(source_dir)
-                target_dir = os.path.join(dest_dir, new_dir_name)
-                
-                # Copy directory
-                if os.path.exists(target_dir):
-                    # Directory already exists, add timestamp to make it unique
-                    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                    target_dir = os.path.join(dest_dir, f"{prefix}{timestamp}_{os.path.basename(source_dir)}")
-                
-                # Copy the directory
-                shutil.copytree(source_dir, target_dir)
-                exported_count += 1
-            
-            # Show results
-            result_message = tr("history.dialog.export.completed_count", count=exported_count)
-            if skipped_count > 0:
-                result_message += tr("history.dialog.export.skipped_count", count=skipped_count)
-                
-            QMessageBox.information(self, tr("history.dialog.export.completed_title"), result_message)
-            
-        except Exception as e:
-            QMessageBox.warning(self, tr("history.dialog.export.error_title"), tr("history.dialog.export.error_message", error=str(e)))
+        
+        if export_format in DATASET_FORMATS:
+            # 多个测试合并为一个长表数据集（进程池逐步骤编码）
+            exporter = DatasetExporter(selected_tests, target, export_format,
+                                       processes=get_dataset_export_processes() or None,
+                                       use_sidecar=is_step_sidecar_enabled())
+        else:
+            exporter = TestExporter(selected_tests, target, export_format,
+                                    workers=get_export_copy_workers(), compress_level=get_export_compress_level())
+        worker = TestExportWorker(exporter)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        
+        # 进度按千分比显示（字节数可能超出 QProgressDialog 的 int 范围）
+        dialog = QProgressDialog(tr("history.dialog.export.progress", count=len(selected_tests)),
+                                 tr("history.dialog.export.cancel"), 0, 1000, self)
+        dialog.setWindowTitle(tr("history.dialog.export.title"))
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.setValue(0)
+        dialog.canceled.connect(worker.cancel)
+        
+        thread.started.connect(worker.run)
+        worker.progress.connect(self._on_export_progress)
+        worker.finished.connect(self._on_export_finished)
+        worker.failed.connect(self._on_export_failed)
+        worker.done.connect(thread.quit)
+        worker.done.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(self._on_export_thread_finished)
+        self._export_thread = thread
+        self._export_worker = worker
+        self._export_dialog = dialog
+        thread.start()
+    
+    def _on_export_progress(self, done_bytes, total_bytes):
+        if self._export_dialog is not None and total_bytes:
+            self._export_dialog.setValue(int(1000 * done_bytes / total_bytes))
+    
+    def _close_export_dialog(self):
+        if self._export_dialog is not None:
+            self._export_dialog.close()
+            self._export_dialog = None
+    
+    def _on_export_finished(self, result):
+        self._close_export_dialog()
+        if result.get("cancelled"):
+            QMessageBox.information(self, tr("history.dialog.export.title"), tr("history.dialog.export.cancelled"))
+            return
+        
+        # Show results
+        if "rows" in result:
+            result_message = tr("history.dialog.export.dataset_completed", rows=result["rows"],
+                                count=result.get("exported", 0), path=result.get("path", ""))
+        else:
+            result_message = tr("history.dialog.export.completed_count", count=result.get("exported", 0))
+        if result.get("skipped", 0) > 0:
+            result_message += tr("history.dialog.export.skipped_count", count=result["skipped"])
+        QMessageBox.information(self, tr("history.dialog.export.completed_title"), result_message)
+    
+    def _on_export_failed(self, error):
+        self._close_export_dialog()
+        QMessageBox.warning(self, tr("history.dialog.export.error_title"), tr("history.dialog.export.error_message", error=error))
+    
+    def _on_export_thread_finished(self):
+        self._export_thread = None
+        self._export_worker = None
+    
+    def analyze_tests(self):
+        """批量分析所选测试（未选择时分析全部测试），结果用于排序、过滤和列表显示"""
+        if self._analysis_thread is not None:
+            QMessageBox.information(self, tr("history.dialog.analysis.title"), tr("history.dialog.analysis.in_progress"))
+            return
+        selected_tests = self.get_selected_tests()
+        test_dirs = [test["dir_path"] for test in selected_tests if test.get("dir_path")]
+        if not test_dirs:
+            reply = QMessageBox.question(self, tr("history.dialog.analysis.title"), tr("history.dialog.analysis.confirm_all"),
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+            test_dirs = None
+        
+        worker = BatchAnalysisWorker(self.backend, test_dirs)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        
+        dialog = QProgressDialog(tr("history.dialog.analysis.progress"), tr("history.dialog.export.cancel"),
+                                 0, 0, self)
+        dialog.setWindowTitle(tr("history.dialog.analysis.title"))
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.canceled.connect(worker.cancel)
+        
+        thread.started.connect(worker.run)
+        worker.progress.connect(self._on_analysis_progress)
+        worker.finished.connect(self._on_analysis_finished)
+        worker.done.connect(thread.quit)
+        worker.done.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(self._on_analysis_thread_finished)
+        self._analysis_thread = thread
+        self._analysis_worker = worker
+        self._analysis_dialog = dialog
+        thread.start()
+    
+    def _on_analysis_progress(self, done, total):
+        if self._analysis_dialog is not None:
+            self._analysis_dialog.setMaximum(total)
+            self._analysis_dialog.setValue(done)
+    
+    def _on_analysis_finished(self, result):
+        if self._analysis_dialog is not None:
+            self._analysis_dialog.close()
+            self._analysis_dialog = None
+        if result.get("status") != "ok":
+            QMessageBox.warning(self, tr("history.dialog.analysis.title"),
+                                tr("history.dialog.analysis.error", error=result.get("reason", "")))
+            return
+        self.refresh_tests()
+        message = tr("history.dialog.analysis.completed", count=result.get("analyzed", 0))
+        if result.get("failed"):
+            message += tr("history.dialog.analysis.failed_count", count=result["failed"])
+        QMessageBox.information(self, tr("history.dialog.analysis.title"), message)
+    
+    def _on_analysis_thread_finished(self):
+        self._analysis_thread = None
+        self._analysis_worker = None
+
+    def stop_background_tasks(self, timeout_ms=2000):
+        """取消并等待后台加载、预生成、导出和分析线程（应用退出时在关闭后端之前调用）"""
+        self._cancel_step_load()
+        self._cancel_overlay()
+        self._backfill_pool.clear()
+        threads = list(self._load_threads.values())
+        threads.append((self._prewarm_thread, self._prewarm_worker))
+        threads.append((self._export_thread, self._export_worker))
+        threads.append((self._analysis_thread, self._analysis_worker))
+        threads = [(thread, worker) for thread, worker in threads if thread is not None]
+        for _, worker in threads:
+            try:
+                worker.cancel()
+            except RuntimeError:
+                pass  # 工作对象已结束并被删除
+        for thread, _ in threads:
+            try:
+                thread.quit()
+                thread.wait(timeout_ms)
+            except RuntimeError:
+                pass
+        self._overlay_pool.waitForDone(timeout_ms)
+        self._backfill_pool.waitForDone(timeout_ms)
     
     def delete_selected_tests(self):
         """Delete selected tests"""
@@ -940,6 +1327,16 @@ class TestHistoryWidget(QWidget):
         if reply != QMessageBox.Yes:
             return
             
+        # 释放当前步骤的数据引用（旁路缓存为内存映射，Windows 下映射中的文件无法删除）
+        self._cancel_step_load()
+        self.step_data = np.empty((0, 2))
+        self.step_data_dict = {}
+        self._plot_x = None
+        self._plot_y = None
+        self._pyramid = None
+        self.clear_plot()
+        step_cache = get_step_cache()
+
         try:
             deleted_count = 0
             failed_count = 0
@@ -951,6 +1348,7 @@ class TestHistoryWidget(QWidget):
                 if source_dir and os.path.exists(source_dir):
                     try:
                         # Delete the directory
+                        step_cache.discard_under(source_dir)
                         shutil.rmtree(source_dir)
                         deleted_count += 1
                     except Exception as e:
@@ -1121,6 +1519,7 @@ class TestHistoryWidget(QWidget):
         self.clear_step_params()
         # Cache current step for re-rendering on language change
         self.current_step_display = step
+        self.update_step_summary(step.get("stats"))
         
         # Get step type and params
         step_type = step.get("type", "unknown")
@@ -1229,6 +1628,24 @@ class TestHistoryWidget(QWidget):
         self.clear_step_params()
         self.data_points_label.setText("")
         self.data_file_label.setText("")
+        self.update_step_summary(None)
+    
+    def update_step_summary(self, stats):
+        """显示步骤元数据中的摘要统计；旧数据没有摘要时留空"""
+        current = (stats or {}).get("current") or {}
+        values = {key: "" for key in self.summary_labels}
+        if current.get("count"):
+            id_range = ((stats.get("columns") or {}).get("Id") or {})
+            if id_range.get("min") is not None and id_range.get("max") is not None:
+                values["current_range"] = f"{id_range['min']:.3e} ~ {id_range['max']:.3e} A"
+            if current.get("abs_max") is not None:
+                values["max_abs_current"] = f"{current['abs_max']:.3e} A"
+            if current.get("on_off_ratio") is not None:
+                values["on_off_ratio"] = f"{current['on_off_ratio']:.3g}"
+            if current.get("mean") is not None:
+                values["current_mean_std"] = f"{current['mean']:.3e} ± {current.get('std', 0.0):.3e} A"
+        for key, text in values.items():
+            self.summary_labels[key].setText(text)
     
     def clear_step_params(self):
         """Clear step parameters form"""
@@ -1245,7 +1662,10 @@ class TestHistoryWidget(QWidget):
             self.step_params_layout.removeRow(0)
     
     def load_step_data(self, step_index):
-        """Load data for selected step - 支持output多曲线"""
+        """Load data for selected step - 支持output多曲线；CSV在后台线程中加载"""
+        # 缓存命中和金字塔路径不经过 clear_plot，这里先放弃叠加曲线和仍在加载的叠加任务
+        self._cancel_step_load()
+        self._cancel_overlay()
         if not self.test_info or self.test_info.get("status") != "ok":
             return
         
@@ -1262,7 +1682,7 @@ class TestHistoryWidget(QWidget):
             data_file = step.get("data_file")
             
             if not data_file:
-                self.step_data = []
+                self.step_data = np.empty((0, 2))
                 self.step_data_dict = {}
                 self.clear_plot()
                 return
@@ -1275,92 +1695,169 @@ class TestHistoryWidget(QWidget):
                 QMessageBox.warning(self, tr("main.dialog.error"), tr("history.errors.file_not_found", file_path=file_path))
                 return
             
-            # Load CSV data
-            with open(file_path, "r") as f:
-                reader = csv.reader(f)
-                # Get header
-                header = next(reader)
-                
-                # Parse data based on step type
-                if step_type == "output":
-                    # Output type: multiple columns for different gate voltages
-                    self.load_output_data(reader, header)
-                else:
-                    # Transfer/Transient type: traditional two-column data
-                    self.load_traditional_data(reader, header)
-            
-            # Update plot
-            self.update_plot(step_type)
-            
-            # Update data stats
-            if step_type == "output":
-                curves = self.step_data_dict.get("curves", {}) if self.step_data_dict else {}
-                x_vals = self.step_data_dict.get("x_values", []) if self.step_data_dict else []
-                curve_count = len(curves)
-                point_count = len(x_vals)
-                self.update_data_stats(data_file, point_count, curve_count)
-            else:
-                self.update_data_stats(data_file, len(self.step_data))
+            self._pyramid = None
+            if step_type == "transient" and self._open_transient_pyramid(file_path):
+                self.update_plot(step_type)
+                self.update_data_stats(data_file, len(self._plot_x))
+                self.update_step_params(step)
+                return
             
-            # Update step params
+            # 先显示参数；内存缓存命中时直接绘制，否则清空旧图并在后台读取，读到一部分就先画出来
             self.update_step_params(step)
+            cached = get_step_cache().get(file_path, step_type != "output")
+            if cached is not None:
+                header, data = cached
+                self._show_loaded_step(step_type, data_file, header, data)
+                return
+            self.step_data = np.empty((0, 2))
+            self.step_data_dict = {}
+            self.clear_plot()
+            self._start_step_load(file_path, step_type, data_file)
             
         except Exception as e:
             QMessageBox.warning(self, tr("main.dialog.error"), tr("history.errors.load_step_failed", error=str(e)))
+
+    def _start_step_load(self, file_path, step_type, data_file):
+        self._load_request_id += 1
+        request_id = self._load_request_id
+        self._loading_step = (request_id, step_type, data_file)
+
+        worker = StepLoadWorker(request_id, file_path, step_type, use_sidecar=is_step_sidecar_enabled(),
+                                cache=get_step_cache())
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        worker.partial.connect(self._on_step_load_partial)
+        worker.finished.connect(self._on_step_load_finished)
+        worker.failed.connect(self._on_step_load_failed)
+        thread.started.connect(worker.run)
+        worker.done.connect(thread.quit)
+        worker.done.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        # 线程结束前保留引用，取消后的线程也要等它自行退出
+        self._load_threads[request_id] = (thread, worker)
+        thread.finished.connect(lambda rid=request_id: self._load_threads.pop(rid, None))
+        self._load_worker = worker
+        thread.start()
+
+    def _start_sidecar_prewarm(self):
+        """后台为最近的若干测试生成旁路缓存，之后打开这些步骤时无需解析CSV"""
+        limit = get_step_sidecar_prewarm_tests()
+        if self._prewarm_started or not is_step_sidecar_enabled() or limit <= 0:
+            return
+        self._prewarm_started = True
+        result = self.backend.query_saved_tests({}, [("time", False)], offset=0, limit=limit)
+        if result.get("status") != "ok":
+            return
+        test_dirs = [test.get("dir_path") for test in result.get("tests", []) if test.get("dir_path")]
+        if not test_dirs:
+            return
+
+        worker = SidecarPrewarmWorker(test_dirs)
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.done.connect(thread.quit)
+        worker.done.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(self._on_prewarm_thread_finished)
+        self._prewarm_thread = thread
+        self._prewarm_worker = worker
+        thread.start()
+
+    def _on_prewarm_thread_finished(self):
+        self._prewarm_thread = None
+        self._prewarm_worker = None
+
+    def _cancel_step_load(self):
+        """取消正在进行的加载（选择变化时调用），过期结果按 request_id 丢弃"""
+        if self._load_worker is not None:
+            self._load_worker.cancel()
+            self._load_worker = None
+        self._loading_step = None
+
+    def _on_step_load_partial(self, request_id, header, data):
+        if self._loading_step is None or self._loading_step[0] != request_id:
+            return
+        _, step_type, data_file = self._loading_step
+        self._apply_loaded_data(step_type, header, data)
+        self.update_plot(step_type)
+        self.update_data_stats(data_file, len(data))
+
+    def _on_step_load_finished(self, request_id, header, data):
+        if self._loading_step is None or self._loading_step[0] != request_id:
+            return
+        _, step_type, data_file = self._loading_step
+        self._loading_step = None
+        self._load_worker = None
+        self._show_loaded_step(step_type, data_file, header, data)
+
+    def _show_loaded_step(self, step_type, data_file, header, data):
+        """绘制完整的步骤数据并更新统计"""
+        self._apply_loaded_data(step_type, header, data)
+        self.update_plot(step_type)
+        
+        # Update data stats
+        if step_type == "output":
+            curves = self.step_data_dict.get("curves", {}) if self.step_data_dict else {}
+            x_vals = self.step_data_dict.get("x_values", []) if self.step_data_dict else []
+            self.update_data_stats(data_file, len(x_vals), len(curves))
+        else:
+            self.update_data_stats(data_file, len(self.step_data))
+
+    def _on_step_load_failed(self, request_id, error):
+        if self._loading_step is None or self._loading_step[0] != request_id:
+            return
+        self._loading_step = None
+        self._load_worker = None
+        QMessageBox.warning(self, tr("main.dialog.error"), tr("history.errors.load_step_failed", error=error))
+
+    def _apply_loaded_data(self, step_type, header, data):
+        if step_type == "output":
+            # Output type: multiple columns for different gate voltages
+            self.load_output_data(header, data)
+        else:
+            # Transfer/Transient type: traditional two-column data
+            self.load_traditional_data(header, data)
     
-    def load_output_data(self, reader, header):
-        """加载output类型的多曲线数据"""
+    def _open_transient_pyramid(self, file_path):
+        """瞬态步骤同时存在金字塔和列式文件时，直接映射数据而不解析CSV"""
+        pyramid = open_pyramid(pyramid_dir_for(file_path))
+        if pyramid is None or not pyramid.levels:
+            return False
+        columnar = open_columnar(columnar_path_for(file_path))
+        if columnar is None or len(columnar) == 0:
+            return False
+        self._pyramid = pyramid
+        self._plot_x = columnar.data[:, 0]
+        self._plot_y = columnar.data[:, 1]
+        self._plot_monotonic = True
+        self.step_data = np.empty((0, 2))
+        self.step_data_dict = {}
+        return True
+    
+    def load_output_data(self, header, data):
+        """加载output类型的多曲线数据（data 为 (N, 列数) 数组，缺失值为 NaN）"""
         # 第一列是x轴数据（通常是Vd）
         x_label = header[0]
         curve_labels = header[1:]  # 后续列是各条曲线
         
-        # 初始化数据结构
-        x_values = []
-        curves_data = {label: [] for label in curve_labels}
-        
-        # 读取数据
-        for row in reader:
-            if not row:
-                continue
-            # 如果行列数不足，填充空字符串，避免整行丢弃
-            if len(row) < len(header):
-                row = row + [""] * (len(header) - len(row))
-            try:
-                x_val = float(row[0])
-            except ValueError:
-                continue
-            x_values.append(x_val)
-            
-            for i, label in enumerate(curve_labels):
-                try:
-                    y_val = float(row[i + 1])
-                except ValueError:
-                    y_val = math.nan
-                curves_data[label].append(y_val)
+        x_values = data[:, 0]
+        curves_data = {label: data[:, i + 1] for i, label in enumerate(curve_labels)}
         
         # 存储数据
         if curve_labels:
-            self.step_data = [[x, curves_data[curve_labels[0]][i]] for i, x in enumerate(x_values)]  # 保持兼容性
+            self.step_data = data[:, :2]  # 保持兼容性
         else:
-            self.step_data = []
+            self.step_data = np.empty((0, 2))
         self.step_data_dict = {
             'x_values': x_values,
             'curves': curves_data,
             'x_label': x_label
         }
     
-    def load_traditional_data(self, reader, header):
+    def load_traditional_data(self, header, data):
         """加载传统的两列数据"""
-        data = []
-        for row in reader:
-            try:
-                x = float(row[0])
-                y = float(row[1])
-                data.append([x, y])
-            except:
-                pass
-        
-        self.step_data = data
+        self.step_data = data[:, :2]
         self.step_data_dict = {}
     
     def update_plot(self, step_type):
@@ -1374,7 +1871,7 @@ class TestHistoryWidget(QWidget):
         if step_type == "output" and self.step_data_dict:
             # 绘制output多曲线
             self.plot_output_curves()
-        elif self.step_data:
+        elif len(self.step_data) or self._pyramid is not None:
             # 绘制单曲线
             self.plot_single_curve(step_type)
         else:
@@ -1422,9 +1919,14 @@ class TestHistoryWidget(QWidget):
     
     def plot_single_curve(self, step_type):
         """绘制单条曲线（transfer或transient）"""
-        # Extract x and y values
-        x = [point[0] for point in self.step_data]
-        y = [point[1] for point in self.step_data]
+        # Extract x and y values（金字塔模式下数据已映射好）
+        if self._pyramid is None:
+            data = np.asarray(self.step_data, dtype=np.float64).reshape(-1, 2)
+            self._plot_x = np.ascontiguousarray(data[:, 0])
+            self._plot_y = np.ascontiguousarray(data[:, 1])
+            self._plot_monotonic = is_monotonic(self._plot_x)
+        self._hover_index = None
+        x, y = self._decimated_single_curve(full_range=True)
         
         # Set plot labels based on step type
         if step_type == "transfer":
@@ -1450,6 +1952,45 @@ class TestHistoryWidget(QWidget):
         self.coord_label.hide()
         self.highlight_point.clear()
     
+    def _decimated_single_curve(self, full_range=False):
+        """按绘图区宽度对单曲线做 min/max 包络降采样；用户缩放后只处理可见部分"""
+        view_box = self.plot_widget.getViewBox()
+        x_range = None
+        # 自动范围开启时必须使用全部数据，否则裁剪后的边界又会改变自动范围
+        if not full_range and not view_box.autoRangeEnabled()[0]:
+            x_range = view_box.viewRange()[0]
+        pixel_width = int(view_box.width()) or 1000
+        if self._pyramid is not None:
+            return self._pyramid_view(x_range, pixel_width)
+        return decimate_for_view(self._plot_x, self._plot_y, pixel_width,
+                                 x_range=x_range, monotonic=self._plot_monotonic)
+
+    def _pyramid_view(self, x_range, pixel_width):
+        """从金字塔中选择与可见范围匹配的层；放大到原始点数足够少时读取全分辨率数据"""
+        x_min, x_max = x_range if x_range is not None else self._pyramid.full_range()
+        if self._pyramid.points_in_range(x_min, x_max) <= 2 * pixel_width:
+            window = visible_slice(self._plot_x, x_min, x_max)
+            x = np.array(self._plot_x[window])
+            y = np.array(self._plot_y[window])
+            return minmax_decimate(x, y, pixel_width)
+        x, y, _ = self._pyramid.query(x_min, x_max, pixel_width)
+        return x, y
+
+    def _schedule_redecimate(self, *args):
+        if self._overlay_curves or (self._plot_x is not None and len(self._plot_x) > 0
+                                    and "Current" in self.plot_lines):
+            self._redecimate_timer.start()
+
+    def _redecimate_single_curve(self):
+        if self._overlay_curves:
+            self._redecimate_overlay()
+            return
+        line = self.plot_lines.get("Current")
+        if line is None or self._plot_x is None:
+            return
+        x, y = self._decimated_single_curve()
+        line.setData(x, y)
+
     def clear_plot(self):
         """Clear the plot"""
         # 清除图例和曲线
@@ -1457,6 +1998,11 @@ class TestHistoryWidget(QWidget):
         for line in self.plot_lines.values():
             self.plot_widget.removeItem(line)
         self.plot_lines = {}
+        self._plot_x = None
+        self._plot_y = None
+        self._pyramid = None
+        self._hover_index = None
+        self._cancel_overlay()
         
         self.plot_widget.setTitle('')
         # 隐藏辅助线和标签
@@ -1465,6 +2011,119 @@ class TestHistoryWidget(QWidget):
         self.coord_label.hide()
         self.highlight_point.clear()
     
+    def overlay_selected(self):
+        """
+        叠加对比：多选了步骤时叠加当前测试的这些步骤；否则对每个选中的测试
+        叠加与当前步骤同序号同类型的步骤（没有时取第一个同类型步骤）
+        """
+        sources = []
+        step_items = [item for item in self.step_list.selectedItems() if item.data(0, Qt.UserRole)]
+        if len(step_items) > 1 and self.selected_test:
+            test_dir = self.selected_test.get("dir_path")
+            for item in step_items:
+                step_data = item.data(0, Qt.UserRole)
+                step = dict(step_data.get("step") or {}, index=step_data.get("index", 0))
+                if step.get("data_file"):
+                    sources.append({"test_dir": test_dir, "step": step,
+                                    "label": tr("history.step_label", index=step["index"] + 1)})
+        else:
+            tests = self.get_selected_tests()
+            step_type = None
+            step_index = max(self.selected_step_index, 0)
+            steps = self.test_info.get("test_info", {}).get("steps", []) if self.test_info else []
+            if 0 <= step_index < len(steps):
+                step_type = steps[step_index].get("type")
+            for test in tests:
+                if test.get("dir_path"):
+                    sources.append({"test_dir": test["dir_path"], "step_index": step_index,
+                                    "step_type": step_type, "label": self._overlay_test_label(test)})
+        if len(sources) < 2:
+            QMessageBox.information(self, tr("history.overlay_selected"), tr("history.dialog.overlay_need_selection"))
+            return
+
+        self._cancel_step_load()
+        self.clear_plot()
+        self._overlay_request_id += 1
+        self._overlay_expected = len(sources)
+        self.plot_widget.setTitle(tr("history.plot_title_overlay", count=0, total=len(sources)))
+        for source in sources:
+            self._overlay_pool.start(OverlayLoadTask(self._overlay_request_id, source, self._overlay_signals))
+
+    @staticmethod
+    def _overlay_test_label(test):
+        created_at = test.get("created_at", "")
+        try:
+            created_at = datetime.fromisoformat(created_at).strftime("%m-%d %H:%M")
+        except (TypeError, ValueError):
+            pass
+        return f"{test.get('name', '')} {created_at}".strip()
+
+    def _cancel_overlay(self):
+        """放弃未开始的叠加加载，已在运行的结果按 request_id 丢弃"""
+        self._overlay_pool.clear()
+        self._overlay_request_id += 1
+        self._overlay_curves = []
+        self._overlay_expected = 0
+
+    def _on_overlay_loaded(self, request_id, source, header, data):
+        if request_id != self._overlay_request_id or len(data) == 0:
+            if request_id == self._overlay_request_id:
+                self._on_overlay_failed(request_id, source, "empty")
+            return
+        step = source.get("step") or {}
+        step_type = step.get("type", "transfer")
+        if not self._overlay_curves:
+            self._set_overlay_axes(step_type, header)
+        x = np.ascontiguousarray(data[:, 0])
+        monotonic = is_monotonic(x)
+        # output 步骤每个栅压一条曲线，其余步骤取第一列电流
+        columns = range(1, data.shape[1]) if step_type == "output" else [1]
+        view_box = self.plot_widget.getViewBox()
+        pixel_width = int(view_box.width()) or 1000
+        for column in columns:
+            label = source.get("label", "")
+            if step_type == "output" and column < len(header):
+                label = f"{label} {header[column]}"
+            curve = {"x": x, "y": np.ascontiguousarray(data[:, column]), "monotonic": monotonic}
+            color = pg.intColor(len(self._overlay_curves), hues=max(self._overlay_expected, 9))
+            px, py = decimate_for_view(curve["x"], curve["y"], pixel_width, monotonic=monotonic)
+            name = label if self._overlay_expected <= OVERLAY_LEGEND_LIMIT else None
+            curve["line"] = self.plot_widget.plot(px, py, pen=pg.mkPen(color=color, width=1.5), name=name)
+            self.plot_lines[f"overlay_{len(self._overlay_curves)}"] = curve["line"]
+            self._overlay_curves.append(curve)
+        self._update_overlay_title()
+
+    def _on_overlay_failed(self, request_id, source, error):
+        if request_id != self._overlay_request_id:
+            return
+        logger.warning(f"叠加曲线未加载 {source.get('test_dir')}: {error}")
+        self._overlay_expected = max(self._overlay_expected - 1, 0)
+        self._update_overlay_title()
+
+    def _update_overlay_title(self):
+        count = len({id(curve["x"]) for curve in self._overlay_curves})
+        self.plot_widget.setTitle(tr("history.plot_title_overlay", count=count, total=self._overlay_expected))
+
+    def _set_overlay_axes(self, step_type, header):
+        if step_type == "transient":
+            self.plot_widget.setLabel('bottom', tr("realtime.x_axis_time"))
+        elif step_type == "transfer":
+            self.plot_widget.setLabel('bottom', tr("realtime.x_axis_gate_voltage"))
+        else:
+            self.plot_widget.setLabel('bottom', f'{header[0]} (V)' if header else '')
+        self.plot_widget.setLabel('left', tr("realtime.y_axis_current"))
+        self.last_plot_type = step_type
+
+    def _redecimate_overlay(self):
+        """缩放/平移后按新的可见范围重新降采样全部叠加曲线"""
+        view_box = self.plot_widget.getViewBox()
+        x_range = None if view_box.autoRangeEnabled()[0] else view_box.viewRange()[0]
+        pixel_width = int(view_box.width()) or 1000
+        for curve in self._overlay_curves:
+            px, py = decimate_for_view(curve["x"], curve["y"], pixel_width,
+                                       x_range=x_range, monotonic=curve["monotonic"])
+            curve["line"].setData(px, py)
+
     def on_device_selected(self, current, previous):
         """Handle device selection"""
         if not current:
@@ -1476,6 +2135,7 @@ class TestHistoryWidget(QWidget):
         
         # Update selection
         self.selected_device = device_id
+        self.page_index = 0
         
         # Refresh tests for this device
         self.refresh_tests()
@@ -1491,6 +2151,8 @@ class TestHistoryWidget(QWidget):
         
         # Update selection
         self.selected_test = test
+        self._cancel_step_load()
+        self._cancel_overlay()
         
         # Load test info
         self.load_test_info()
@@ -1523,7 +2185,7 @@ class TestHistoryWidget(QWidget):
     def on_mouse_moved(self, pos):
         """处理鼠标在图表上移动的事件 - 仅对单曲线有效"""
         # 仅对单曲线图表启用鼠标追踪
-        if len(self.plot_lines) != 1 or not self.step_data:
+        if len(self.plot_lines) != 1 or (len(self.step_data) == 0 and self._pyramid is None):
             self.vLine.hide()
             self.hLine.hide()
             self.coord_label.hide()
@@ -1549,35 +2211,21 @@ class TestHistoryWidget(QWidget):
         self.vLine.show()
         self.hLine.show()
         
-        # 找到最近的数据点
-        x_data = [point[0] for point in self.step_data]
-        y_data = [point[1] for point in self.step_data]
-        
-        # 计算鼠标到所有点的距离
-        distances = []
-        for i in range(len(x_data)):
-            dx = x - x_data[i]
-            dy = y - y_data[i]
-            # 使用距离的平方（避免开平方运算）
-            distances.append(dx*dx + dy*dy)
-        
-        # 找到最近点的索引
-        if not distances:
+        # 找到最近的数据点：索引每个步骤只建一次，距离按当前视图范围归一化
+        if self._plot_x is None or len(self._plot_x) == 0:
             return
-        nearest_idx = distances.index(min(distances))
-        nearest_x = x_data[nearest_idx]
-        nearest_y = y_data[nearest_idx]
-        
-        # 计算距离阈值，仅在足够近时显示
+        if self._hover_index is None:
+            self._hover_index = NearestPointIndex(self._plot_x, self._plot_y, self._plot_monotonic)
         view_range = view_box.viewRange()
         x_range = view_range[0][1] - view_range[0][0]
         y_range = view_range[1][1] - view_range[1][0]
-        distance_threshold = ((x_range/20)**2 + (y_range/20)**2)
-        
-        if distances[nearest_idx] > distance_threshold:
+        # 仅在足够近时显示（约为视图对角线的 1/20）
+        nearest = self._hover_index.query(x, y, x_range, y_range, HOVER_MAX_DISTANCE)
+        if nearest is None:
             self.coord_label.hide()
             self.highlight_point.clear()
             return
+        nearest_x, nearest_y = nearest
         
         text = f"x: {nearest_x:.3f}\ny: {nearest_y:.3e}"
         
@@ -1716,6 +2364,7 @@ class TestHistoryWidget(QWidget):
     def on_sort_order_changed(self, new_order):
         """处理拖拽排序顺序变化"""
         self.sort_priorities = new_order
+        self.page_index = 0
         # 刷新测试列表应用新的排序
         self.refresh_tests()
     
@@ -1723,6 +2372,7 @@ class TestHistoryWidget(QWidget):
         """处理完整的排序配置变化（包括升降序）"""
         self.sort_priorities = config.get('order', self.sort_priorities)
         self.sort_directions = config.get('directions', self.sort_directions)
+        self.page_index = 0
         # 刷新测试列表应用新的排序
         self.refresh_tests()
 
@@ -1739,6 +2389,12 @@ class TestHistoryWidget(QWidget):
         self.test_list_group.setTitle(tr("history.test_list_group"))
         self.export_action.setText(tr("history.export_selected"))
         self.delete_action.setText(tr("history.delete_selected"))
+        self.overlay_action.setText(tr("history.overlay_selected"))
+        self.analyze_action.setText(tr("history.analyze_selected"))
+        self.search_edit.setPlaceholderText(tr("history.search_placeholder"))
+        self.page_prev_btn.setText(tr("history.page_prev"))
+        self.page_next_btn.setText(tr("history.page_next"))
+        self._update_page_controls()
 
         # Update selection helper text based on current selection count
         selected_items = self.test_list.selectedItems() if hasattr(self, "test_list") else []
@@ -1780,6 +2436,8 @@ class TestHistoryWidget(QWidget):
         self.data_stats_group.setTitle(tr("history.data_stats_tab"))
         self.data_points_form_label.setText(tr("history.data_stats.points"))
         self.data_file_form_label.setText(tr("history.data_stats.filename"))
+        for key, label in self.summary_form_labels.items():
+            label.setText(tr(f"history.data_stats.{key}"))
 
         # Re-render cached step params and data stats so labels use new language
         if hasattr(self, "current_step_display") and self.current_step_display:
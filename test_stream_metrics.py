@@ -0,0 +1,48 @@
+"""
+回归测试：实时指标（stream_metrics）与批量分析（device_metrics）在双向扫描上一致
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目目录到路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend_device_control_pyqt.core.device_metrics import transfer_metrics
+from backend_device_control_pyqt.core.stream_metrics import TransferStreamMetrics
+
+KEYS = ("gm_max", "vg_at_gm_max", "vth", "hysteresis")
+
+
+def _double_sweep(noise, repeat, seed=0):
+    """-0.2 → 0.8 → -0.2 V 的双向扫描，反扫电流整体偏移 50 mV，折返处停留 repeat 个点"""
+    rng = np.random.default_rng(seed)
+    up = np.round(np.arange(-0.2, 0.8 + 1e-9, 0.01), 4)
+    vg = np.concatenate((up, np.full(repeat, up[-1]), up[::-1]))
+    offset = np.concatenate((np.zeros(len(up)), np.full(repeat + len(up), 0.05)))
+    overdrive = vg - 0.3 - offset
+    current = 1e-3 * np.maximum(overdrive, 0) ** 1.5 + 2e-5 * np.exp(np.minimum(overdrive / 0.05, 0)) + 1e-9
+    return vg, current * (1 + noise * rng.standard_normal(len(vg)))
+
+
+def _stream(vg, current, block_size):
+    metrics = TransferStreamMetrics()
+    for start in range(0, len(vg), block_size):
+        metrics.append(np.column_stack((vg[start:start + block_size], current[start:start + block_size])))
+    return metrics.result()
+
+
+@pytest.mark.parametrize("noise", [0.0, 0.01])
+@pytest.mark.parametrize("repeat", [0, 3])
+@pytest.mark.parametrize("block_size", [1, 7, 10000])
+def test_stream_transfer_matches_batch(noise, repeat, block_size):
+    vg, current = _double_sweep(noise, repeat)
+    batch = transfer_metrics(vg, current)
+    live = _stream(vg, current, block_size)
+    for key in KEYS:
+        assert batch[key] is not None
+        assert live[key] == pytest.approx(batch[key], rel=1e-6, abs=1e-9), key
+    assert batch["hysteresis"] > 0